@@ -2,8 +2,17 @@
 # Copyright (c) 2015-2018, Exa Analytics Development Team
 # Distributed under the terms of the Apache License 2.0
 """
-Two Body Properties Computations
+Bond Angles and Dihedrals
 #####################################
+Bond angles and dihedral (torsion) angles are enumerated from the bonded
+pairs of the :class:`~exatomic.core.two.AtomTwo` table. Bonds are stored as
+a compressed sparse row (CSR) adjacency (every bond in both directions)
+together with the (minimum image) bond vectors, so that all angles and
+dihedrals of all frames are computed by single compiled passes.
+
+Angle tables list the vertex atom first (``atom0``); dihedral tables list
+the four atoms along the chain (``atom0``-``atom1``-``atom2``-``atom3``).
+Angles are in radians.
 """
 import numpy as np
 import numba as nb
@@ -11,6 +20,7 @@ import pandas as pd
 from IPython.display import display
 from ipywidgets import FloatProgress
 from exatomic.base import nbpll
+from exatomic.algorithms.distance import minimum_image, two_dtypes
 
 
 @nb.jit(nopython=True, nogil=True, parallel=nbpll)
@@ -50,7 +60,7 @@ def compute_angles_out_of_core(hdfname, uni, bond=True):
         If bond is set to False, this process may take a very long time.
     """
     store = pd.HDFStore(hdfname, mode="a")
-    f = u.atom['frame'].unique()
+    f = uni.atom['frame'].unique()
     n = len(f)
     fp = FloatProgress(description="Computing:")
     display(fp)
@@ -75,3 +85,235 @@ def compute_angles_out_of_core(hdfname, uni, bond=True):
         fp.value = i/n*100
     store.close()
     fp.close()
+
+
+@nb.jit(nopython=True, nogil=True, parallel=nbpll)
+def bond_angles(indptr, indices, vectors):
+    """
+    Enumerate all bond angles of a CSR bond graph.
+
+    Angle counts per vertex are known up front, so the output is allocated
+    once and filled in parallel over vertices.
+
+    Args:
+        indptr (array): CSR row pointer (shape (n+1, ))
+        indices (array): Bonded neighbor of each (directed) bond
+        vectors (array): Bond vector (row to neighbor) of each bond (shape (m, 3))
+
+    Returns:
+        atom0 (array): Vertex of each angle
+        atom1 (array): First neighbor of the vertex
+        atom2 (array): Second neighbor of the vertex
+        rad (array): Angles in radians
+    """
+    n = len(indptr) - 1
+    offsets = np.zeros((n+1, ), dtype=np.int64)
+    for j in range(n):
+        deg = indptr[j+1] - indptr[j]
+        offsets[j+1] = offsets[j] + deg*(deg - 1)//2
+    m = offsets[n]
+    atom0 = np.empty((m, ), dtype=np.int64)
+    atom1 = np.empty((m, ), dtype=np.int64)
+    atom2 = np.empty((m, ), dtype=np.int64)
+    rad = np.empty((m, ), dtype=np.float64)
+    for j in nb.prange(n):
+        k = offsets[j]
+        for p in range(indptr[j], indptr[j+1]):
+            for q in range(p+1, indptr[j+1]):
+                dot = (vectors[p, 0]*vectors[q, 0] + vectors[p, 1]*vectors[q, 1] +
+                       vectors[p, 2]*vectors[q, 2])
+                rp = np.sqrt(vectors[p, 0]**2 + vectors[p, 1]**2 + vectors[p, 2]**2)
+                rq = np.sqrt(vectors[q, 0]**2 + vectors[q, 1]**2 + vectors[q, 2]**2)
+                cos = min(1.0, max(-1.0, dot/(rp*rq)))
+                atom0[k] = j
+                atom1[k] = indices[p]
+                atom2[k] = indices[q]
+                rad[k] = np.arccos(cos)
+                k += 1
+    return atom0, atom1, atom2, rad
+
+
+@nb.jit(nopython=True, nogil=True)
+def _dihedral_count(indptr, indices, j):
+    """Number of dihedrals whose central bond is (j, k) with k > j."""
+    cnt = 0
+    for e in range(indptr[j], indptr[j+1]):
+        k = indices[e]
+        if k <= j:
+            continue
+        for p in range(indptr[j], indptr[j+1]):
+            i = indices[p]
+            if i == k:
+                continue
+            for q in range(indptr[k], indptr[k+1]):
+                l = indices[q]
+                if l != j and l != i:
+                    cnt += 1
+    return cnt
+
+
+@nb.jit(nopython=True, nogil=True, parallel=nbpll)
+def bond_dihedrals(indptr, indices, vectors):
+    """
+    Enumerate all dihedral (torsion) angles of a CSR bond graph.
+
+    Each central bond (j, k) is visited once (from j < k); dihedrals are
+    counted in a first parallel pass and filled in a second.
+
+    Args:
+        indptr (array): CSR row pointer (shape (n+1, ))
+        indices (array): Bonded neighbor of each (directed) bond
+        vectors (array): Bond vector (row to neighbor) of each bond (shape (m, 3))
+
+    Returns:
+        atom0 (array): First atom of the chain
+        atom1 (array): Second atom of the chain (central bond)
+        atom2 (array): Third atom of the chain (central bond)
+        atom3 (array): Last atom of the chain
+        rad (array): Dihedral angles in radians (between -pi and pi)
+    """
+    n = len(indptr) - 1
+    counts = np.empty((n, ), dtype=np.int64)
+    for j in nb.prange(n):
+        counts[j] = _dihedral_count(indptr, indices, j)
+    offsets = np.zeros((n+1, ), dtype=np.int64)
+    for j in range(n):
+        offsets[j+1] = offsets[j] + counts[j]
+    m = offsets[n]
+    atom0 = np.empty((m, ), dtype=np.int64)
+    atom1 = np.empty((m, ), dtype=np.int64)
+    atom2 = np.empty((m, ), dtype=np.int64)
+    atom3 = np.empty((m, ), dtype=np.int64)
+    rad = np.empty((m, ), dtype=np.float64)
+    for j in nb.prange(n):
+        t = offsets[j]
+        for e in range(indptr[j], indptr[j+1]):
+            k = indices[e]
+            if k <= j:
+                continue
+            b2 = vectors[e]
+            r2 = np.sqrt(b2[0]**2 + b2[1]**2 + b2[2]**2)
+            for p in range(indptr[j], indptr[j+1]):
+                i = indices[p]
+                if i == k:
+                    continue
+                # b1 points from i to j
+                b1x = -vectors[p, 0]
+                b1y = -vectors[p, 1]
+                b1z = -vectors[p, 2]
+                n1x = b1y*b2[2] - b1z*b2[1]
+                n1y = b1z*b2[0] - b1x*b2[2]
+                n1z = b1x*b2[1] - b1y*b2[0]
+                for q in range(indptr[k], indptr[k+1]):
+                    l = indices[q]
+                    if l == j or l == i:
+                        continue
+                    b3 = vectors[q]
+                    n2x = b2[1]*b3[2] - b2[2]*b3[1]
+                    n2y = b2[2]*b3[0] - b2[0]*b3[2]
+                    n2z = b2[0]*b3[1] - b2[1]*b3[0]
+                    y = r2*(b1x*n2x + b1y*n2y + b1z*n2z)
+                    x = n1x*n2x + n1y*n2y + n1z*n2z
+                    atom0[t] = i
+                    atom1[t] = j
+                    atom2[t] = k
+                    atom3[t] = l
+                    rad[t] = np.arctan2(y, x)
+                    t += 1
+    return atom0, atom1, atom2, atom3, rad
+
+
+def bond_graph(universe):
+    """
+    Build the CSR bond graph of all frames from the bonded pairs of the
+    atom two body table.
+
+    Bond vectors are computed from the atomic positions (minimum image for
+    periodic universes), so the two body table need not contain vectors.
+
+    Args:
+        universe (:class:`~exatomic.core.universe.Universe`): Universe
+
+    Returns:
+        indptr (array): CSR row pointer (by atom position)
+        indices (array): Bonded neighbor (atom position) of each bond
+        vectors (array): Bond vector of each bond (shape (m, 3))
+    """
+    atom = universe.atom
+    atom_two = universe.atom_two
+    if 'bond' not in atom_two.columns:
+        universe.compute_bonds()
+    bonded = np.asarray(atom_two['bond'], dtype=bool)
+    idx0 = atom.index.get_indexer(np.asarray(atom_two['atom0'], dtype=np.int64)[bonded])
+    idx1 = atom.index.get_indexer(np.asarray(atom_two['atom1'], dtype=np.int64)[bonded])
+    # Periodic pairs may appear once per projection; keep each bond once
+    n = len(atom)
+    keys = np.unique(np.minimum(idx0, idx1)*n + np.maximum(idx0, idx1))
+    idx0 = keys//n
+    idx1 = keys%n
+    xyz = atom[['x', 'y', 'z']].values.astype(np.float64)
+    dxyz = xyz[idx1] - xyz[idx0]
+    if universe.periodic:
+        frame = universe.frame
+        fcodes = frame.index.get_indexer(atom['frame'].values.astype(np.int64))
+        dxyz = minimum_image(dxyz, frame.get_cell_vectors(), fcodes[idx0])
+    src = np.concatenate((idx0, idx1))
+    dst = np.concatenate((idx1, idx0))
+    vectors = np.concatenate((dxyz, -dxyz))
+    order = np.argsort(src, kind='mergesort')
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(src, minlength=n))))
+    return indptr, dst[order], vectors[order]
+
+
+def _angle_table(universe, positions, rad, column, compact):
+    """Map atom positions to atom indexes and build a (compact) table."""
+    fdtype, idtype, _ = two_dtypes(compact)
+    index = universe.atom.index.values
+    frames = universe.atom['frame'].values.astype(np.int64)
+    data = {'atom' + str(i): index[pos].astype(idtype)
+            for i, pos in enumerate(positions)}
+    data[column] = rad.astype(fdtype)
+    data['frame'] = frames[positions[0]].astype(idtype)
+    return pd.DataFrame.from_dict(data)
+
+
+def compute_atom_angle(universe, compact=False):
+    """
+    Compute all bond angles (of all frames).
+
+    .. code-block:: python
+
+        atom_angle = compute_atom_angle(uni)
+        atom_angle = compute_atom_angle(uni, compact=True)   # float32 angles, int32 indexes
+
+    Args:
+        universe (:class:`~exatomic.core.universe.Universe`): Universe
+        compact (bool): Compact data types
+
+    Returns:
+        atom_angle (:class:`~pandas.DataFrame`): Vertex (atom0), neighbors (atom1, atom2), angle, and frame
+    """
+    indptr, indices, vectors = bond_graph(universe)
+    atom0, atom1, atom2, rad = bond_angles(indptr, indices, vectors)
+    return _angle_table(universe, (atom0, atom1, atom2), rad, 'angle', compact)
+
+
+def compute_atom_dihedral(universe, compact=False):
+    """
+    Compute all dihedral (torsion) angles (of all frames).
+
+    .. code-block:: python
+
+        atom_dihedral = compute_atom_dihedral(uni)
+
+    Args:
+        universe (:class:`~exatomic.core.universe.Universe`): Universe
+        compact (bool): Compact data types
+
+    Returns:
+        atom_dihedral (:class:`~pandas.DataFrame`): Chain (atom0-atom3), dihedral, and frame
+    """
+    indptr, indices, vectors = bond_graph(universe)
+    atom0, atom1, atom2, atom3, rad = bond_dihedrals(indptr, indices, vectors)
+    return _angle_table(universe, (atom0, atom1, atom2, atom3), rad,
+                        'dihedral', compact)
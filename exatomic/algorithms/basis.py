@@ -24,7 +24,12 @@ except ImportError:
     from sympy import exp, cos, sin, Mul, Integer, Float
 from exa import Series
 from exatomic.algorithms.overlap import _cartesian_shell_pairs, _iter_atom_shells
-from exatomic.algorithms.numerical import fac, _tri_indices, _triangle, _enum_spherical
+from exatomic.algorithms.numerical import (fac, _tri_indices, _triangle,
+                                           _enum_spherical, _evaluate_gaussians,
+                                           _evaluate_gaussians_separable,
+                                           _evaluate_gaussians_blocks,
+                                           _evaluate_gaussians_diff,
+                                           _screen_blocks)
 
 
 _x, _y, _z = var("_x _y _z")
@@ -247,10 +252,81 @@ def evaluate_expr(expr, xs, ys, zs, arr=None, alpha=None):
     return evaluate(str(expr.subs(subs)))
 
 
+def gaussian_cutoffs(tptr, tpow, tcoef, pptr, alphas, coefs, tol=1e-10):
+    """Radii beyond which contracted Gaussians are smaller than tol.
+
+    The magnitude of a basis function is bounded by
+    T C r^L exp(-a r^2), where a is its smallest exponent, C the sum of
+    absolute contraction coefficients, T the sum of absolute monomial
+    coefficients and L its angular momentum. The cutoff solves
+    a r^2 = ln(T C / tol) + L ln(r) by fixed point iteration.
+
+    Args:
+        tptr (np.ndarray): monomial pointers (nbf + 1) into tpow and tcoef
+        tpow (np.ndarray): (nterm, 3) Cartesian powers of each monomial
+        tcoef (np.ndarray): coefficient of each monomial
+        pptr (np.ndarray): primitive pointers (nbf + 1) into alphas and coefs
+        alphas (np.ndarray): primitive exponents
+        coefs (np.ndarray): normalized contraction coefficients
+        tol (float): magnitude below which basis functions are neglected
+
+    Returns:
+        rcut (np.ndarray): cutoff radius of each basis function
+    """
+    if len(tptr) < 2:
+        return np.empty(0, dtype=np.float64)
+    amin = np.minimum.reduceat(alphas, pptr[:-1])
+    csum = np.add.reduceat(np.abs(coefs), pptr[:-1])
+    tsum = np.add.reduceat(np.abs(tcoef), tptr[:-1])
+    L = np.maximum.reduceat(tpow.sum(axis=1), tptr[:-1])
+    pre = np.log(np.maximum(tsum * csum / tol, 1.))
+    # Beyond r^2 = L / 2a the bound decreases monotonically
+    peak = L / (2 * amin)
+    r2 = np.maximum(pre / amin, peak)
+    for _ in range(8):
+        r2 = np.maximum((pre + 0.5 * L * np.log(np.maximum(r2, 1.))) / amin, peak)
+    return np.sqrt(r2)
+
+
+def _grid_blocks(xs, ys, zs, block):
+    """Bounding boxes of consecutive blocks of grid points."""
+    starts = np.arange(0, len(xs), block)
+    lo = np.column_stack([np.minimum.reduceat(i, starts) for i in (xs, ys, zs)])
+    hi = np.column_stack([np.maximum.reduceat(i, starts) for i in (xs, ys, zs)])
+    return lo.reshape(-1, 3), hi.reshape(-1, 3)
+
+
+def _screened_gaussians(xs, ys, zs, tol, block, centers, tptr, tpow, tcoef,
+                        pptr, alphas, coefs):
+    """Screen and evaluate contracted Gaussians in block-sparse form."""
+    rcut = gaussian_cutoffs(tptr, tpow, tcoef, pptr, alphas, coefs, tol=tol)
+    lo, hi = _grid_blocks(xs, ys, zs, block)
+    bptr, bfns = _screen_blocks(lo, hi, centers, rcut)
+    vals = _evaluate_gaussians_blocks(xs, ys, zs, block, bptr, bfns, centers,
+                                      tptr, tpow, tcoef, pptr, alphas, coefs)
+    return bptr, bfns, vals
+
+
+def _dense_to_blocks(flds, block):
+    """Block-sparse form of dense (nbf, npts) basis function values
+    (with all basis functions kept in every block)."""
+    nbf, npts = flds.shape
+    nblock = -(-npts // block)
+    vals = np.zeros((nbf, nblock * block), dtype=np.float64)
+    vals[:, :npts] = flds
+    vals = vals.reshape(nbf, nblock, block).transpose(1, 0, 2).reshape(-1, block)
+    bptr = np.arange(nblock + 1, dtype=np.int64) * nbf
+    bfns = np.tile(np.arange(nbf, dtype=np.int64), nblock)
+    return bptr, bfns, vals
+
+
 class BasisFunctions(object):
     """Composition wrapper class that leverages symbolic expressions using
     symengine and numexpr, using values extracted from the numerical Shell
     jitclasses, to evaluate basis functions on a numerical grid.
+    Contracted Gaussians are evaluated on a grid directly by a compiled
+    kernel (see :func:`~exatomic.algorithms.numerical._evaluate_gaussians`);
+    symbolic expressions are only built when no grid is given.
 
     Args:
         uni (:class:`exatomic.core.universe.Universe`): a universe with basis set
@@ -279,31 +355,80 @@ class BasisFunctions(object):
         return shl.enum_spherical() if shl.spherical else shl.enum_cartesian()
 
 
-    def evaluate(self, xs=None, ys=None, zs=None, irrep=None, verbose=False):
+    def evaluate(self, xs=None, ys=None, zs=None, irrep=None, verbose=False,
+                 separable=False):
         """Evaluate basis functions on a numerical grid.
 
+        .. code-block:: python
+
+            x, y, z = grid_axes_from_field_params(fps)
+            bvs = uni.basis_functions.evaluate(x, y, z, separable=True)
+
         Args:
             xs (np.ndarray): 1D-array of x values
             ys (np.ndarray): 1D-array of y values
             zs (np.ndarray): 1D-array of z values
             verbose (bool): print code pathway
             irrep (int,OrderedDict): irrep or {irrep: [vectors] for irrep in irreps}
+            separable (bool): xs, ys, zs are the axes of a rectilinear grid (default False)
 
         Note:
             Default behavior returns symbolic expressions if xs is None.
             See :meth:`exatomic.algorithms.orbital_util.numerical_grid_from_field_params`
-            for grid construction details.
+            for grid construction details. If separable, values are
+            returned on the full (x slowest, z fastest) grid.
         """
+        func, numeric = self._evaluator()
+        if separable and not numeric:
+            if verbose: print('Separable evaluation not supported, expanding grid.')
+            xs, ys, zs = (g.ravel() for g in np.meshgrid(xs, ys, zs, indexing='ij'))
+        kws = {'separable': separable} if numeric else {}
+        return func(xs=xs, ys=ys, zs=zs, irrep=irrep, **kws)
+
+
+    def evaluate_screened(self, xs, ys, zs, tol=1e-10, block=128,
+                          irrep=None, verbose=False):
+        """Evaluate basis functions on a numerical grid, skipping blocks
+        of grid points that are farther from a basis function's center
+        than its cutoff radius (where its magnitude is below tol).
+
+        The result is block-sparse: grid points are split into consecutive
+        blocks of size block and, for each block b, the basis functions
+        bfns[bptr[b]:bptr[b + 1]] have values vals[bptr[b]:bptr[b + 1]].
+
+        .. code-block:: python
+
+            bptr, bfns, vals = uni.basis_functions.evaluate_screened(xs, ys, zs)
+
+        Args:
+            xs (np.ndarray): 1D-array of x values
+            ys (np.ndarray): 1D-array of y values
+            zs (np.ndarray): 1D-array of z values
+            tol (float): magnitude below which basis functions are neglected
+            block (int): number of grid points per block
+            irrep (int,OrderedDict): irrep or {irrep: [vectors] for irrep in irreps}
+            verbose (bool): print code pathway
+
+        Returns:
+            bptr, bfns, vals (tuple): block pointers, basis function indices, (len(bfns), block) values
+        """
+        func, numeric = self._evaluator()
+        if numeric:
+            return func(xs=xs, ys=ys, zs=zs, irrep=irrep, tol=tol, block=block)
+        if verbose: print('Screening not supported, evaluating all basis functions.')
+        return _dense_to_blocks(func(xs=xs, ys=ys, zs=zs, irrep=irrep), block)
+
+
+    def _evaluator(self):
+        """The evaluation method of the basis set and whether it has a
+        compiled numerical implementation."""
         if self._meta['gaussian']:
             if self._meta.get('symmetrized', False):
-                func = self._evaluate_gau_bso_sym
-            elif self._meta['program'] in ['molcas']:
-                func = self._evaluate_gau_mag
-            else:
-                func = self._evaluate_gau_bso
-        else:
-            func = self._evaluate_sto
-        return func(xs=xs, ys=ys, zs=zs, irrep=irrep)
+                return self._evaluate_gau_bso_sym, False
+            if self._meta['program'] in ['molcas']:
+                return self._evaluate_gau_mag, True
+            return self._evaluate_gau_bso, True
+        return self._evaluate_sto, False
 
 
     def evaluate_diff(self, xs, ys, zs, cart='x', verbose=False):
@@ -351,6 +476,82 @@ class BasisFunctions(object):
         return sym.subs({_x: _x - x, _y: _y - y, _z: _z - z})
 
 
+    def _monomials(self, *ang):
+        """Cartesian powers and coefficients of the monomials making up
+        the angular portion of a basis function (see :meth:`_angular`)."""
+        if ang in self._terms: return self._terms[ang]
+        if len(ang) == 3:
+            pows, cs = [ang], [1.]
+        elif not ang[0]:
+            pows, cs = [(0, 0, 0)], [float(self._sh[0][ang[1]])]
+        else:
+            L, ml = ang
+            coefs = self._sh[L][ml].expand().as_coefficients_dict()
+            cdxs = [reduce(mul, xyz) for xyz in cwr((_x, _y, _z), L)]
+            pows, cs = [], []
+            for cdx, pw in zip(cdxs, enum_cartesian[L]):
+                coef = float(coefs.get(cdx, 0))
+                if coef:
+                    pows.append(tuple(pw))
+                    cs.append(coef)
+        self._terms[ang] = (np.array(pows, dtype=np.int64).reshape(-1, 3),
+                            np.array(cs, dtype=np.float64))
+        return self._terms[ang]
+
+
+    def _gaussian_arrays(self, funcs):
+        """Flattens basis function specifications into the arrays used by
+        :func:`~exatomic.algorithms.numerical._evaluate_gaussians`.
+
+        Args:
+            funcs (list): (center, alphas, coefs, ang) for each basis function
+        """
+        nbf = len(funcs)
+        centers = np.empty((nbf, 3), dtype=np.float64)
+        tptr = np.zeros(nbf + 1, dtype=np.int64)
+        pptr = np.zeros(nbf + 1, dtype=np.int64)
+        tpow = [np.empty((0, 3), dtype=np.int64)]
+        tcoef = [np.empty(0, dtype=np.float64)]
+        alphas = [np.empty(0, dtype=np.float64)]
+        coefs = [np.empty(0, dtype=np.float64)]
+        for i, (cen, alps, cs, ang) in enumerate(funcs):
+            pows, tcs = self._monomials(*ang)
+            centers[i] = cen
+            tptr[i + 1] = tptr[i] + len(tcs)
+            pptr[i + 1] = pptr[i] + len(alps)
+            tpow.append(pows)
+            tcoef.append(tcs)
+            alphas.append(alps)
+            coefs.append(cs)
+        return (centers, tptr, np.concatenate(tpow), np.concatenate(tcoef),
+                pptr, np.concatenate(alphas).astype(np.float64),
+                np.concatenate(coefs).astype(np.float64))
+
+
+    def _evaluate_numeric(self, funcs, xs, ys, zs, separable=False,
+                          tol=None, block=128):
+        """Evaluates contracted Gaussians numerically in a compiled kernel.
+
+        Args:
+            funcs (list): (center, alphas, coefs, ang) for each basis function (None if cached)
+            xs (np.ndarray): 1D-array of x values
+            ys (np.ndarray): 1D-array of y values
+            zs (np.ndarray): 1D-array of z values
+            separable (bool): xs, ys, zs are the axes of a rectilinear grid
+            tol (float): if not None, screen and return block-sparse values
+            block (int): number of grid points per block if screening
+        """
+        # Basis function arrays do not depend on the grid
+        if self._arrays is None: self._arrays = self._gaussian_arrays(funcs)
+        arrs = self._arrays
+        xs, ys, zs = (np.asarray(i, dtype=np.float64) for i in (xs, ys, zs))
+        if tol is not None:
+            return _screened_gaussians(xs, ys, zs, tol, block, *arrs)
+        if separable:
+            return _evaluate_gaussians_separable(xs, ys, zs, *arrs)
+        return _evaluate_gaussians(xs, ys, zs, *arrs)
+
+
     def _evaluate_gau_bso_sym(self, xs, ys, zs, irrep=None):
         """Evaluates a symmetrized Gaussian basis set and returns a numpy array.
         Currently the implementation only relies on the format most easily
@@ -408,13 +609,14 @@ class BasisFunctions(object):
         return flds
 
 
-    def _evaluate_gau_bso(self, xs, ys, zs, irrep=None):
+    def _evaluate_gau_bso(self, xs, ys, zs, irrep=None, **kws):
         """Evaluates a Gaussian basis set according to the order specified
         by the :class:`~exatomic.core.basis.BasisSetOrder` and returns a
         numpy array of numerical basis function values."""
-        cnt = 0
-        if xs is not None: flds = np.empty((len(self), len(xs)))
-        else: flds = Series([None for _ in range(len(self))])
+        if xs is not None and self._arrays is not None:
+            return self._evaluate_numeric(None, xs, ys, zs, **kws)
+        cnt, funcs = 0, []
+        flds = Series([None for _ in range(len(self))])
         # cache remembers how many contracted functions are used
         # in each instance of Shell so we can access them out of order
         cache = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
@@ -429,14 +631,16 @@ class BasisFunctions(object):
             ax, ay, az = self._xyzs[cen]
             shldx = grps.get_group((cen, L))['shelldx'].values[0]
             ishl = self._shells[shldx]
-            norm = norms[shldx]
-            a = self._angular(ishl, ax, ay, az, L, ml)
-            r = self._radial(ax, ay, az, ishl.alphas,
-                             norm[:,cache[cen][L][ml]])
-            if xs is None: flds[cnt] = a * r
-            else: flds[cnt] = evaluate_expr(a * r, xs, ys, zs)
+            norm = norms[shldx][:,cache[cen][L][ml]]
+            if xs is None:
+                a = self._angular(ishl, ax, ay, az, L, ml)
+                r = self._radial(ax, ay, az, ishl.alphas, norm)
+                flds[cnt] = a * r
+            else: funcs.append(((ax, ay, az), ishl.alphas, norm, (L, ml)))
             cache[cen][L][ml] += 1
             cnt += 1
+        if xs is not None:
+            return self._evaluate_numeric(funcs, xs, ys, zs, **kws)
         return flds
 
 
@@ -463,44 +667,49 @@ class BasisFunctions(object):
         return flds
 
 
-    def _evaluate_gau_mag(self, xs, ys, zs, irrep=None):
+    def _evaluate_gau_mag(self, xs, ys, zs, irrep=None, **kws):
         """Evaluates a Gaussian basis set according to (apparently) only
         Molcas ordering and returns a numpy array."""
-        cnt = 0
-        if xs is not None: flds = np.empty((len(self), len(xs)))
-        else: flds = Series([None for _ in range(len(self))])
+        if xs is not None and self._arrays is not None:
+            return self._evaluate_numeric(None, xs, ys, zs, **kws)
+        cnt, funcs = 0, []
+        flds = Series([None for _ in range(len(self))])
         for _, ax, ay, az, ishl in _iter_atom_shells(self._ptrs, self._xyzs,
                                                      *self._shells):
             norm = ishl.norm_contract()
             for mag in self.enum_shell(ishl):
+                if xs is not None:
+                    funcs.extend(((ax, ay, az), ishl.alphas, norm[:,c], mag)
+                                 for c in range(ishl.ncont))
+                    continue
                 a = self._angular(ishl, ax, ay, az, *mag)
-                if xs is not None: a = evaluate_expr(a, xs, ys, zs)
                 for c in range(ishl.ncont):
                     r = self._radial(ax, ay, az, ishl.alphas, norm[:,c])
-                    if xs is None: flds[cnt] = a * r
-                    else: flds[cnt] = evaluate_expr(r, xs, ys, zs, arr=a)
+                    flds[cnt] = a * r
                     cnt += 1
+        if xs is not None:
+            return self._evaluate_numeric(funcs, xs, ys, zs, **kws)
         return flds
 
 
     def _evaluate_diff_gau(self, xs, ys, zs, cart):
         """Evaluates the derivatives of a full Gaussian basis
         set and returns a numpy array."""
-        cnt, flds = 0, np.empty((len(self), len(xs)))
-        for _, ax, ay, az, ishl in _iter_atom_shells(self._ptrs, self._xyzs,
-                                                     *self._shells):
-            norm = ishl.norm_contract()
-            for mag in self.enum_shell(ishl):
-                a = self._angular(ishl, ax, ay, az, *mag)
-                da = evaluate_expr(diff_expr(a, cart=cart), xs, ys, zs)
-                a = evaluate_expr(a, xs, ys, zs)
-                for c in range(ishl.ncont):
-                    r = self._radial(ax, ay, az, ishl.alphas, norm[:, c])
-                    dr = evaluate_expr(diff_expr(r, cart=cart), xs, ys, zs)
-                    r = evaluate_expr(r, xs, ys, zs)
-                    flds[cnt] = evaluate('da * r + a * dr')
-                    cnt += 1
-        return flds
+        if cart not in ['x', 'y', 'z']:
+            raise ValueError('cart must be in "xyz".')
+        # Basis function arrays (in shell order) do not depend on the grid
+        if self._diff_arrays is None:
+            funcs = []
+            for _, ax, ay, az, ishl in _iter_atom_shells(self._ptrs, self._xyzs,
+                                                         *self._shells):
+                norm = ishl.norm_contract()
+                for mag in self.enum_shell(ishl):
+                    funcs.extend(((ax, ay, az), ishl.alphas, norm[:, c], mag)
+                                 for c in range(ishl.ncont))
+            self._diff_arrays = self._gaussian_arrays(funcs)
+        xs, ys, zs = (np.asarray(i, dtype=np.float64) for i in (xs, ys, zs))
+        return _evaluate_gaussians_diff(xs, ys, zs, 'xyz'.index(cart),
+                                        *self._diff_arrays)
 
 
     def __len__(self):
@@ -538,6 +747,10 @@ class BasisFunctions(object):
             ptmp = sh[1].copy()
             sh[1] = OrderedDict((ml, ptmp[ml]) for ml in (1, -1, 0))
         self._sh = sh
+        # Monomial expansions of angular terms for numerical evaluation
+        self._terms = {}
+        self._arrays = None
+        self._diff_arrays = None
         # Exponential dependence
         self._expnt = _r ** 2
         if not self._meta['gaussian']:
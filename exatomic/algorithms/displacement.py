@@ -7,6 +7,7 @@ Computation of Displacement
 """
 import numpy as np
 import pandas as pd
+from exatomic.algorithms.distance import minimum_image
 
 
 def absolute_squared_displacement(universe, ref_frame=None):
@@ -42,3 +43,190 @@ def absolute_squared_displacement(universe, ref_frame=None):
     df.index = universe.frame.index.copy()
     df.columns = universe.atom['label'].unique()
     return df
+
+
+def _trajectory_order(universe):
+    """
+    Positions (in the atom table) of each atom (label) at each frame.
+
+    Returns:
+        order (array): Atom table positions of shape (nframe, natom)
+        symbols (array): Symbol of each atom (label)
+    """
+    atom = universe.atom
+    if 'label' in atom.columns:
+        labels = atom['label']
+    else:
+        labels = atom.get_atom_labels()
+    frames = atom['frame'].values.astype(np.int64)
+    labels = np.asarray(labels).astype(np.int64)
+    order = np.lexsort((labels, frames))
+    nframe = len(np.unique(frames))
+    if len(order) % nframe != 0:
+        raise ValueError("Every frame must contain the same atoms")
+    order = order.reshape(nframe, -1)
+    symbols = atom['symbol'].values[order[0]]
+    return order, np.asarray(symbols).astype(str)
+
+
+def _chunks(n, chunk):
+    """Slices of at most chunk atoms (all atoms if chunk is None)."""
+    chunk = n if chunk is None else max(1, int(chunk))
+    return [slice(i, min(n, i + chunk)) for i in range(0, n, chunk)]
+
+
+def autocorrelation_fft(x):
+    """
+    Time autocorrelation of vector quantities via the fast Fourier transform.
+
+    .. math::
+
+        C\\left(m\\right) = \\frac{1}{T - m}\\sum_{k=0}^{T-m-1}
+            \\mathbf{x}\\left(k\\right)\\cdot\\mathbf{x}\\left(k + m\\right)
+
+    The signal is zero padded to avoid circular correlation, so the cost is
+    O(T log T) rather than O(T^2).
+
+    Args:
+        x (array): Time series of shape (T, natom, 3)
+
+    Returns:
+        acf (array): Autocorrelation of shape (T, natom)
+    """
+    nt = len(x)
+    n = 2**int(np.ceil(np.log2(2*nt)))
+    fx = np.fft.rfft(x, n=n, axis=0)
+    acf = np.fft.irfft((fx*fx.conj()).real, n=n, axis=0)[:nt].sum(axis=2)
+    return acf/(nt - np.arange(nt))[:, None]
+
+
+def squared_displacement_fft(x):
+    """
+    Mean squared displacement (averaged over all time origins) via the fast
+    Fourier transform.
+
+    .. math::
+
+        MSD\\left(m\\right) = \\frac{1}{T - m}\\sum_{k=0}^{T-m-1}
+            \\left|\\mathbf{x}\\left(k + m\\right) - \\mathbf{x}\\left(k\\right)\\right|^{2}
+
+    The sum is split into squared position terms (computed with cumulative
+    sums) and a position autocorrelation (computed with
+    :func:`~exatomic.algorithms.displacement.autocorrelation_fft`).
+
+    Args:
+        x (array): Unwrapped positions of shape (T, natom, 3)
+
+    Returns:
+        msd (array): Mean squared displacement of shape (T, natom)
+    """
+    nt = len(x)
+    d = (x**2).sum(axis=2)
+    # Running sum of d(k) + d(T - 1 - k) over the first m time origins
+    used = np.zeros_like(d)
+    used[1:] = np.cumsum(d + d[::-1], axis=0)[:-1]
+    s1 = (2*d.sum(axis=0) - used)/(nt - np.arange(nt))[:, None]
+    return s1 - 2*autocorrelation_fft(x)
+
+
+def _species_mean(values, symbols, index):
+    """Mean over atoms of each species (columns sorted by symbol)."""
+    species = np.unique(symbols)
+    return pd.DataFrame({sym: values[:, symbols == sym].mean(axis=1)
+                         for sym in species}, index=index)
+
+
+def mean_squared_displacement(universe, chunk=None):
+    """
+    Compute the per species mean squared displacement as a function of
+    the time lag (in frames), averaged over all time origins.
+
+    .. code-block:: python
+
+        msd = mean_squared_displacement(uni)               # columns per symbol
+        msd = mean_squared_displacement(uni, chunk=1000)   # bounded memory
+
+    Periodic trajectories are unwrapped using the minimum image of the
+    displacement between consecutive frames (using the frame's cell
+    vectors), so atoms may have been wrapped back into the unit cell.
+    The calculation uses the O(T log T) FFT algorithm (see
+    :func:`~exatomic.algorithms.displacement.squared_displacement_fft`) and
+    is vectorized over atoms; chunk limits the number of atoms processed at
+    once.
+
+    Args:
+        universe (:class:`~exatomic.Universe`): The universe containing atomic positions
+        chunk (int): Number of atoms processed at once (default all)
+
+    Returns:
+        msd (:class:`~pandas.DataFrame`): Mean squared displacement per species
+    """
+    order, symbols = _trajectory_order(universe)
+    xyz = universe.atom[['x', 'y', 'z']].values.astype(np.float64)
+    nt, nat = order.shape
+    cells = None
+    if universe.periodic:
+        fdxs = np.unique(universe.atom['frame'].values.astype(np.int64))
+        cells = universe.frame.get_cell_vectors()[universe.frame.index.get_indexer(fdxs)]
+    msd = np.empty((nt, nat), dtype=np.float64)
+    for sl in _chunks(nat, chunk):
+        x = xyz[order[:, sl]]
+        if cells is not None:
+            dx = np.diff(x, axis=0)
+            fcodes = np.repeat(np.arange(1, nt), dx.shape[1])
+            dx = minimum_image(dx.reshape(-1, 3), cells, fcodes).reshape(dx.shape)
+            x[1:] = x[0] + np.cumsum(dx, axis=0)
+        msd[:, sl] = squared_displacement_fft(x)
+    return _species_mean(msd, symbols, pd.Index(np.arange(nt), name='lag'))
+
+
+def velocity_autocorrelation(universe, columns=('vx', 'vy', 'vz'), chunk=None):
+    """
+    Compute the per species velocity autocorrelation function as a function
+    of the time lag (in frames), averaged over all time origins.
+
+    .. code-block:: python
+
+        # Velocities from a cp.x trajectory
+        vel = parse_xyz("cp.vel", symbols, columns=("vx", "vy", "vz"))
+        uni.atom[['vx', 'vy', 'vz']] = vel[['vx', 'vy', 'vz']].values
+        vacf = velocity_autocorrelation(uni)
+
+    Args:
+        universe (:class:`~exatomic.Universe`): The universe containing atomic velocities
+        columns (tuple): Velocity columns of the atom table
+        chunk (int): Number of atoms processed at once (default all)
+
+    Returns:
+        vacf (:class:`~pandas.DataFrame`): Velocity autocorrelation per species
+    """
+    order, symbols = _trajectory_order(universe)
+    vel = universe.atom[list(columns)].values.astype(np.float64)
+    nt, nat = order.shape
+    vacf = np.empty((nt, nat), dtype=np.float64)
+    for sl in _chunks(nat, chunk):
+        vacf[:, sl] = autocorrelation_fft(vel[order[:, sl]])
+    return _species_mean(vacf, symbols, pd.Index(np.arange(nt), name='lag'))
+
+
+def power_spectrum(vacf, dt=1.0):
+    """
+    Compute the power spectrum (vibrational density of states) from a
+    (per species) velocity autocorrelation function.
+
+    The autocorrelation is mirrored to negative time (it is even) and Fourier
+    transformed, giving a real spectrum.
+
+    Args:
+        vacf (:class:`~pandas.DataFrame`): Velocity autocorrelation (see :func:`~exatomic.algorithms.displacement.velocity_autocorrelation`)
+        dt (float): Time between frames
+
+    Returns:
+        spectrum (:class:`~pandas.DataFrame`): Power spectrum as a function of (linear) frequency
+    """
+    c = vacf.values
+    full = np.concatenate((c, c[-2:0:-1]))
+    spectrum = np.fft.rfft(full, axis=0).real*dt
+    freq = np.fft.rfftfreq(len(full), dt)
+    return pd.DataFrame(spectrum, index=pd.Index(freq, name='frequency'),
+                        columns=vacf.columns)
@@ -5,8 +5,10 @@
 Two Body Properties Computations
 #####################################
 """
+from collections import OrderedDict
 import numpy as np
 import numba as nb
+from scipy.spatial import cKDTree
 from exatomic.base import nbtgt, nbpll
 
 
@@ -33,6 +35,68 @@ def modv(x, y):
     return np.mod(x, y)
 
 
+# The single frame kernels below allocate their output exactly: the number of
+# pairs within dmax is counted per row (atom i, pairs j > i) in a first
+# parallel pass, the prefix sum of the counts gives the output offset of each
+# row, and the rows are filled in a second parallel pass (in the same order as
+# a serial double loop). Distance vectors are only stored if the corresponding
+# output arrays are not empty.
+
+
+@nb.jit(nopython=True, nogil=True)
+def _ortho_row(i, ux, uy, uz, a, b, c, dmax2, index, fill, k, dx, dy, dz, dr,
+               ii, jj, projection):
+    """Count (and if fill is true, store) pairs of row i checking all 27 projections."""
+    m = [-1, 0, 1]
+    vector = len(dx) > 0
+    xi = ux[i]
+    yi = uy[i]
+    zi = uz[i]
+    for j in range(i+1, len(ux)):
+        xj = ux[j]
+        yj = uy[j]
+        zj = uz[j]
+        dpr = dmax2
+        inck = False
+        prj = 0
+        # Check all projections of atom i
+        # Note that i, j are in the unit cell so we make a 3x3x3 'supercell'
+        # of i around j
+        # The index of the projections of i go from 0 to 26 (27 projections)
+        # The 13th projection is the unit cell itself.
+        for aa in m:
+            for bb in m:
+                for cc in m:
+                    pxi = xi + aa*a
+                    pyi = yi + bb*b
+                    pzi = zi + cc*c
+                    dpx_ = pxi - xj
+                    dpy_ = pyi - yj
+                    dpz_ = pzi - zj
+                    dpr_ = dpx_**2 + dpy_**2 + dpz_**2
+                    # The second criteria here enforces that prefer the projection
+                    # with the largest value (i.e. 0 = [-1, -1, -1] < 13 = [0, 0, 0]
+                    # < 26 = [1, 1, 1])
+                    # The system sets a fixed preference for the projected positions rather
+                    # than having a random choice.
+                    if dpr_ < dpr:
+                        if fill:
+                            if vector:
+                                dx[k] = dpx_
+                                dy[k] = dpy_
+                                dz[k] = dpz_
+                            dr[k] = np.sqrt(dpr_)
+                            ii[k] = index[i]
+                            jj[k] = index[j]
+                            projection[k] = prj
+                        dpr = dpr_
+                        inck = True
+                    prj += 1
+        if inck:
+            k += 1
+    return k
+
+
 @nb.jit(nopython=True, nogil=True, parallel=nbpll)
 def pdist_ortho(ux, uy, uz, a, b, c, index, dmax=8.0):
     """
@@ -55,10 +119,16 @@ def pdist_ortho(ux, uy, uz, a, b, c, index, dmax=8.0):
         c (float): Unit cell dimension c index (array): Atom indexes
         dmax (float): Maximum distance of interest
     """
-    m = [-1, 0, 1]
     dmax2 = dmax**2
     n = len(ux)
-    nn = n*(n - 1)//2
+    empty = np.empty((0, ), dtype=np.float64)
+    iempty = np.empty((0, ), dtype=np.int64)
+    counts = np.empty((n, ), dtype=np.int64)
+    for i in nb.prange(n):
+        counts[i] = _ortho_row(i, ux, uy, uz, a, b, c, dmax2, index, False, 0,
+                               empty, empty, empty, empty, iempty, iempty, iempty)
+    rowoff = np.cumsum(counts) - counts
+    nn = counts.sum()
     dx = np.empty((nn, ), dtype=np.float64)
     dy = dx.copy()
     dz = dx.copy()
@@ -66,60 +136,9 @@ def pdist_ortho(ux, uy, uz, a, b, c, index, dmax=8.0):
     ii = np.empty((nn, ), dtype=np.int64)
     jj = ii.copy()
     projection = ii.copy()
-    k = 0
-    # For each atom i
-    for i in range(n):
-        xi = ux[i]
-        yi = uy[i]
-        zi = uz[i]
-        # For each atom j
-        for j in range(i+1, n):
-            xj = ux[j]
-            yj = uy[j]
-            zj = uz[j]
-            dpr = dmax2
-            inck = False
-            prj = 0
-            # Check all projections of atom i
-            # Note that i, j are in the unit cell so we make a 3x3x3 'supercell'
-            # of i around j
-            # The index of the projections of i go from 0 to 26 (27 projections)
-            # The 13th projection is the unit cell itself.
-            for aa in m:
-                for bb in m:
-                    for cc in m:
-                        pxi = xi + aa*a
-                        pyi = yi + bb*b
-                        pzi = zi + cc*c
-                        dpx_ = pxi - xj
-                        dpy_ = pyi - yj
-                        dpz_ = pzi - zj
-                        dpr_ = dpx_**2 + dpy_**2 + dpz_**2
-                        # The second criteria here enforces that prefer the projection
-                        # with the largest value (i.e. 0 = [-1, -1, -1] < 13 = [0, 0, 0]
-                        # < 26 = [1, 1, 1])
-                        # The system sets a fixed preference for the projected positions rather
-                        # than having a random choice.
-                        if dpr_ < dpr:
-                            dx[k] = dpx_
-                            dy[k] = dpy_
-                            dz[k] = dpz_
-                            dr[k] = np.sqrt(dpr_)
-                            ii[k] = index[i]
-                            jj[k] = index[j]
-                            projection[k] = prj
-                            dpr = dpr_
-                            inck = True
-                        prj += 1
-            if inck:
-                k += 1
-    dx = dx[:k]
-    dy = dy[:k]
-    dz = dz[:k]
-    dr = dr[:k]
-    ii = ii[:k]
-    jj = jj[:k]
-    projection = projection[:k]
+    for i in nb.prange(n):
+        _ortho_row(i, ux, uy, uz, a, b, c, dmax2, index, True, rowoff[i],
+                   dx, dy, dz, dr, ii, jj, projection)
     return dx, dy, dz, dr, ii, jj, projection
 
 
@@ -145,65 +164,100 @@ def pdist_ortho_nv(ux, uy, uz, a, b, c, index, dmax=8.0):
         c (float): Unit cell dimension c index (array): Atom indexes
         dmax (float): Maximum distance of interest
     """
-    m = [-1, 0, 1]
     dmax2 = dmax**2
     n = len(ux)
-    nn = n*(n - 1)//2
+    empty = np.empty((0, ), dtype=np.float64)
+    iempty = np.empty((0, ), dtype=np.int64)
+    counts = np.empty((n, ), dtype=np.int64)
+    for i in nb.prange(n):
+        counts[i] = _ortho_row(i, ux, uy, uz, a, b, c, dmax2, index, False, 0,
+                               empty, empty, empty, empty, iempty, iempty, iempty)
+    rowoff = np.cumsum(counts) - counts
+    nn = counts.sum()
     dr = np.empty((nn, ), dtype=np.float64)
     ii = np.empty((nn, ), dtype=np.int64)
     jj = ii.copy()
     projection = ii.copy()
-    k = 0
-    # For each atom i
-    for i in range(n):
-        xi = ux[i]
-        yi = uy[i]
-        zi = uz[i]
-        # For each atom j
-        for j in range(i+1, n):
-            xj = ux[j]
-            yj = uy[j]
-            zj = uz[j]
-            dpr = dmax2
-            inck = False
-            prj = 0
-            # Check all projections of atom i
-            # Note that i, j are in the unit cell so we make a 3x3x3 'supercell'
-            # of i around j
-            # The index of the projections of i go from 0 to 26 (27 projections)
-            # The 13th projection is the unit cell itself.
-            for aa in m:
-                for bb in m:
-                    for cc in m:
-                        pxi = xi + aa*a
-                        pyi = yi + bb*b
-                        pzi = zi + cc*c
-                        dpx_ = pxi - xj
-                        dpy_ = pyi - yj
-                        dpz_ = pzi - zj
-                        dpr_ = dpx_**2 + dpy_**2 + dpz_**2
-                        # The second criteria here enforces that prefer the projection
-                        # with the largest value (i.e. 0 = [-1, -1, -1] < 13 = [0, 0, 0]
-                        # < 26 = [1, 1, 1])
-                        # The system sets a fixed preference for the projected positions rather
-                        # than having a random choice.
-                        if dpr_ < dpr:
-                            dr[k] = np.sqrt(dpr_)
-                            ii[k] = index[i]
-                            jj[k] = index[j]
-                            projection[k] = prj
-                            dpr = dpr_
-                            inck = True
-                        prj += 1
-            if inck:
-                k += 1
-    dr = dr[:k]
-    ii = ii[:k]
-    jj = jj[:k]
-    projection = projection[:k]
+    for i in nb.prange(n):
+        _ortho_row(i, ux, uy, uz, a, b, c, dmax2, index, True, rowoff[i],
+                   empty, empty, empty, dr, ii, jj, projection)
     return dr, ii, jj, projection
 
 
+@nb.jit(nopython=True, nogil=True)
+def _ortho_image(dx, a):
+    """
+    Closed-form minimum image of a displacement along one orthorhombic cell
+    vector of length a. Returns the wrapped displacement and the image shift
+    applied to the first body (-1, 0, or 1 for in unit cell bodies).
+    """
+    n = np.floor(dx/a + 0.5)
+    return dx - n*a, -np.int64(n)
+
+
+@nb.jit(nopython=True, nogil=True)
+def _mi_row(i, x, y, z, a, b, c, periodic, dmax2, index, fill, k, dx, dy, dz,
+            dr, ii, jj, projection):
+    """
+    Count (and if fill is true, store) pairs of row i using free boundary
+    conditions or (if periodic) the closed-form orthorhombic minimum image.
+    """
+    vector = len(dx) > 0
+    prjs = len(projection) > 0
+    xi = x[i]
+    yi = y[i]
+    zi = z[i]
+    for j in range(i+1, len(x)):
+        if periodic:
+            dx_, aa = _ortho_image(xi - x[j], a)
+            dy_, bb = _ortho_image(yi - y[j], b)
+            dz_, cc = _ortho_image(zi - z[j], c)
+        else:
+            dx_ = xi - x[j]
+            dy_ = yi - y[j]
+            dz_ = zi - z[j]
+            aa = bb = cc = 0
+        dr2_ = dx_**2 + dy_**2 + dz_**2
+        if dr2_ < dmax2:
+            if fill:
+                if vector:
+                    dx[k] = dx_
+                    dy[k] = dy_
+                    dz[k] = dz_
+                dr[k] = np.sqrt(dr2_)
+                ii[k] = index[i]
+                jj[k] = index[j]
+                if prjs:
+                    # Same enumeration of projections as pdist_ortho
+                    projection[k] = (aa + 1)*9 + (bb + 1)*3 + cc + 1
+            k += 1
+    return k
+
+
+@nb.jit(nopython=True, nogil=True, parallel=nbpll)
+def _mi_count(x, y, z, a, b, c, periodic, dmax, first, last):
+    """First pass: number of pairs of rows first to last."""
+    dmax2 = dmax**2
+    empty = np.empty((0, ), dtype=np.float64)
+    iempty = np.empty((0, ), dtype=np.int64)
+    counts = np.empty((last - first, ), dtype=np.int64)
+    for i in nb.prange(first, last):
+        counts[i-first] = _mi_row(i, x, y, z, a, b, c, periodic, dmax2, iempty,
+                                  False, 0, empty, empty, empty, empty, iempty,
+                                  iempty, iempty)
+    return counts
+
+
+@nb.jit(nopython=True, nogil=True, parallel=nbpll)
+def _mi_fill(x, y, z, a, b, c, periodic, dmax, index, first, last, rowoff,
+             dx, dy, dz, dr, ii, jj, projection):
+    """Second pass: store pairs of rows first to last (rowoff relative to first)."""
+    dmax2 = dmax**2
+    for i in nb.prange(first, last):
+        _mi_row(i, x, y, z, a, b, c, periodic, dmax2, index, True,
+                rowoff[i-first], dx, dy, dz, dr, ii, jj, projection)
+
+
 @nb.jit(nopython=True, nogil=True, parallel=nbpll)
 def pdist(x, y, z, index, dmax=8.0):
     """
@@ -211,39 +265,19 @@ def pdist(x, y, z, index, dmax=8.0):
 
     Does return distance vectors.
     """
-    dmax2 = dmax**2
     m = len(x)
-    n = m*(m - 1)//2
+    counts = _mi_count(x, y, z, 0.0, 0.0, 0.0, False, dmax, 0, m)
+    rowoff = np.cumsum(counts) - counts
+    n = counts.sum()
     dx = np.empty((n, ), dtype=np.float64)
     dy = dx.copy()
     dz = dx.copy()
     dr = dx.copy()
     atom0 = np.empty((n, ), dtype=np.int64)
     atom1 = atom0.copy()
-    k = 0
-    for i in range(m):
-        xi = x[i]
-        yi = y[i]
-        zi = z[i]
-        for j in range(i + 1, m):
-            dx_ = xi - x[j]
-            dy_ = yi - y[j]
-            dz_ = zi - z[j]
-            dr2_ = dx_**2 + dy_**2 + dz_**2
-            if dr2_ < dmax2:
-                dx[k] = dx_
-                dy[k] = dy_
-                dz[k] = dz_
-                dr[k] = np.sqrt(dr2_)
-                atom0[k] = index[i]
-                atom1[k] = index[j]
-                k += 1
-    dx = dx[:k]
-    dy = dy[:k]
-    dz = dz[:k]
-    dr = dr[:k]
-    atom0 = atom0[:k]
-    atom1 = atom1[:k]
+    iempty = np.empty((0, ), dtype=np.int64)
+    _mi_fill(x, y, z, 0.0, 0.0, 0.0, False, dmax, index, 0, m, rowoff,
+             dx, dy, dz, dr, atom0, atom1, iempty)
     return dx, dy, dz, dr, atom0, atom1
 
 
@@ -254,25 +288,876 @@ def pdist_nv(x, y, z, index, dmax=8.0):
 
     Does not return distance vectors.
     """
-    dmax2 = dmax**2
     m = len(x)
-    n = m*(m - 1)//2
+    counts = _mi_count(x, y, z, 0.0, 0.0, 0.0, False, dmax, 0, m)
+    rowoff = np.cumsum(counts) - counts
+    n = counts.sum()
+    empty = np.empty((0, ), dtype=np.float64)
     dr = np.empty((n, ), dtype=np.float64)
     atom0 = np.empty((n, ), dtype=np.int64)
     atom1 = atom0.copy()
-    k = 0
-    for i in range(m):
-        xi = x[i]
-        yi = y[i]
-        zi = z[i]
-        for j in range(i + 1, m):
-            dr_ = (xi - x[j])**2 + (yi - y[j])**2 + (zi - z[j])**2
-            if dr_ < dmax2:
-                dr[k] = np.sqrt(dr_)
-                atom0[k] = index[i]
-                atom1[k] = index[j]
-                k += 1
-    dr = dr[:k]
-    atom0 = atom0[:k]
-    atom1 = atom1[:k]
+    _mi_fill(x, y, z, 0.0, 0.0, 0.0, False, dmax, index, 0, m, rowoff,
+             empty, empty, empty, dr, atom0, atom1, empty.astype(np.int64))
+    return dr, atom0, atom1
+
+
+def minimum_image(dxyz, cells, fcodes):
+    """
+    Minimum image of displacements in (per frame) periodic cells.
+
+    .. code-block:: python
+
+        cells = uni.frame.get_cell_vectors()
+        fcodes = uni.frame.index.get_indexer(uni.atom['frame'])
+        dxyz = minimum_image(xyz - ref, cells, fcodes)
+
+    Args:
+        dxyz (array): Displacements (shape (n, 3))
+        cells (array): Cell vectors (rows) per frame (shape (nframe, 3, 3))
+        fcodes (array): Frame (position in cells) of each displacement
+
+    Returns:
+        dxyz (array): Minimum image displacements
+    """
+    if np.allclose(cells, cells[0]):
+        frac = np.dot(dxyz, np.linalg.inv(cells[0]))
+        frac -= np.round(frac)
+        return np.dot(frac, cells[0])
+    frac = np.einsum('ij,ijk->ik', dxyz, np.linalg.inv(cells)[fcodes])
+    frac -= np.round(frac)
+    return np.einsum('ij,ijk->ik', frac, cells[fcodes])
+
+
+def pdist_kdtree(x, y, z, index, dmax=8.0, vector=True):
+    """
+    Pairwise distance computation for points in cartesian space using a
+    k-d tree (:class:`~scipy.spatial.cKDTree`).
+
+    Well suited to large, sparse, free boundary systems (e.g. proteins and
+    nanoparticle clusters). Results (including the order of pairs) are
+    identical to those of :func:`~exatomic.algorithms.distance.pdist`.
+
+    Args:
+        x (array): Array of x coordinates
+        y (array): Array of y coordinates
+        z (array): Array of z coordinates
+        index (array): Atom indexes
+        dmax (float): Maximum distance of interest
+        vector (bool): Return distance vector components as well
+
+    Returns:
+        dx, dy, dz, dr, atom0, atom1 (array): Two body data (dr, atom0, atom1 if not vector)
+    """
+    xyz = np.column_stack((x, y, z)).astype(np.float64)
+    index = np.asarray(index, dtype=np.int64)
+    if len(xyz) > 1:
+        pairs = cKDTree(xyz).query_pairs(dmax, output_type="ndarray")
+    else:
+        pairs = np.empty((0, 2), dtype=np.int64)
+    ii = pairs[:, 0].astype(np.int64)
+    jj = pairs[:, 1].astype(np.int64)
+    order = np.lexsort((jj, ii))
+    ii = ii[order]
+    jj = jj[order]
+    dxyz = xyz[ii] - xyz[jj]
+    dr = np.sqrt((dxyz**2).sum(axis=1))
+    # query_pairs includes pairs at exactly dmax
+    keep = dr < dmax
+    dr = dr[keep]
+    atom0 = index[ii[keep]]
+    atom1 = index[jj[keep]]
+    if vector:
+        dxyz = dxyz[keep]
+        return (dxyz[:, 0].copy(), dxyz[:, 1].copy(), dxyz[:, 2].copy(), dr,
+                atom0, atom1)
     return dr, atom0, atom1
+
+
+def pdist_chunks(x, y, z, index, dmax=8.0, a=0.0, b=0.0, c=0.0, vector=True,
+                 chunksize=2**22):
+    """
+    Pairwise distance computation yielding results in chunks of rows.
+
+    Pairs per row (atom i, pairs j > i) are counted first and consecutive
+    rows are grouped such that each chunk holds about chunksize pairs (at
+    least one row). Each chunk is computed and yielded in turn so that peak
+    memory is proportional to the chunk size rather than the total number
+    of pairs. If a, b, and c are given (positive), points are treated as
+    being in an orthorhombic periodic cell (closed-form minimum image, with
+    projections enumerated as in :func:`~exatomic.algorithms.distance.pdist_ortho`).
+
+    .. code-block:: python
+
+        for values in pdist_chunks(x, y, z, index, dmax=6.0):
+            store.append("atom_two", pd.DataFrame.from_dict(values))
+
+    Args:
+        x (array): Array of x coordinates
+        y (array): Array of y coordinates
+        z (array): Array of z coordinates
+        index (array): Atom indexes
+        dmax (float): Maximum distance of interest
+        a (float): Orthorhombic cell dimension a (0 for free boundary)
+        b (float): Orthorhombic cell dimension b (0 for free boundary)
+        c (float): Orthorhombic cell dimension c (0 for free boundary)
+        vector (bool): Return distance vector components as well
+        chunksize (int): Approximate number of pairs per chunk
+
+    Yields:
+        values (dict): Two body data (projection only for periodic cells)
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    z = np.ascontiguousarray(z, dtype=np.float64)
+    index = np.ascontiguousarray(index, dtype=np.int64)
+    periodic = a > 0.0 and b > 0.0 and c > 0.0
+    n = len(x)
+    counts = _mi_count(x, y, z, a, b, c, periodic, dmax, 0, n)
+    total = np.cumsum(counts)
+    first = 0
+    while first < n:
+        base = total[first] - counts[first]
+        last = max(first + 1, np.searchsorted(total, base + chunksize, side="right"))
+        last = min(last, n)
+        cnt = counts[first:last]
+        rowoff = np.cumsum(cnt) - cnt
+        nn = cnt.sum()
+        nv = nn if vector else 0
+        dx = np.empty((nv, ), dtype=np.float64)
+        dy = np.empty((nv, ), dtype=np.float64)
+        dz = np.empty((nv, ), dtype=np.float64)
+        dr = np.empty((nn, ), dtype=np.float64)
+        atom0 = np.empty((nn, ), dtype=np.int64)
+        atom1 = np.empty((nn, ), dtype=np.int64)
+        projection = np.empty((nn if periodic else 0, ), dtype=np.int64)
+        _mi_fill(x, y, z, a, b, c, periodic, dmax, index, first, last, rowoff,
+                 dx, dy, dz, dr, atom0, atom1, projection)
+        values = OrderedDict()
+        if vector:
+            values['dx'] = dx
+            values['dy'] = dy
+            values['dz'] = dz
+        values['dr'] = dr
+        values['atom0'] = atom0
+        values['atom1'] = atom1
+        if periodic:
+            values['projection'] = projection
+        yield values
+        first = last
+
+
+###################################################
+# Frame parallel (CSR) two body computation engine #
+###################################################
+# Atoms of all frames are stored contiguously with frame boundaries given by
+# ``offsets`` (CSR style: atoms of frame f are offsets[f] to offsets[f+1]).
+# The type of boundary conditions is given by ``kind``: 0 for free boundary
+# conditions, 1 for orthorhombic periodic cells, and 2 for general (triclinic)
+# periodic cells; periodic cells are given per frame as 3x3 arrays whose rows
+# are the cell vectors a, b, and c.
+# Pairs are found by a linked-cell (binned) search within each frame (bins no
+# narrower than dmax, periodic cells are binned in fractional space); a brute
+# force search is simply a single bin per frame. The number of pairs per atom
+# (row) is counted in a first parallel pass and the exact-size output is
+# filled in a second parallel pass using the prefix sum of the counts.
+
+
+def boundary_kind(universe):
+    """
+    Type of boundary conditions of a universe, as used by the frame parallel
+    two body functions.
+
+    Args:
+        universe (:class:`~exatomic.core.universe.Universe`): A universe
+
+    Returns:
+        kind (int): 0 for free boundary, 1 for orthorhombic, 2 for triclinic cells
+    """
+    if not universe.periodic:
+        return 0
+    return 1 if universe.orthorhombic else 2
+
+
+def frame_arrays(universe, kind, *extra):
+    """
+    Atom coordinates (stably) sorted by frame, frame boundaries (offsets),
+    and per frame cell vectors (if periodic). Additional per atom arrays
+    (extra) are sorted in the same way and returned at the end.
+
+    Args:
+        universe (:class:`~exatomic.core.universe.Universe`): A universe
+        kind (int): Boundary conditions (see :func:`~exatomic.algorithms.distance.boundary_kind`)
+        extra: Additional per atom arrays (in the order of the atom table)
+
+    Returns:
+        x, y, z, index, offsets, cells, *extra: Arrays for :func:`~exatomic.algorithms.distance.frame_bins`
+    """
+    atom = universe.atom
+    frames = atom['frame'].values.astype(np.int64)
+    order = np.argsort(frames, kind="mergesort")
+    fdxs, counts = np.unique(frames[order], return_counts=True)
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    cells = None
+    if kind > 0:
+        cells = universe.frame.get_cell_vectors()
+        cells = cells[universe.frame.index.get_indexer(fdxs)]
+    return (atom['x'].values.astype(float)[order],
+            atom['y'].values.astype(float)[order],
+            atom['z'].values.astype(float)[order],
+            atom.index.values.astype(int)[order], offsets, cells) + \
+        tuple(np.asarray(arr)[order] for arr in extra)
+
+
+@nb.jit(nopython=True, nogil=True)
+def _cell_widths(cell):
+    """Perpendicular widths of a cell whose rows are the cell vectors."""
+    vol = np.abs(np.linalg.det(cell))
+    width = np.empty((3, ), dtype=np.float64)
+    for d in range(3):
+        e = cell[(d + 1) % 3]
+        f = cell[(d + 2) % 3]
+        cx = e[1]*f[2] - e[2]*f[1]
+        cy = e[2]*f[0] - e[0]*f[2]
+        cz = e[0]*f[1] - e[1]*f[0]
+        width[d] = vol/np.sqrt(cx**2 + cy**2 + cz**2)
+    return width
+
+
+@nb.jit(nopython=True, nogil=True)
+def _bin_shape(ext, rc, periodic, n):
+    """Number of bins (no narrower than rc) in each dimension."""
+    nbins = np.empty((3, ), dtype=np.int64)
+    for d in range(3):
+        nbins[d] = max(1, np.int64(ext[d]/rc))
+    if not periodic:
+        # Sparse clusters should not produce (many) more bins than points
+        while nbins[0]*nbins[1]*nbins[2] > 8*n + 27:
+            for d in range(3):
+                nbins[d] = max(1, nbins[d]//2)
+    return nbins
+
+
+@nb.jit(nopython=True, nogil=True)
+def cell_neighbors(bn, nbins, periodic):
+    """
+    Return the (unique) bins neighboring (and including) bin bn.
+
+    Args:
+        bn (int): Bin index
+        nbins (array): Number of bins in each dimension
+        periodic (bool): Wrap bins around the cell boundary
+    """
+    bz = bn % nbins[2]
+    by = (bn//nbins[2]) % nbins[1]
+    bx = bn//(nbins[1]*nbins[2])
+    b = (bx, by, bz)
+    nbr = np.empty((27, ), dtype=np.int64)
+    idx = np.empty((3, 3), dtype=np.int64)
+    num = np.zeros((3, ), dtype=np.int64)
+    for d in range(3):
+        if periodic and nbins[d] < 3:
+            # Every bin is a neighbor, avoid visiting a bin twice
+            for k in range(nbins[d]):
+                idx[d, num[d]] = k
+                num[d] += 1
+        else:
+            for off in (-1, 0, 1):
+                k = b[d] + off
+                if periodic:
+                    k = k % nbins[d]
+                elif k < 0 or k >= nbins[d]:
+                    continue
+                idx[d, num[d]] = k
+                num[d] += 1
+    m = 0
+    for i in range(num[0]):
+        for j in range(num[1]):
+            for k in range(num[2]):
+                nbr[m] = (idx[0, i]*nbins[1] + idx[1, j])*nbins[2] + idx[2, k]
+                m += 1
+    return nbr[:m]
+
+
+@nb.jit(nopython=True, nogil=True, parallel=nbpll)
+def frame_bins(x, y, z, offsets, cells, kind, dmax, linked):
+    """
+    Compute the (per frame) coordinates used for pair computation and sort
+    atoms into bins.
+
+    For periodic cells, coordinates are converted to fractional (in unit
+    cell) coordinates. If linked is false, each frame has a single bin.
+
+    Args:
+        x, y, z, offsets, cells: Arrays from :func:`~exatomic.algorithms.distance.frame_arrays`
+        kind (int): 0 for free boundary, 1 for orthorhombic, 2 for triclinic cells
+        dmax (float): Maximum distance of interest (minimum bin width)
+        linked (bool): Bin atoms (linked-cell search) or use a single bin per frame
+
+    Returns:
+        u0, u1, u2 (array): Cartesian (free) or fractional (periodic) coordinates
+        rin2 (array): Squared radius of the sphere inscribed in each cell
+        nbins (array): Number of bins in each dimension of each frame
+        binoff (array): Offset of each frame's bins
+        binof (array): Bin of each atom
+        order (array): Atoms sorted by bin
+        start (array): Offsets of each bin in order (CSR style)
+    """
+    n = len(x)
+    nf = len(offsets) - 1
+    u0 = np.empty((n, ), dtype=np.float64)
+    u1 = u0.copy()
+    u2 = u0.copy()
+    lo = np.zeros((nf, 3), dtype=np.float64)
+    scale = np.ones((nf, 3), dtype=np.float64)
+    width = np.ones((nf, 3), dtype=np.float64)
+    nbins = np.ones((nf, 3), dtype=np.int64)
+    rin2 = np.zeros((nf, ), dtype=np.float64)
+    for f in nb.prange(nf):
+        first = offsets[f]
+        last = offsets[f+1]
+        ext = np.zeros((3, ), dtype=np.float64)
+        if kind == 0:
+            for i in range(first, last):
+                u0[i] = x[i]
+                u1[i] = y[i]
+                u2[i] = z[i]
+            if last > first:
+                lo[f, 0] = u0[first:last].min()
+                lo[f, 1] = u1[first:last].min()
+                lo[f, 2] = u2[first:last].min()
+                ext[0] = u0[first:last].max() - lo[f, 0]
+                ext[1] = u1[first:last].max() - lo[f, 1]
+                ext[2] = u2[first:last].max() - lo[f, 2]
+        else:
+            cell = cells[f]
+            if kind == 1:
+                inv = np.zeros((3, 3), dtype=np.float64)
+                for d in range(3):
+                    inv[d, d] = 1.0/cell[d, d]
+            else:
+                inv = np.linalg.inv(cell)
+            w = _cell_widths(cell)
+            for i in range(first, last):
+                s0 = x[i]*inv[0, 0] + y[i]*inv[1, 0] + z[i]*inv[2, 0]
+                s1 = x[i]*inv[0, 1] + y[i]*inv[1, 1] + z[i]*inv[2, 1]
+                s2 = x[i]*inv[0, 2] + y[i]*inv[1, 2] + z[i]*inv[2, 2]
+                u0[i] = s0 - np.floor(s0)
+                u1[i] = s1 - np.floor(s1)
+                u2[i] = s2 - np.floor(s2)
+            for d in range(3):
+                scale[f, d] = w[d]
+                ext[d] = w[d]
+            rin2[f] = (w.min()/2)**2
+        if linked:
+            nbins[f] = _bin_shape(ext, dmax, kind > 0, last - first)
+        for d in range(3):
+            if ext[d] > 0.0:
+                width[f, d] = ext[d]/nbins[f, d]
+    nbin = nbins[:, 0]*nbins[:, 1]*nbins[:, 2]
+    binoff = np.zeros((nf + 1, ), dtype=np.int64)
+    binoff[1:] = np.cumsum(nbin)
+    binof = np.empty((n, ), dtype=np.int64)
+    order = np.empty((n, ), dtype=np.int64)
+    start = np.empty((binoff[nf] + 1, ), dtype=np.int64)
+    for f in nb.prange(nf):
+        first = offsets[f]
+        cnt = np.zeros((nbin[f] + 1, ), dtype=np.int64)
+        for i in range(first, offsets[f+1]):
+            b0 = min(nbins[f, 0] - 1, np.int64((u0[i]*scale[f, 0] - lo[f, 0])/width[f, 0]))
+            b1 = min(nbins[f, 1] - 1, np.int64((u1[i]*scale[f, 1] - lo[f, 1])/width[f, 1]))
+            b2 = min(nbins[f, 2] - 1, np.int64((u2[i]*scale[f, 2] - lo[f, 2])/width[f, 2]))
+            bn = (b0*nbins[f, 1] + b1)*nbins[f, 2] + b2
+            binof[i] = binoff[f] + bn
+            cnt[bn + 1] += 1
+        cnt = np.cumsum(cnt)
+        for bn in range(nbin[f]):
+            start[binoff[f] + bn] = first + cnt[bn]
+        for i in range(first, offsets[f+1]):
+            bn = binof[i] - binoff[f]
+            order[first + cnt[bn]] = i
+            cnt[bn] += 1
+    start[binoff[nf]] = n
+    return u0, u1, u2, rin2, nbins, binoff, binof, order, start
+
+
+@nb.jit(nopython=True, nogil=True)
+def pair_displacement(u0, u1, u2, i, j, kind, cell, dmax2, rin2):
+    """
+    Displacement (i - j), squared distance, and projection of a pair.
+
+    For periodic cells, the minimum image is obtained in closed form by
+    rounding the fractional displacement and the projection index (the image
+    of atom i, 0 to 26, see :func:`~exatomic.algorithms.distance.pdist_ortho`)
+    follows from the rounding. For triclinic cells that are small (or strongly
+    skewed) relative to the cutoff, rounding is not guaranteed to give the
+    minimum image; only then are all 27 projections checked explicitly.
+
+    Args:
+        u0, u1, u2 (array): Coordinates from :func:`~exatomic.algorithms.distance.frame_bins`
+        i, j (int): Atoms of the pair
+        kind (int): 0 for free boundary, 1 for orthorhombic, 2 for triclinic cells
+        cell (array): Cell vectors (rows) of the frame
+        dmax2 (float): Squared maximum distance of interest
+        rin2 (float): Squared radius of the sphere inscribed in the cell
+
+    Returns:
+        dx, dy, dz, dr2, prj: Displacement, squared distance, and projection
+    """
+    if kind == 0:
+        dx = u0[i] - u0[j]
+        dy = u1[i] - u1[j]
+        dz = u2[i] - u2[j]
+        return dx, dy, dz, dx**2 + dy**2 + dz**2, 13
+    s0 = u0[i] - u0[j]
+    s1 = u1[i] - u1[j]
+    s2 = u2[i] - u2[j]
+    aa = -np.int64(np.floor(s0 + 0.5))
+    bb = -np.int64(np.floor(s1 + 0.5))
+    cc = -np.int64(np.floor(s2 + 0.5))
+    t0 = s0 + aa
+    t1 = s1 + bb
+    t2 = s2 + cc
+    if kind == 1:
+        dx = t0*cell[0, 0]
+        dy = t1*cell[1, 1]
+        dz = t2*cell[2, 2]
+        return dx, dy, dz, dx**2 + dy**2 + dz**2, (aa + 1)*9 + (bb + 1)*3 + cc + 1
+    dx = t0*cell[0, 0] + t1*cell[1, 0] + t2*cell[2, 0]
+    dy = t0*cell[0, 1] + t1*cell[1, 1] + t2*cell[2, 1]
+    dz = t0*cell[0, 2] + t1*cell[1, 2] + t2*cell[2, 2]
+    dr2 = dx**2 + dy**2 + dz**2
+    if dr2 > rin2 and dmax2 > rin2:
+        dr2 = np.inf
+        for pa in range(-1, 2):
+            for pb in range(-1, 2):
+                for pc in range(-1, 2):
+                    t0 = s0 + pa
+                    t1 = s1 + pb
+                    t2 = s2 + pc
+                    px = t0*cell[0, 0] + t1*cell[1, 0] + t2*cell[2, 0]
+                    py = t0*cell[0, 1] + t1*cell[1, 1] + t2*cell[2, 1]
+                    pz = t0*cell[0, 2] + t1*cell[1, 2] + t2*cell[2, 2]
+                    pr2 = px**2 + py**2 + pz**2
+                    if pr2 < dr2:
+                        dx, dy, dz, dr2 = px, py, pz, pr2
+                        aa, bb, cc = pa, pb, pc
+    return dx, dy, dz, dr2, (aa + 1)*9 + (bb + 1)*3 + cc + 1
+
+
+@nb.jit(nopython=True, nogil=True)
+def _row(i, f, u0, u1, u2, kind, cells, dmax2, rin2, radius, extra, nbins,
+         binoff, binof, order, start, index, fill, k, dx, dy, dz, dr, atom0,
+         atom1, projection):
+    """
+    Count (and if fill is true, store starting at k) the pairs (i, j > i)
+    within the cutoff. Distance vectors and projections are only stored if
+    the corresponding arrays are not empty. If (per atom) radii are given,
+    only bonded pairs (distance no larger than the sum of radii plus extra)
+    are counted.
+    """
+    periodic = kind > 0
+    bonded = len(radius) > 0
+    vector = len(dx) > 0
+    prjs = len(projection) > 0
+    cell = cells[f]
+    m = 0
+    for bn in cell_neighbors(binof[i] - binoff[f], nbins[f], periodic):
+        for p in range(start[binoff[f] + bn], start[binoff[f] + bn + 1]):
+            j = order[p]
+            if j > i:
+                dx_, dy_, dz_, dr2_, prj = pair_displacement(
+                    u0, u1, u2, i, j, kind, cell, dmax2, rin2[f])
+                if dr2_ < dmax2:
+                    if bonded and np.sqrt(dr2_) > radius[i] + radius[j] + extra:
+                        continue
+                    if fill:
+                        h = k + m
+                        dr[h] = np.sqrt(dr2_)
+                        atom0[h] = index[i]
+                        atom1[h] = index[j]
+                        if vector:
+                            dx[h] = dx_
+                            dy[h] = dy_
+                            dz[h] = dz_
+                        if prjs:
+                            projection[h] = prj
+                    m += 1
+    return m
+
+
+@nb.jit(nopython=True, nogil=True, parallel=nbpll)
+def _frame_count(frame, u0, u1, u2, kind, cells, dmax, rin2, radius, extra,
+                 nbins, binoff, binof, order, start):
+    """First pass: number of pairs per atom (row)."""
+    n = len(u0)
+    dmax2 = dmax**2
+    counts = np.empty((n, ), dtype=np.int64)
+    empty = np.empty((0, ), dtype=np.float64)
+    iempty = np.empty((0, ), dtype=np.int64)
+    for i in nb.prange(n):
+        counts[i] = _row(i, frame[i], u0, u1, u2, kind, cells, dmax2, rin2,
+                         radius, extra, nbins, binoff, binof, order, start,
+                         iempty, False, 0, empty, empty, empty, empty, iempty,
+                         iempty, iempty)
+    return counts
+
+
+@nb.jit(nopython=True, nogil=True, parallel=nbpll)
+def _frame_fill(frame, u0, u1, u2, kind, cells, dmax, rin2, radius, extra,
+                nbins, binoff, binof, order, start, index, rowoff, dx, dy, dz,
+                dr, atom0, atom1, projection):
+    """Second pass: store pairs in the (preallocated) output arrays."""
+    dmax2 = dmax**2
+    for i in nb.prange(len(u0)):
+        _row(i, frame[i], u0, u1, u2, kind, cells, dmax2, rin2, radius, extra,
+             nbins, binoff, binof, order, start, index, True, rowoff[i], dx,
+             dy, dz, dr, atom0, atom1, projection)
+
+
+def two_dtypes(compact=False):
+    """
+    Data types of the distance, atom index, and projection columns of
+    two body data.
+
+    Compact data types (float32 distances, int32 atom indexes, and int8
+    projections) halve the memory of two body tables.
+
+    Args:
+        compact (bool): Use compact data types
+
+    Returns:
+        fdtype, idtype, pdtype: Distance, atom index, and projection data types
+    """
+    if compact:
+        return np.float32, np.int32, np.int8
+    return np.float64, np.int64, np.int64
+
+
+def _check_compact(index, compact):
+    """Atom indexes must fit the compact (int32) data type."""
+    if compact and len(index) > 0:
+        info = np.iinfo(np.int32)
+        if index.min() < info.min or index.max() > info.max:
+            raise ValueError("Atom index out of range for compact (int32) storage")
+
+
+def pdist_frames(x, y, z, index, offsets, cells=None, kind=0, dmax=8.0,
+                 method="cell", vector=True, radius=None, bond_extra=0.45,
+                 compact=False):
+    """
+    Pairwise distance computation for many frames at once.
+
+    Atoms (rows) of all frames are processed in parallel: pairs within
+    dmax are counted per atom in a first pass and written directly into
+    exact-size output arrays in a second pass (prefix sums of the counts
+    give each atom's, and hence each frame's, output slice).
+
+    .. code-block:: python
+
+        # Two frames of 10 and 12 atoms respectively
+        offsets = np.array([0, 10, 22])
+        values = pdist_frames(x, y, z, index, offsets, dmax=6.0)
+        # Only bonded pairs, given per atom covalent radii
+        bonds = pdist_frames(x, y, z, index, offsets, radius=radius)
+
+    Args:
+        x (array): Array of x coordinates (contiguous by frame)
+        y (array): Array of y coordinates (contiguous by frame)
+        z (array): Array of z coordinates (contiguous by frame)
+        index (array): Atom indexes
+        offsets (array): Frame boundaries (length number of frames + 1)
+        cells (array): Periodic cell vectors (rows) per frame (shape (nframe, 3, 3))
+        kind (int): 0 for free boundary, 1 for orthorhombic, 2 for triclinic cells
+        dmax (float): Maximum distance of interest
+        method (str): Linked-cell ("cell") or all pairs ("brute") search
+        vector (bool): Return distance vector components as well
+        radius (array): Per atom (covalent) radii, if given only bonds are returned
+        bond_extra (float): Additional amount for determining bonds
+        compact (bool): Use compact data types (see :func:`~exatomic.algorithms.distance.two_dtypes`)
+
+    Returns:
+        values (dict): Two body data (projection only for periodic cells)
+
+    Note:
+        A pair is bonded if its distance is no larger than the sum of the
+        radii plus bond_extra (see :func:`~exatomic.core.two._compute_bonds`).
+        Bonded pairs are found and stored directly, without computing the
+        full distance table first; dmax is reduced to the largest possible
+        bond length.
+    """
+    if radius is None:
+        radius = np.empty((0, ), dtype=np.float64)
+    else:
+        radius = np.ascontiguousarray(radius, dtype=np.float64)
+        if len(radius) > 0:
+            dmax = min(dmax, 2*radius.max() + bond_extra + 1e-8)
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    z = np.ascontiguousarray(z, dtype=np.float64)
+    index = np.ascontiguousarray(index, dtype=np.int64)
+    _check_compact(index, compact)
+    fdtype, idtype, pdtype = two_dtypes(compact)
+    offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+    nf = len(offsets) - 1
+    if cells is None or kind == 0:
+        cells = np.zeros((nf, 3, 3), dtype=np.float64)
+    cells = np.ascontiguousarray(cells, dtype=np.float64).reshape(nf, 3, 3)
+    frame = np.repeat(np.arange(nf, dtype=np.int64), np.diff(offsets))
+    u0, u1, u2, rin2, nbins, binoff, binof, order, start = frame_bins(
+        x, y, z, offsets, cells, kind, dmax, method == "cell")
+    grid = (u0, u1, u2, kind, cells, dmax, rin2, radius, bond_extra, nbins,
+            binoff, binof, order, start)
+    counts = _frame_count(frame, *grid)
+    rowoff = np.cumsum(counts) - counts
+    nn = counts.sum()
+    nv = nn if vector else 0
+    dx = np.empty((nv, ), dtype=fdtype)
+    dy = np.empty((nv, ), dtype=fdtype)
+    dz = np.empty((nv, ), dtype=fdtype)
+    dr = np.empty((nn, ), dtype=fdtype)
+    atom0 = np.empty((nn, ), dtype=idtype)
+    atom1 = np.empty((nn, ), dtype=idtype)
+    projection = np.empty((nn if kind > 0 else 0, ), dtype=pdtype)
+    args = (frame, ) + grid + (index, rowoff, dx, dy, dz, dr, atom0, atom1,
+                               projection)
+    _frame_fill(*args)
+    values = OrderedDict()
+    if vector:
+        values['dx'] = dx
+        values['dy'] = dy
+        values['dz'] = dz
+    values['dr'] = dr
+    values['atom0'] = atom0
+    values['atom1'] = atom1
+    if kind > 0:
+        values['projection'] = projection
+    return values
+
+
+def _single_frame(x, y, z, index, dmax, cell, kind, vector):
+    """Helper to run the frame parallel engine on a single frame."""
+    values = pdist_frames(x, y, z, index, np.array([0, len(x)]),
+                          cell.reshape(1, 3, 3), kind, dmax, "cell", vector)
+    if 'projection' not in values:
+        values['projection'] = np.full((len(values['dr']), ), 13, dtype=np.int64)
+    return tuple(values.values())
+
+
+def pdist_cell(x, y, z, index, dmax=8.0, a=0.0, b=0.0, c=0.0):
+    """
+    Pairwise distance computation using a linked-cell (binned) neighbor search.
+
+    Only pairs of points in neighboring bins are visited and the output is
+    sized exactly from a counting pass so that time and memory scale with the
+    number of points (and pairs within dmax) rather than the number of all
+    possible pairs. If a, b, and c are given (positive), points are treated as
+    being in an orthorhombic periodic cell (see
+    :func:`~exatomic.algorithms.distance.pdist_ortho`) and minimum image
+    distances are computed.
+
+    Does return distance vectors.
+
+    Args:
+        x (array): Array of x coordinates
+        y (array): Array of y coordinates
+        z (array): Array of z coordinates
+        index (array): Atom indexes
+        dmax (float): Maximum distance of interest
+        a (float): Orthorhombic cell dimension a (0 for free boundary)
+        b (float): Orthorhombic cell dimension b (0 for free boundary)
+        c (float): Orthorhombic cell dimension c (0 for free boundary)
+
+    Returns:
+        dx, dy, dz, dr, atom0, atom1, projection (array): Two body data
+    """
+    kind = 1 if a > 0.0 and b > 0.0 and c > 0.0 else 0
+    return _single_frame(x, y, z, index, dmax, np.diag([a, b, c]), kind, True)
+
+
+def pdist_cell_nv(x, y, z, index, dmax=8.0, a=0.0, b=0.0, c=0.0):
+    """
+    Pairwise distance computation using a linked-cell (binned) neighbor search.
+
+    Does not return distance vectors.
+
+    See Also:
+        :func:`~exatomic.algorithms.distance.pdist_cell`
+    """
+    kind = 1 if a > 0.0 and b > 0.0 and c > 0.0 else 0
+    return _single_frame(x, y, z, index, dmax, np.diag([a, b, c]), kind, False)
+
+
+def pdist_tric(x, y, z, cell, index, dmax=8.0):
+    """
+    Pairwise two body calculation for bodies in a general (triclinic)
+    periodic cell.
+
+    Does return distance vectors.
+
+    The cell is given as a 3x3 array whose rows are the cell vectors a, b,
+    and c (i.e. the ``xi, yi, zi``, ``xj, yj, zj``, ``xk, yk, zk`` columns
+    of the :class:`~exatomic.core.frame.Frame`). Positions are mapped to
+    fractional coordinates in the unit cell, candidate pairs are found
+    using a linked-cell search, and minimum image displacements are computed
+    in closed form. The projection index has the same meaning as in
+    :func:`~exatomic.algorithms.distance.pdist_ortho` (the image of atom i,
+    0 to 26, with 13 being the unit cell itself).
+
+    Args:
+        x (array): Array of x coordinates
+        y (array): Array of y coordinates
+        z (array): Array of z coordinates
+        cell (array): 3x3 array of cell vectors (rows)
+        index (array): Atom indexes
+        dmax (float): Maximum distance of interest
+
+    Returns:
+        dx, dy, dz, dr, atom0, atom1, projection (array): Two body data
+    """
+    return _single_frame(x, y, z, index, dmax, np.asarray(cell), 2, True)
+
+
+def pdist_tric_nv(x, y, z, cell, index, dmax=8.0):
+    """
+    Pairwise two body calculation for bodies in a general (triclinic)
+    periodic cell.
+
+    Does not return distance vectors.
+
+    See Also:
+        :func:`~exatomic.algorithms.distance.pdist_tric`
+    """
+    return _single_frame(x, y, z, index, dmax, np.asarray(cell), 2, False)
+
+
+@nb.jit(nopython=True, nogil=True, parallel=nbpll)
+def _verlet_pairs(u0, u1, u2, pi, pj, kind, cell, dmax, rin2):
+    """Displacement, distance, and projection of the candidate pairs (pi, pj)."""
+    n = len(pi)
+    dmax2 = dmax**2
+    dx = np.empty((n, ), dtype=np.float64)
+    dy = np.empty((n, ), dtype=np.float64)
+    dz = np.empty((n, ), dtype=np.float64)
+    dr = np.empty((n, ), dtype=np.float64)
+    prj = np.empty((n, ), dtype=np.int64)
+    for k in nb.prange(n):
+        dx[k], dy[k], dz[k], dr2, prj[k] = pair_displacement(
+            u0, u1, u2, pi[k], pj[k], kind, cell, dmax2, rin2)
+        dr[k] = np.sqrt(dr2)
+    return dx, dy, dz, dr, prj
+
+
+def _unit_coords(xyz, cell, kind):
+    """Coordinates used by :func:`~exatomic.algorithms.distance.pair_displacement`."""
+    if kind == 0:
+        return xyz[:, 0].copy(), xyz[:, 1].copy(), xyz[:, 2].copy()
+    s = np.dot(xyz, np.linalg.inv(cell))
+    s -= np.floor(s)
+    return s[:, 0].copy(), s[:, 1].copy(), s[:, 2].copy()
+
+
+def pdist_verlet(x, y, z, index, offsets, cells=None, kind=0, dmax=8.0,
+                 skin=1.0, vector=True, radius=None, bond_extra=0.45,
+                 compact=False):
+    """
+    Pairwise distance computation for consecutive (e.g. molecular dynamics)
+    frames using Verlet (neighbor) lists.
+
+    A list of candidate pairs within dmax + skin is built (see
+    :func:`~exatomic.algorithms.distance.pdist_frames`) and reused for
+    subsequent frames, for which only the distances of the candidate pairs
+    are recomputed. The list is rebuilt when any atom has moved more than
+    skin/2 since the last build (which guarantees that no pair within dmax
+    is missed), when the number of atoms changes, or when the periodic cell
+    changes. Atoms are matched between frames by their position (order)
+    within each frame.
+
+    .. code-block:: python
+
+        values, builds = pdist_verlet(x, y, z, index, offsets, dmax=6.0, skin=1.0)
+
+    Args:
+        x (array): Array of x coordinates (contiguous by frame)
+        y (array): Array of y coordinates (contiguous by frame)
+        z (array): Array of z coordinates (contiguous by frame)
+        index (array): Atom indexes
+        offsets (array): Frame boundaries (length number of frames + 1)
+        cells (array): Periodic cell vectors (rows) per frame (shape (nframe, 3, 3))
+        kind (int): 0 for free boundary, 1 for orthorhombic, 2 for triclinic cells
+        dmax (float): Maximum distance of interest
+        skin (float): Verlet list skin (buffer) distance
+        vector (bool): Return distance vector components as well
+        radius (array): Per atom (covalent) radii, if given only bonds are returned
+        bond_extra (float): Additional amount for determining bonds
+        compact (bool): Use compact data types (see :func:`~exatomic.algorithms.distance.two_dtypes`)
+
+    Returns:
+        values (dict): Two body data (projection only for periodic cells)
+        builds (array): Frames (positions) for which the list was (re)built
+    """
+    xyz = np.column_stack((x, y, z)).astype(np.float64)
+    index = np.asarray(index, dtype=np.int64)
+    _check_compact(index, compact)
+    fdtype, idtype, pdtype = two_dtypes(compact)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    nf = len(offsets) - 1
+    if cells is None or kind == 0:
+        cells = np.zeros((nf, 3, 3), dtype=np.float64)
+    cells = np.asarray(cells, dtype=np.float64).reshape(nf, 3, 3)
+    if radius is not None and len(radius) > 0:
+        radius = np.asarray(radius, dtype=np.float64)
+        dmax = min(dmax, 2*radius.max() + bond_extra + 1e-8)
+    else:
+        radius = None
+    columns = ['dx', 'dy', 'dz', 'dr', 'atom0', 'atom1', 'projection']
+    values = {col: [] for col in columns}
+    if not vector:
+        del values['dx'], values['dy'], values['dz']
+    if kind == 0:
+        del values['projection']
+    builds = []
+    ref = None
+    for f in range(nf):
+        pos = xyz[offsets[f]:offsets[f+1]]
+        cell = cells[f]
+        rebuild = (ref is None or len(pos) != len(ref) or
+                   not np.array_equal(cell, cells[builds[-1]]))
+        if not rebuild and len(pos) > 0:
+            delta = pos - ref
+            if kind > 0:
+                # Displacement of atoms wrapped back into the cell is small
+                inv = np.linalg.inv(cell)
+                frac = np.dot(delta, inv)
+                delta = np.dot(frac - np.round(frac), cell)
+            rebuild = (delta**2).sum(axis=1).max() > (skin/2)**2
+        if rebuild:
+            local = np.arange(len(pos), dtype=np.int64)
+            cand = pdist_frames(pos[:, 0], pos[:, 1], pos[:, 2], local,
+                                np.array([0, len(pos)]), cell.reshape(1, 3, 3),
+                                kind, dmax + skin, "cell", False)
+            pi = cand['atom0']
+            pj = cand['atom1']
+            ref = pos
+            builds.append(f)
+        rin2 = (_cell_widths(cell).min()/2)**2 if kind > 0 else 0.0
+        u0, u1, u2 = _unit_coords(pos, cell, kind)
+        dx, dy, dz, dr, prj = _verlet_pairs(u0, u1, u2, pi, pj, kind, cell,
+                                            dmax, rin2)
+        keep = dr < dmax
+        if radius is not None:
+            rad = radius[offsets[f]:offsets[f+1]]
+            keep &= dr <= rad[pi] + rad[pj] + bond_extra
+        first = index[offsets[f]:offsets[f+1]]
+        for col, v in zip(columns, (dx, dy, dz, dr, first[pi], first[pj], prj)):
+            if col in values:
+                values[col].append(v[keep])
+    dtypes = dict(dx=fdtype, dy=fdtype, dz=fdtype, dr=fdtype, atom0=idtype,
+                  atom1=idtype, projection=pdtype)
+    out = OrderedDict()
+    for col in columns:
+        if col in values:
+            if nf > 0:
+                out[col] = np.concatenate(values[col]).astype(dtypes[col])
+            else:
+                out[col] = np.empty((0, ), dtype=dtypes[col])
+    return out, np.array(builds, dtype=np.int64)
@@ -9,12 +9,65 @@ symmetry adapted or crystalline structures.
 """
 import numpy as np
 import pandas as pd
+from numba import jit, prange
 from exa.util.units import Length
+from exatomic.base import nbpll
 
 
 columns = ['x', 'y', 'z', 'symbol', 'frame', 'label']
 
 
+@jit(nopython=True, nogil=True, parallel=nbpll)
+def supercell_positions(x, y, z, offsets, cells, na, nb, nc):
+    """
+    Replicate the atoms of every frame ``na`` x ``nb`` x ``nc`` times along
+    the (possibly triclinic) cell vectors of the frame.
+
+    Images of a frame are contiguous (image major, then atom) and frames stay
+    in the order given by ``offsets``.
+
+    Args:
+        x (array): Array of x coordinates (sorted by frame)
+        y (array): Array of y coordinates (sorted by frame)
+        z (array): Array of z coordinates (sorted by frame)
+        offsets (array): Position of the first atom of each frame (and total)
+        cells (array): Cell vectors (rows) per frame (shape (nframe, 3, 3))
+        na (int): Number of replicas along a
+        nb (int): Number of replicas along b
+        nc (int): Number of replicas along c
+
+    Returns:
+        idx (array): Position of the source atom of each replica
+        px (array): Array of replicated x coordinates
+        py (array): Array of replicated y coordinates
+        pz (array): Array of replicated z coordinates
+    """
+    nimg = na*nb*nc
+    m = len(x)*nimg
+    idx = np.empty((m, ), dtype=np.int64)
+    px = np.empty((m, ), dtype=np.float64)
+    py = np.empty((m, ), dtype=np.float64)
+    pz = np.empty((m, ), dtype=np.float64)
+    for f in prange(len(offsets) - 1):
+        start = offsets[f]
+        count = offsets[f+1] - start
+        cell = cells[f]
+        for p in range(nimg):
+            i = p//(nb*nc)
+            j = (p//nc)%nb
+            k = p%nc
+            tx = i*cell[0, 0] + j*cell[1, 0] + k*cell[2, 0]
+            ty = i*cell[0, 1] + j*cell[1, 1] + k*cell[2, 1]
+            tz = i*cell[0, 2] + j*cell[1, 2] + k*cell[2, 2]
+            m = start*nimg + p*count
+            for l in range(count):
+                idx[m+l] = start + l
+                px[m+l] = x[start+l] + tx
+                py[m+l] = y[start+l] + ty
+                pz[m+l] = z[start+l] + tz
+    return idx, px, py, pz
+
+
 def make_small_molecule(center, ligand, distance, geometry,
                         offset=None, plane=None, axis=None,
                         domains=None, unit='Angstrom',
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2015-2018, Exa Analytics Development Team
+# Distributed under the terms of the Apache License 2.0
+"""
+Hydrogen Bonds
+#####################################
+Hydrogen bonds, D-H...A, are detected with a geometric criterion: the
+donor-acceptor distance is below ``dmax`` and the angle between the D-H
+bond and the D...A vector is below ``angle``. Covalent D-H bonds are taken
+from the bonded pairs of the :class:`~exatomic.core.two.AtomTwo` table (see
+:func:`~exatomic.algorithms.angles.bond_graph`), while donor-acceptor pairs
+are found with the (linked-cell, minimum image) pair search of the two body
+engine, for all frames at once, without storing a pair table.
+
+.. code-block:: python
+
+    uni.compute_atom_two(bonds_only=True)     # Covalent bonds only
+    hbonds = compute_hbonds(uni, donors="O", acceptors="O")
+    lifetimes = hbond_lifetimes(uni, hbonds)
+"""
+import numpy as np
+import numba as nb
+import pandas as pd
+from exatomic.base import nbpll
+from exatomic.algorithms.distance import (frame_arrays, frame_bins,
+                                          boundary_kind, cell_neighbors,
+                                          pair_displacement)
+from exatomic.algorithms.angles import bond_graph
+from exatomic.algorithms.displacement import autocorrelation_fft
+
+
+@nb.jit(nopython=True, nogil=True)
+def _hbond_row(i, f, u0, u1, u2, kind, cells, dmax2, rin2, nbins, binoff,
+               binof, order, start, atompos, donor, acceptor, hydrogen,
+               indptr, indices, vectors, cosmin, fill, k, dpos, hpos, apos,
+               dr, cos):
+    """
+    Count (and if fill is true, store starting at k) the hydrogen bonds
+    donated by (frame sorted) atom i.
+    """
+    d = atompos[i]
+    if not donor[d]:
+        return 0
+    cell = cells[f]
+    m = 0
+    for bn in cell_neighbors(binof[i] - binoff[f], nbins[f], kind > 0):
+        for p in range(start[binoff[f] + bn], start[binoff[f] + bn + 1]):
+            j = order[p]
+            a = atompos[j]
+            if j == i or not acceptor[a]:
+                continue
+            # Donor to acceptor vector
+            dx, dy, dz, dr2, _ = pair_displacement(u0, u1, u2, j, i, kind,
+                                                   cell, dmax2, rin2[f])
+            if dr2 >= dmax2:
+                continue
+            rda = np.sqrt(dr2)
+            for e in range(indptr[d], indptr[d+1]):
+                h = indices[e]
+                if not hydrogen[h] or h == a:
+                    continue
+                rdh = np.sqrt(vectors[e, 0]**2 + vectors[e, 1]**2 + vectors[e, 2]**2)
+                c = (vectors[e, 0]*dx + vectors[e, 1]*dy + vectors[e, 2]*dz)/(rdh*rda)
+                if c >= cosmin:
+                    if fill:
+                        dpos[k+m] = d
+                        hpos[k+m] = h
+                        apos[k+m] = a
+                        dr[k+m] = rda
+                        cos[k+m] = c
+                    m += 1
+    return m
+
+
+@nb.jit(nopython=True, nogil=True, parallel=nbpll)
+def _hbond_count(frame, u0, u1, u2, kind, cells, dmax, rin2, nbins, binoff,
+                 binof, order, start, atompos, donor, acceptor, hydrogen,
+                 indptr, indices, vectors, cosmin):
+    """First pass: number of hydrogen bonds per donor."""
+    n = len(u0)
+    counts = np.empty((n, ), dtype=np.int64)
+    empty = np.empty((0, ), dtype=np.float64)
+    iempty = np.empty((0, ), dtype=np.int64)
+    for i in nb.prange(n):
+        counts[i] = _hbond_row(i, frame[i], u0, u1, u2, kind, cells, dmax**2,
+                               rin2, nbins, binoff, binof, order, start,
+                               atompos, donor, acceptor, hydrogen, indptr,
+                               indices, vectors, cosmin, False, 0, iempty,
+                               iempty, iempty, empty, empty)
+    return counts
+
+
+@nb.jit(nopython=True, nogil=True, parallel=nbpll)
+def _hbond_fill(frame, u0, u1, u2, kind, cells, dmax, rin2, nbins, binoff,
+                binof, order, start, atompos, donor, acceptor, hydrogen,
+                indptr, indices, vectors, cosmin, rowoff, dpos, hpos, apos,
+                dr, cos):
+    """Second pass: store hydrogen bonds in the (preallocated) arrays."""
+    for i in nb.prange(len(u0)):
+        _hbond_row(i, frame[i], u0, u1, u2, kind, cells, dmax**2, rin2, nbins,
+                   binoff, binof, order, start, atompos, donor, acceptor,
+                   hydrogen, indptr, indices, vectors, cosmin, True,
+                   rowoff[i], dpos, hpos, apos, dr, cos)
+
+
+def compute_hbonds(universe, donors=("O", "N"), acceptors=("O", "N"),
+                   hydrogen="H", dmax=6.6, angle=np.pi/6, method="cell"):
+    """
+    Find all hydrogen bonds (of all frames).
+
+    .. code-block:: python
+
+        hbonds = compute_hbonds(uni)                            # O/N donors and acceptors
+        hbonds = compute_hbonds(uni, donors="O", acceptors=("O", "Cl"), dmax=6.0)
+
+    Args:
+        universe (:class:`~exatomic.core.universe.Universe`): Universe
+        donors (str, list): Symbol(s) of donor atoms
+        acceptors (str, list): Symbol(s) of acceptor atoms
+        hydrogen (str, list): Symbol(s) of the hydrogen atoms
+        dmax (float): Maximum donor-acceptor distance (default 3.5 Angstrom in bohr)
+        angle (float): Maximum hydrogen-donor-acceptor angle (radians)
+        method (str): Linked-cell ("cell") or all pairs ("brute") search
+
+    Returns:
+        hbonds (:class:`~pandas.DataFrame`): Donor, hydrogen, and acceptor atoms, donor-acceptor distance (dr), angle, and frame
+    """
+    kind = boundary_kind(universe)
+    atom = universe.atom
+    symbols = atom['symbol'].values.astype(str)
+    donor = np.isin(symbols, donors)
+    acceptor = np.isin(symbols, acceptors)
+    hyd = np.isin(symbols, hydrogen)
+    indptr, indices, vectors = bond_graph(universe)
+    x, y, z, _, offsets, cells, atompos = frame_arrays(
+        universe, kind, np.arange(len(atom), dtype=np.int64))
+    nf = len(offsets) - 1
+    if cells is None:
+        cells = np.zeros((nf, 3, 3), dtype=np.float64)
+    cells = np.ascontiguousarray(cells, dtype=np.float64)
+    frame = np.repeat(np.arange(nf, dtype=np.int64), np.diff(offsets))
+    u0, u1, u2, rin2, nbins, binoff, binof, order, start = frame_bins(
+        x, y, z, offsets, cells, kind, dmax, method == "cell")
+    grid = (u0, u1, u2, kind, cells, dmax, rin2, nbins, binoff, binof, order,
+            start, atompos, donor, acceptor, hyd, indptr, indices, vectors,
+            np.cos(angle))
+    counts = _hbond_count(frame, *grid)
+    rowoff = np.cumsum(counts) - counts
+    nn = counts.sum()
+    dpos = np.empty((nn, ), dtype=np.int64)
+    hpos = np.empty((nn, ), dtype=np.int64)
+    apos = np.empty((nn, ), dtype=np.int64)
+    dr = np.empty((nn, ), dtype=np.float64)
+    cos = np.empty((nn, ), dtype=np.float64)
+    args = (frame, ) + grid + (rowoff, dpos, hpos, apos, dr, cos)
+    _hbond_fill(*args)
+    index = atom.index.values
+    return pd.DataFrame.from_dict({
+        'donor': index[dpos], 'hydrogen': index[hpos], 'acceptor': index[apos],
+        'dr': dr, 'angle': np.arccos(np.clip(cos, -1.0, 1.0)),
+        'frame': atom['frame'].values.astype(np.int64)[dpos]})
+
+
+def _run_overlaps(h):
+    """
+    Sum over all pairs of the number of (time origin, time origin + t)
+    combinations within a single uninterrupted run of h, for each lag t.
+    """
+    nt = len(h)
+    padded = np.zeros((nt + 2, h.shape[1]), dtype=np.int8)
+    padded[1:-1] = h
+    change = np.diff(padded, axis=0)
+    # Starts (+1) and ends (-1) are paired column by column (column major)
+    starts = np.flatnonzero((change == 1).T)
+    ends = np.flatnonzero((change == -1).T)
+    counts = np.bincount(ends - starts, minlength=nt + 1)[1:]
+    lengths = np.arange(1, nt + 1)
+    # A run of length L contributes L - t combinations at lag t < L
+    s0 = np.cumsum(counts[::-1])[::-1]
+    s1 = np.cumsum((lengths*counts)[::-1])[::-1]
+    return s1 - np.arange(nt)*s0
+
+
+def hbond_lifetimes(universe, hbonds, chunk=None):
+    """
+    Compute the continuous and intermittent hydrogen bond time correlation
+    functions as a function of the time lag (in frames).
+
+    .. math::
+
+        C_{I}\\left(t\\right) = \\frac{\\left<h\\left(0\\right)h\\left(t\\right)\\right>}{\\left<h\\right>}
+        \\quad
+        C_{C}\\left(t\\right) = \\frac{\\left<h\\left(0\\right)H\\left(t\\right)\\right>}{\\left<h\\right>}
+
+    Here h(t) is 1 if a given (donor, hydrogen, acceptor) triplet, identified
+    by atom labels, is hydrogen bonded at frame t and H(t) is 1 if it has been
+    hydrogen bonded without interruption from 0 to t. Averages run over all
+    triplets and time origins. The intermittent function uses an FFT
+    autocorrelation; the continuous one is computed from the lengths of
+    uninterrupted runs. At least one hydrogen bond must be given.
+
+    Args:
+        universe (:class:`~exatomic.core.universe.Universe`): Universe
+        hbonds (:class:`~pandas.DataFrame`): Hydrogen bonds (see :func:`~exatomic.algorithms.hbond.compute_hbonds`)
+        chunk (int): Number of triplets processed at once (default all)
+
+    Returns:
+        lifetimes (:class:`~pandas.DataFrame`): Continuous and intermittent correlation functions
+    """
+    if len(hbonds) == 0:
+        raise ValueError("No hydrogen bonds given, lifetimes are undefined")
+    atom = universe.atom
+    if 'label' in atom.columns:
+        labels = atom['label']
+    else:
+        labels = atom.get_atom_labels()
+    labels = pd.Series(np.asarray(labels).astype(np.int64), index=atom.index)
+    fdxs = np.unique(atom['frame'].values.astype(np.int64))
+    nt = len(fdxs)
+    frames = np.searchsorted(fdxs, hbonds['frame'].values.astype(np.int64))
+    triplets = np.column_stack([labels.loc[hbonds[col].values].values
+                                for col in ('donor', 'hydrogen', 'acceptor')])
+    _, codes = np.unique(triplets, axis=0, return_inverse=True)
+    codes = codes.ravel()
+    npair = codes.max() + 1
+    cont = np.zeros((nt, ), dtype=np.float64)
+    inter = np.zeros((nt, ), dtype=np.float64)
+    step = npair if chunk is None else max(1, int(chunk))
+    for first in range(0, npair, step):
+        sel = (codes >= first) & (codes < first + step)
+        h = np.zeros((nt, min(step, npair - first)), dtype=np.int8)
+        h[frames[sel], codes[sel] - first] = 1
+        cont += _run_overlaps(h)
+        inter += autocorrelation_fft(h[:, :, None].astype(np.float64)).sum(axis=1)
+    cont /= nt - np.arange(nt)
+    return pd.DataFrame.from_dict({'continuous': cont/cont[0],
+                                   'intermittent': inter/inter[0]}).set_index(
+        pd.Index(np.arange(nt), name='lag'))
@@ -16,89 +16,103 @@ and :func:`~exatomic.molecule.Molecule.classify`.
 import numpy as np
 import pandas as pd
 import numba as nb
-from collections import defaultdict
-from IPython.display import display
-from ipywidgets import FloatProgress
-from exatomic.base import nbpll
+from exatomic.base import nbpll, sym2radius
+from exatomic.algorithms.distance import minimum_image
 from exatomic.core.atom import Atom
+from exatomic.core.frame import Frame
+from exatomic.core.two import compute_atom_two
+from exatomic.core.molecule import _molecule_codes
 from exatomic.core.universe import Universe
 
 
-@nb.jit(nopython=True, parallel=nbpll)
-def _worker(idx, x, y, z, a):
+@nb.jit(nopython=True, nogil=True, parallel=nbpll)
+def _nearest_source(x, y, z, offsets, sources, soffsets, cells, inverse, periodic):
     """
-    Generate a 3x3x3 'super' cell from a cubic unit cell.
+    Minimum image distance of every atom to the nearest source atom of its frame.
 
     Args:
-        idx (array): Array of index values
-        x (array): Array of x coordinates
-        y (array): Array of y coordinates
-        z (array): Array of z coordinates
-        a (float): Cubic unit cell dimension
+        x (array): Array of x coordinates (sorted by frame)
+        y (array): Array of y coordinates (sorted by frame)
+        z (array): Array of z coordinates (sorted by frame)
+        offsets (array): Position of the first atom of each frame (and total)
+        sources (array): Positions of source atoms (sorted by frame)
+        soffsets (array): Position of the first source of each frame (and total)
+        cells (array): Cell vectors (rows) per frame (shape (nframe, 3, 3))
+        inverse (array): Inverse of the cell vectors per frame
+        periodic (bool): Apply the minimum image convention
+
+    Returns:
+        dr (array): Distance to the nearest source atom
+        nearest (array): Position of the nearest source atom (-1 if none)
     """
     n = len(x)
-    idxs = np.empty((27*n, ), dtype=np.int64)
-    prj = idxs.copy()
-    px = np.empty((27*n, ), dtype=np.float64)
-    py = px.copy()
-    pz = px.copy()
-    p = 0
-    m = 0
-    for i in [-1, 0, 1]:
-        for j in [-1, 0, 1]:
-            for k in [-1, 0, 1]:
-                for l in range(n):
-                    idxs[m] = idx[l]
-                    px[m] = x[l] + i*a
-                    py[m] = y[l] + j*a
-                    pz[m] = z[l] + k*a
-                    prj[m] = p
-                    m += 1
-                p += 1
-    return idxs, px, py, pz, prj
+    dr = np.empty((n, ), dtype=np.float64)
+    nearest = np.empty((n, ), dtype=np.int64)
+    for f in nb.prange(len(offsets) - 1):
+        cell = cells[f]
+        inv = inverse[f]
+        for i in range(offsets[f], offsets[f+1]):
+            dr[i] = np.inf
+            nearest[i] = -1
+            for k in range(soffsets[f], soffsets[f+1]):
+                s = sources[k]
+                dx = x[i] - x[s]
+                dy = y[i] - y[s]
+                dz = z[i] - z[s]
+                if periodic:
+                    fa = dx*inv[0, 0] + dy*inv[1, 0] + dz*inv[2, 0]
+                    fb = dx*inv[0, 1] + dy*inv[1, 1] + dz*inv[2, 1]
+                    fc = dx*inv[0, 2] + dy*inv[1, 2] + dz*inv[2, 2]
+                    fa -= np.floor(fa + 0.5)
+                    fb -= np.floor(fb + 0.5)
+                    fc -= np.floor(fc + 0.5)
+                    dx = fa*cell[0, 0] + fb*cell[1, 0] + fc*cell[2, 0]
+                    dy = fa*cell[0, 1] + fb*cell[1, 1] + fc*cell[2, 1]
+                    dz = fa*cell[0, 2] + fb*cell[1, 2] + fc*cell[2, 2]
+                d = np.sqrt(dx**2 + dy**2 + dz**2)
+                if d < dr[i]:
+                    dr[i] = d
+                    nearest[i] = s
+    return dr, nearest
 
 
-def _create_super_universe(u, a):
+def _neighbor_universe(uni, a, **kwargs):
     """
-    Generate a 3x3x3 super cell from a cubic periodic universe
-
-    Args:
-        u (:class:`~exatomic.core.universe.Universe`): Universe
-        a (float): Cubic unit cell dimension
+    Working (frame sorted) universe with bonds and molecules computed.
 
-    Returns:
-        uni (:class:`~exatomic.core.universe.Universe`): Universe of 3x3x3x super cell
+    Cell vectors are taken from the frame table if the universe is periodic,
+    otherwise a cubic cell of dimension ``a`` is assumed. The two body search
+    radius (dmax) follows from the largest bond radius, so dmax, vector, bonds,
+    and bonds_only may not be given.
     """
-    adxs = []
-    xs = []
-    ys = []
-    zs = []
-    prjs = []
-    fdxs = []
-    grps = u.atom.groupby("frame")
-    for fdx, atom in grps:
-        adx, x, y, z, prj = _worker(atom.index.values.astype(np.int64),
-                                    atom['x'].values.astype(np.float64),
-                                    atom['y'].values.astype(np.float64),
-                                    atom['z'].values.astype(np.float64), a)
-        adxs.append(adx)
-        xs.append(x)
-        ys.append(y)
-        zs.append(z)
-        prjs.append(prj)
-        fdxs += [fdx]*len(adx)
-    adxs = np.concatenate(adxs)
-    xs = np.concatenate(xs)
-    ys = np.concatenate(ys)
-    zs = np.concatenate(zs)
-    prjs = np.concatenate(prjs)
-    # Overwrite the last 'atom' group because that value doesn't need to exist anymore
-    atom = pd.DataFrame.from_dict({'atom': adxs, 'x': xs, 'y': ys, 'z': zs, 'prj': prjs})
-    atom['frame'] = fdxs
-    atom['symbol'] = atom['atom'].map(u.atom['symbol'])
-    atom['label'] = atom['atom'].map(u.atom['label'])
-    atom = Atom(atom)
-    return Universe(atom=atom)
+    if "label" not in uni.atom.columns:
+        uni.atom['label'] = uni.atom.get_atom_labels()
+    atom = uni.atom[['symbol', 'x', 'y', 'z', 'frame', 'label']].copy()
+    atom['frame'] = atom['frame'].astype(np.int64)
+    atom = atom.iloc[np.argsort(atom['frame'].values, kind='mergesort')]
+    fdxs, offsets = np.unique(atom['frame'].values, return_index=True)
+    if uni.frame.is_periodic():
+        cells = uni.frame.get_cell_vectors()[uni.frame.index.get_indexer(fdxs)]
+    elif a is not None:
+        cells = np.tile(np.eye(3)*a, (len(fdxs), 1, 1))
+    else:
+        raise ValueError("Cell dimension required for non-periodic universe")
+    frame = pd.DataFrame(cells.reshape(-1, 9), index=pd.Index(fdxs, name='frame'),
+                         columns=["xi", "yi", "zi", "xj", "yj", "zj", "xk", "yk", "zk"])
+    frame['atom_count'] = np.diff(np.append(offsets, len(atom)))
+    frame['periodic'] = True
+    u = Universe(atom=Atom(atom), frame=Frame(frame))
+    # Only bonded pairs are needed, so the search radius is the longest possible bond
+    fixed = [key for key in ("dmax", "vector", "bonds", "bonds_only") if key in kwargs]
+    if fixed:
+        raise TypeError("Unsupported keyword argument(s) {}: bonds are always computed "
+                        "with dmax set by the bond radii".format(", ".join(fixed)))
+    kwargs.setdefault("method", "cell")
+    rmax = max(kwargs.get(sym, sym2radius[sym]) for sym in atom['symbol'].unique())
+    dmax = 2*rmax + kwargs.get("bond_extra", 0.45)
+    u.atom_two = compute_atom_two(u, dmax=dmax, bonds_only=True, **kwargs)
+    u.compute_molecule()
+    return u, np.append(offsets, len(atom)), cells
 
 
 def periodic_nearest_neighbors_by_atom(uni, source, a, sizes, **kwargs):
@@ -114,20 +128,26 @@ def periodic_nearest_neighbors_by_atom(uni, source, a, sizes, **kwargs):
     .. code-block:: python
 
         periodic_nearest_neighbors_by_atom(u, [0], 40.0, [0, 5, 10, 50],
-                                           dmax=40.0, C=1.6, O=1.6)
+                                           C=1.6, O=1.6)
 
     Argument descriptions can be found below. The additional keyword arguments,
-    ``dmax``, ``C``, ``O``, are passed directly to the two body computation used
-    to determine (semi-empirically) molecular units. Note that although molecules
-    are computed, neighboring molecular units are determine by an atom to atom
-    criteria.
+    ``C``, ``O``, are passed directly to the (bonded only) two body computation
+    used to determine (semi-empirically) molecular units. Note that although
+    molecules are computed, neighboring molecular units are determined by an
+    atom to atom (minimum image) criteria.
+
+    Molecules are unwrapped and positioned (by a lattice translation) at the
+    image nearest to the source; the source molecules are positioned relative
+    to the first source atom of each frame.
 
     Args:
         uni (:class:`~exatomic.core.universe.Universe`): Universe
-        source (int, str, list): Integer label or string symbol of source atom
-        a (float): Cubic unit cell dimension
+        source (int, str, list): Integer label(s) or string symbol of source atom(s)
+        a (float): Cubic unit cell dimension (if the frame table has no cell)
         sizes (list): List of slices to create
         kwargs: Additional keyword arguments to be passed to atom two body calculation
+            (e.g. covalent radii, bond_extra, method); dmax, vector, bonds, and
+            bonds_only are set internally and raise a TypeError if given
 
     Returns:
         dct (dict): Dictionary of sliced universes and nearest neighbor table
@@ -136,58 +156,65 @@ def periodic_nearest_neighbors_by_atom(uni, source, a, sizes, **kwargs):
         Sliced universe construction can be facilitated by
         :func:`~exatomic.algorithms.neighbors.construct`.
     """
-    def sorter(group, source_atom_idxs):
-        s = group[['atom0', 'atom1']].stack()
-        return s[~s.isin(source_atom_idxs)].reset_index()
-
-    if "label" not in uni.atom.columns:
-        uni.atom['label'] = uni.atom.get_atom_labels()
-    dct = defaultdict(list)
-    grps = uni.atom.groupby("frame")
-    ntot = len(grps)
-    fp = FloatProgress(description="Slicing:")
-    display(fp)
-    for i, (fdx, atom) in enumerate(grps):
-        if len(atom) > 0:
-            uu = _create_super_universe(Universe(atom=atom.copy()), a)
-            uu.compute_atom_two(**kwargs)
-            uu.compute_molecule()
-            if isinstance(source, (int, np.int32, np.int64)):
-                source_atom_idxs = uu.atom[(uu.atom.index.isin([source])) &
-                                           (uu.atom['prj'] == 13)].index.values
-            elif isinstance(source, (list, tuple)):
-                source_atom_idxs = uu.atom[uu.atom['label'].isin(source) &
-                                           (uu.atom['prj'] == 13)].index.values
-            else:
-                source_atom_idxs = uu.atom[(uu.atom['symbol'] == source) &
-                                           (uu.atom['prj'] == 13)].index.values
-            source_molecule_idxs = uu.atom.loc[source_atom_idxs, 'molecule'].unique().astype(int)
-            uu.atom_two['frame'] = uu.atom_two['atom0'].map(uu.atom['frame'])
-            nearest_atoms = uu.atom_two[(uu.atom_two['atom0'].isin(source_atom_idxs)) |
-                                        (uu.atom_two['atom1'].isin(source_atom_idxs))].sort_values("dr")[['frame', 'atom0', 'atom1']]
-            nearest = nearest_atoms.groupby("frame").apply(sorter, source_atom_idxs=source_atom_idxs)
-            del nearest['level_1']
-            nearest.index.names = ['frame', 'idx']
-            nearest.columns = ['two', 'atom']
-            nearest['molecule'] = nearest['atom'].map(uu.atom['molecule'])
-            nearest = nearest[~nearest['molecule'].isin(source_molecule_idxs)]
-            nearest = nearest.drop_duplicates('molecule', keep='first')
-            nearest.reset_index(inplace=True)
-            nearest['frame'] = nearest['frame'].astype(int)
-            nearest['molecule'] = nearest['molecule'].astype(int)
-            dct['nearest'].append(nearest)
-            for nn in sizes:
-                atm = []
-                for j, fdx in enumerate(nearest['frame'].unique()):
-                    mdxs = nearest.loc[nearest['frame'] == fdx, 'molecule'].tolist()[:nn]
-                    mdxs.append(source_molecule_idxs[j])
-                    atm.append(uu.atom[uu.atom['molecule'].isin(mdxs)][['symbol', 'x', 'y', 'z', 'frame']].copy())
-                dct[nn].append(pd.concat(atm, ignore_index=True))
-        fp.value = i/ntot*100
-    dct['nearest'] = pd.concat(dct['nearest'], ignore_index=True)
+    u, offsets, cells = _neighbor_universe(uni, a, **kwargs)
+    atom = u.atom
+    nframe = len(offsets) - 1
+    fcodes = np.repeat(np.arange(nframe), np.diff(offsets))
+    if isinstance(source, (int, np.int32, np.int64)):
+        mask = atom['label'] == source
+    elif isinstance(source, (list, tuple)):
+        mask = atom['label'].isin(source)
+    else:
+        mask = atom['symbol'] == source
+    sources = np.flatnonzero(mask.values)
+    soffsets = np.searchsorted(sources, offsets)
+    # Unwrap molecules relative to their first atom
+    molecules, first, codes = _molecule_codes(atom)
+    xyz = atom[['x', 'y', 'z']].values.astype(np.float64)
+    ref = xyz[first][codes]
+    xyz = ref + minimum_image(xyz - ref, cells, fcodes)
+    dr, nearest = _nearest_source(xyz[:, 0].copy(), xyz[:, 1].copy(), xyz[:, 2].copy(),
+                                  offsets, sources, soffsets, cells,
+                                  np.linalg.inv(cells), True)
+    # Source molecules are placed relative to the first source atom of each frame
+    issource = np.zeros((len(molecules), ), dtype=bool)
+    issource[codes[sources]] = True
+    mframe = fcodes[first]
+    shift = np.zeros((len(molecules), 3), dtype=np.float64)
+    srcmol = np.flatnonzero(issource)
+    center = xyz[sources[soffsets[mframe[srcmol]]]]
+    fxyz = xyz[first[srcmol]]
+    shift[srcmol] = center + minimum_image(fxyz - center, cells, mframe[srcmol]) - fxyz
+    # Nearest atom of every other molecule, positioned relative to its nearest source
+    order = np.lexsort((dr, codes))
+    best = order[np.flatnonzero(np.diff(np.append(-1, codes[order])))]
+    other = np.flatnonzero(~issource & (nearest[best] >= 0))
+    best = best[other]
+    src = nearest[best]
+    sxyz = xyz[src] + shift[codes[src]]
+    shift[other] = sxyz + minimum_image(xyz[best] - xyz[src], cells, mframe[other]) - xyz[best]
+    xyz += shift[codes]
+    # Rank molecules by distance (per frame)
+    order = np.lexsort((dr[best], mframe[other]))
+    other = other[order]
+    best = best[order]
+    frames = mframe[other]
+    rank = np.arange(len(other)) - np.searchsorted(frames, frames)
+    fdxs = atom['frame'].values[offsets[:-1]]
+    dct = {'nearest': pd.DataFrame.from_dict({
+        'frame': fdxs[frames], 'molecule': molecules[other],
+        'atom': atom.index.values[best], 'source': atom.index.values[nearest[best]],
+        'dr': dr[best], 'rank': rank})}
+    mrank = np.full((len(molecules), ), -1, dtype=np.int64)
+    mrank[other] = rank
+    mrank[~issource & (mrank < 0)] = np.iinfo(np.int64).max
+    arank = mrank[codes]
+    order = np.lexsort((arank, fcodes))
     for nn in sizes:
-        dct[nn] = Universe(atom=pd.concat(dct[nn], ignore_index=True))
-    fp.close()
+        keep = order[arank[order] < nn]
+        dct[nn] = Universe(atom=pd.DataFrame.from_dict({
+            'symbol': atom['symbol'].values[keep], 'x': xyz[keep, 0],
+            'y': xyz[keep, 1], 'z': xyz[keep, 2], 'frame': atom['frame'].values[keep]}))
     return dct
 
 
@@ -8,9 +8,9 @@ Everything in this module is implemented in numba.
 """
 import numpy as np
 import pandas as pd
-from numba import (jit, jitclass, deferred_type,
+from numba import (jit, jitclass, deferred_type, prange,
                    optional, int64, float64, boolean)
-from exatomic.base import nbche
+from exatomic.base import nbche, nbpll
 
 #################
 # Miscellaneous #
@@ -260,6 +260,217 @@ def _enum_spherical(L, increasing=True):
                 for i in (m, -m):
                     yield L, i
 
+@jit(nopython=True, nogil=True, cache=nbche)
+def _gaussian_value(f, x, y, z, centers, tptr, tpow, tcoef,
+                    pptr, alphas, coefs):
+    """Value of contracted Gaussian f at a single point."""
+    dx = x - centers[f, 0]
+    dy = y - centers[f, 1]
+    dz = z - centers[f, 2]
+    r2 = dx * dx + dy * dy + dz * dz
+    rad = 0.
+    for p in range(pptr[f], pptr[f + 1]):
+        rad += coefs[p] * np.exp(-alphas[p] * r2)
+    ang = 0.
+    for t in range(tptr[f], tptr[f + 1]):
+        ang += (tcoef[t] * dx ** tpow[t, 0] *
+                dy ** tpow[t, 1] * dz ** tpow[t, 2])
+    return ang * rad
+
+@jit(nopython=True, nogil=True, parallel=nbpll)
+def _evaluate_gaussians(xs, ys, zs, centers, tptr, tpow, tcoef,
+                        pptr, alphas, coefs):
+    """Evaluate contracted Gaussian basis functions on a numerical grid.
+    Each basis function is a polynomial in the displacement from its center
+    (Cartesian monomials, or the monomial expansion of a solid harmonic)
+    times a contraction of primitive Gaussians.
+
+    Args:
+        xs (np.ndarray): 1D-array of x values
+        ys (np.ndarray): 1D-array of y values
+        zs (np.ndarray): 1D-array of z values
+        centers (np.ndarray): (nbf, 3) centers of the basis functions
+        tptr (np.ndarray): monomial pointers (nbf + 1) into tpow and tcoef
+        tpow (np.ndarray): (nterm, 3) Cartesian powers of each monomial
+        tcoef (np.ndarray): coefficient of each monomial
+        pptr (np.ndarray): primitive pointers (nbf + 1) into alphas and coefs
+        alphas (np.ndarray): primitive exponents
+        coefs (np.ndarray): normalized contraction coefficients
+
+    Returns:
+        flds (np.ndarray): (nbf, npts) basis function values
+    """
+    nbf = len(tptr) - 1
+    npts = len(xs)
+    flds = np.empty((nbf, npts), dtype=np.float64)
+    for f in prange(nbf):
+        for i in range(npts):
+            flds[f, i] = _gaussian_value(f, xs[i], ys[i], zs[i], centers,
+                                         tptr, tpow, tcoef, pptr, alphas, coefs)
+    return flds
+
+@jit(nopython=True, nogil=True, parallel=nbpll)
+def _evaluate_gaussians_separable(x, y, z, centers, tptr, tpow, tcoef,
+                                  pptr, alphas, coefs):
+    """Evaluate contracted Gaussian basis functions on a rectilinear grid.
+    Each primitive times monomial factorizes into 1D factors along x, y
+    and z, so exponentials are only computed on the grid axes and the
+    full grid is filled by outer products. See :func:`_evaluate_gaussians`
+    for a description of the basis function arrays.
+
+    Args:
+        x (np.ndarray): 1D-array of grid points along x
+        y (np.ndarray): 1D-array of grid points along y
+        z (np.ndarray): 1D-array of grid points along z
+
+    Returns:
+        flds (np.ndarray): (nbf, nx * ny * nz) basis function values
+        with x the slowest and z the fastest varying grid index
+    """
+    nbf = len(tptr) - 1
+    nx, ny, nz = len(x), len(y), len(z)
+    flds = np.zeros((nbf, nx * ny * nz), dtype=np.float64)
+    for f in prange(nbf):
+        dx = x - centers[f, 0]
+        dy = y - centers[f, 1]
+        dz = z - centers[f, 2]
+        for p in range(pptr[f], pptr[f + 1]):
+            ex = np.exp(-alphas[p] * dx * dx)
+            ey = np.exp(-alphas[p] * dy * dy)
+            ez = np.exp(-alphas[p] * dz * dz)
+            for t in range(tptr[f], tptr[f + 1]):
+                gx = coefs[p] * tcoef[t] * dx ** tpow[t, 0] * ex
+                gy = dy ** tpow[t, 1] * ey
+                gz = dz ** tpow[t, 2] * ez
+                for i in range(nx):
+                    for j in range(ny):
+                        w = gx[i] * gy[j]
+                        off = (i * ny + j) * nz
+                        for k in range(nz):
+                            flds[f, off + k] += w * gz[k]
+    return flds
+
+@jit(nopython=True, nogil=True, cache=nbche)
+def _gaussian_derivative(f, q, x, y, z, centers, tptr, tpow, tcoef,
+                         pptr, alphas, coefs):
+    """Derivative of contracted Gaussian f with respect to Cartesian
+    direction q (0, 1, 2 for x, y, z) at a single point."""
+    d = np.empty(3, dtype=np.float64)
+    d[0] = x - centers[f, 0]
+    d[1] = y - centers[f, 1]
+    d[2] = z - centers[f, 2]
+    r2 = d[0] * d[0] + d[1] * d[1] + d[2] * d[2]
+    rad = 0.
+    drad = 0.
+    for p in range(pptr[f], pptr[f + 1]):
+        g = coefs[p] * np.exp(-alphas[p] * r2)
+        rad += g
+        drad -= 2. * alphas[p] * d[q] * g
+    ang = 0.
+    dang = 0.
+    for t in range(tptr[f], tptr[f + 1]):
+        mono = tcoef[t]
+        dmono = tcoef[t] * tpow[t, q]
+        for c in range(3):
+            mono *= d[c] ** tpow[t, c]
+            if c != q: dmono *= d[c] ** tpow[t, c]
+            elif tpow[t, c] > 1: dmono *= d[c] ** (tpow[t, c] - 1)
+        ang += mono
+        dang += dmono
+    return dang * rad + ang * drad
+
+@jit(nopython=True, nogil=True, parallel=nbpll)
+def _evaluate_gaussians_diff(xs, ys, zs, q, centers, tptr, tpow, tcoef,
+                             pptr, alphas, coefs):
+    """Evaluate derivatives of contracted Gaussian basis functions on a
+    numerical grid. The derivative of a monomial times a Gaussian is again
+    a sum of such terms, so it is evaluated from the same arrays as the
+    values (see :func:`_evaluate_gaussians`).
+
+    Args:
+        xs (np.ndarray): 1D-array of x values
+        ys (np.ndarray): 1D-array of y values
+        zs (np.ndarray): 1D-array of z values
+        q (int): derivative with respect to x (0), y (1) or z (2)
+
+    Returns:
+        flds (np.ndarray): (nbf, npts) basis function derivatives
+    """
+    nbf = len(tptr) - 1
+    npts = len(xs)
+    flds = np.empty((nbf, npts), dtype=np.float64)
+    for f in prange(nbf):
+        for i in range(npts):
+            flds[f, i] = _gaussian_derivative(f, q, xs[i], ys[i], zs[i],
+                                              centers, tptr, tpow, tcoef,
+                                              pptr, alphas, coefs)
+    return flds
+
+@jit(nopython=True, nogil=True, cache=nbche)
+def _block_row(b, lo, hi, centers, rcut, fill, bfns, k):
+    """Count (and if fill is true, store starting at k) the basis functions
+    whose cutoff sphere overlaps the bounding box of grid block b."""
+    m = 0
+    for f in range(len(rcut)):
+        d2 = 0.
+        for q in range(3):
+            if centers[f, q] < lo[b, q]: d2 += (lo[b, q] - centers[f, q]) ** 2
+            elif centers[f, q] > hi[b, q]: d2 += (centers[f, q] - hi[b, q]) ** 2
+        if d2 <= rcut[f] ** 2:
+            if fill: bfns[k + m] = f
+            m += 1
+    return m
+
+@jit(nopython=True, nogil=True, parallel=nbpll)
+def _screen_blocks(lo, hi, centers, rcut):
+    """Find the significant basis functions of each block of grid points.
+
+    Args:
+        lo (np.ndarray): (nblock, 3) lower corners of the block bounding boxes
+        hi (np.ndarray): (nblock, 3) upper corners of the block bounding boxes
+        centers (np.ndarray): (nbf, 3) centers of the basis functions
+        rcut (np.ndarray): cutoff radius of each basis function
+
+    Returns:
+        bptr (np.ndarray): pointers (nblock + 1) into bfns
+        bfns (np.ndarray): basis function indices of each block
+    """
+    nblock = len(lo)
+    counts = np.empty(nblock, dtype=np.int64)
+    empty = np.empty(0, dtype=np.int64)
+    for b in prange(nblock):
+        counts[b] = _block_row(b, lo, hi, centers, rcut, False, empty, 0)
+    bptr = np.zeros(nblock + 1, dtype=np.int64)
+    bptr[1:] = np.cumsum(counts)
+    bfns = np.empty(bptr[-1], dtype=np.int64)
+    for b in prange(nblock):
+        _block_row(b, lo, hi, centers, rcut, True, bfns, bptr[b])
+    return bptr, bfns
+
+@jit(nopython=True, nogil=True, parallel=nbpll)
+def _evaluate_gaussians_blocks(xs, ys, zs, block, bptr, bfns, centers, tptr,
+                               tpow, tcoef, pptr, alphas, coefs):
+    """Evaluate contracted Gaussian basis functions only on the blocks of
+    grid points (of size block) where they are significant. See
+    :func:`_screen_blocks` and :func:`_evaluate_gaussians`.
+
+    Returns:
+        vals (np.ndarray): (len(bfns), block) basis function values,
+        zero padded beyond the last grid point
+    """
+    npts = len(xs)
+    vals = np.zeros((len(bfns), block), dtype=np.float64)
+    for b in prange(len(bptr) - 1):
+        i0 = b * block
+        i1 = min(i0 + block, npts)
+        for e in range(bptr[b], bptr[b + 1]):
+            f = bfns[e]
+            for i in range(i0, i1):
+                vals[e, i - i0] = _gaussian_value(
+                    f, xs[i], ys[i], zs[i], centers, tptr,
+                    tpow, tcoef, pptr, alphas, coefs)
+    return vals
+
 
 
 #####################
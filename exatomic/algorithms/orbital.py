@@ -8,14 +8,15 @@ Building discrete molecular orbitals (for visualization) requires a complex
 set of operations that are provided by this module and wrapped into a clean API.
 """
 import numpy as np
-from numba import TypingError
 from datetime import datetime
+from IPython.display import display
+from ipywidgets import FloatProgress
 from exatomic.base import sym2z
 from .orbital_util import (
-    numerical_grid_from_field_params, _determine_fps,
+    grid_chunks, _determine_fps,
     _determine_vector, _compute_orb_ang_mom, _compute_current_density,
     _compute_density, _check_column, _make_field,
-    _compute_orbitals_numba, _compute_orbitals_numpy)
+    _compute_orbitals, _compute_orbitals_blocks)
 
 
 def _setup_orbital(uni, verbose, vector, fps, icoefs, jcoefs=None, irrep=None):
@@ -29,22 +30,36 @@ def _setup_orbital(uni, verbose, vector, fps, icoefs, jcoefs=None, irrep=None):
         print(p1.format(nbf))
     vector = _determine_vector(uni, vector, irrep)
     fps = _determine_fps(uni, fps, len(vector))
-    x, y, z = numerical_grid_from_field_params(fps)
-    bvs = uni.basis_functions.evaluate(x, y, z, irrep=irrep, verbose=verbose)
+    fp = fps.loc[0]
+    npts = int(fp.nx) * int(fp.ny) * int(fp.nz)
     icoefs = _check_column(uni, 'current_momatrix', icoefs)
     icoefs = uni.current_momatrix.square(column=icoefs, irrep=irrep).values
     if jcoefs is not None:
         jcoefs = _check_column(uni, 'current_momatrix', jcoefs)
         jcoefs = uni.current_momatrix.square(column=jcoefs).values
-        return t1, vector, fps, x, y, z, bvs, icoefs, jcoefs
-    return t1, vector, fps, x, y, z, bvs, icoefs
+        return t1, vector, fps, npts, icoefs, jcoefs
+    return t1, vector, fps, npts, icoefs
 
-def _compute_orbital(verbose, npts, bvs, vector, cmat):
-    try: ovs = _compute_orbitals_numba(npts, bvs, vector, cmat)
-    except (ValueError, IndexError, AssertionError, TypingError) as e:
-        if verbose: print('numba eval failed, falling back to numpy')
-        ovs = _compute_orbitals_numpy(npts, bvs, vector, cmat)
-    return ovs
+def _basis_chunks(uni, fps, chunk, irrep=None, tol=None, verbose=False):
+    """Evaluate basis functions on consecutive chunks of the grid."""
+    for sl, (x, y, z), sep in grid_chunks(fps, chunk, separable=tol is None):
+        if tol is not None:
+            # Screened basis functions are stored block-sparse
+            bvs = uni.basis_functions.evaluate_screened(
+                x, y, z, tol=tol, irrep=irrep, verbose=verbose)
+        else:
+            # Factor Gaussians along the axes of grids aligned with x, y and z
+            bvs = uni.basis_functions.evaluate(
+                x, y, z, irrep=irrep, verbose=verbose, separable=sep)
+        yield sl, bvs
+
+def _compute_orbital(npts, bvs, vector, cmat, dtype=np.float64):
+    """Contract (dense or block-sparse) basis values with MO coefficients."""
+    if isinstance(bvs, tuple):
+        bptr, bfns, vals = bvs
+        ovs = np.zeros((len(vector), npts), dtype=dtype)
+        return _compute_orbitals_blocks(bptr, bfns, vals, vector, cmat, ovs)
+    return _compute_orbitals(bvs, vector, cmat, dtype=dtype)
 
 def _teardown_orbital(uni, verbose, field, t1, inplace, name='orbitals'):
     """Boilerplate for finishing the functions in this module."""
@@ -59,7 +74,8 @@ def _teardown_orbital(uni, verbose, field, t1, inplace, name='orbitals'):
 
 def add_molecular_orbitals(uni, field_params=None, mocoefs=None,
                            vector=None, frame=0, inplace=True,
-                           replace=False, verbose=True, irrep=None):
+                           replace=False, verbose=True, irrep=None,
+                           tol=None, chunk=65536, dtype=np.float64):
     """A universe must contain basis_set, [basis_set_order], and
     momatrix attributes to use this function.  Evaluate molecular
     orbitals on a numerical grid.  Attempts to generate reasonable
@@ -76,20 +92,27 @@ def add_molecular_orbitals(uni, field_params=None, mocoefs=None,
         inplace (bool): if False, return the field obj instead of modifying uni
         replace (bool): if False, do not delete any previous fields
         irrep (int): if symmetrized, the irrep to which the orbitals belong
+        tol (float): if given, neglect basis functions where smaller than tol
+        chunk (int): number of grid points evaluated at once (bounds memory)
+        dtype (type): precision of the fields, e.g. np.float32 for visualization
 
     Warning:
         If replace is True, removes any fields previously attached to the universe
     """
     if replace and hasattr(uni, '_field'): del uni.__dict__['_field']
-    t1, vector, fps, x, y, z, bvs, mocoefs = \
+    t1, vector, fps, npts, mocoefs = \
         _setup_orbital(uni, verbose, vector, field_params, mocoefs, irrep=irrep)
-    ovs = _compute_orbital(verbose, len(x), bvs, vector, mocoefs)
+    ovs = np.empty((len(vector), npts), dtype=dtype)
+    for sl, bvs in _basis_chunks(uni, fps, chunk, irrep, tol, verbose):
+        ovs[:, sl] = _compute_orbital(sl.stop - sl.start, bvs, vector,
+                                      mocoefs, dtype=dtype)
     field = _make_field(ovs, fps)
     return _teardown_orbital(uni, verbose, field, t1, inplace)
 
 
 def add_density(uni, field_params=None, mocoefs=None, orbocc=None,
-                inplace=True, frame=0, norm='Nd', verbose=True):
+                inplace=True, frame=0, norm='Nd', verbose=True, tol=None,
+                chunk=65536, dtype=np.float64):
     """A universe must contain basis_set, [basis_set_order], and
     momatrix attributes to use this function.  Compute a density
     with C matrix mocoefs and occupation vector orbocc.
@@ -100,22 +123,29 @@ def add_density(uni, field_params=None, mocoefs=None, orbocc=None,
         mocoefs (str): column in uni.current_momatrix (default 'coef')
         orbocc (str): column in uni.orbital (default 'occupation')
         inplace (bool): if False, return the field obj instead of modifying uni
+        tol (float): if given, neglect basis functions where smaller than tol
+        chunk (int): number of grid points evaluated at once (bounds memory)
+        dtype (type): precision of the field, e.g. np.float32 for visualization
     """
     mocol = mocoefs
-    t1, vector, fps, x, y, z, bvs, mocoefs = \
+    t1, vector, fps, npts, mocoefs = \
         _setup_orbital(uni, verbose, None, field_params, mocoefs)
     orbocc = mocol if orbocc is None and mocol != 'coef' else orbocc
     orbocc = _check_column(uni, 'orbital', orbocc)
     vector = uni.orbital[~np.isclose(uni.orbital[orbocc], 0)].index.values
-    orbocc = uni.orbital.loc[vector][orbocc].values
-    ovs = _compute_orbital(verbose, len(x), bvs, vector, mocoefs)
-    field = _make_field(_compute_density(ovs, orbocc), fps.loc[0])
+    orbocc = uni.orbital.loc[vector][orbocc].values.astype(dtype)
+    dens = np.empty(npts, dtype=dtype)
+    for sl, bvs in _basis_chunks(uni, fps, chunk, tol=tol, verbose=verbose):
+        ovs = _compute_orbital(sl.stop - sl.start, bvs, vector, mocoefs,
+                               dtype=dtype)
+        dens[sl] = _compute_density(ovs, orbocc)
+    field = _make_field(dens, fps.loc[0])
     return _teardown_orbital(uni, verbose, field, t1, inplace, name='density')
 
 
 def add_orb_ang_mom(uni, field_params=None, rcoefs=None, icoefs=None,
                     frame=0, orbocc=None, maxes=None, inplace=True,
-                    norm='Nd', verbose=True):
+                    norm='Nd', verbose=True, chunk=65536):
     """A universe must contain basis_set, [basis_set_order], and
     momatrix attributes to use this function.  Compute the orbital
     angular momentum.  Requires C matrices from SODIZLDENS.X.X.R,I
@@ -129,11 +159,12 @@ def add_orb_ang_mom(uni, field_params=None, rcoefs=None, icoefs=None,
         maxes (np.ndarray): 3x3 array of magnetic axes (default np.eye(3))
         orbocc (str): column in uni.orbital (default 'lreal')
         inplace (bool): if False, return the field obj instead of modifying uni
+        chunk (int): number of grid points evaluated at once (bounds memory)
     """
     if rcoefs is None or icoefs is None:
         raise Exception("Must specify rcoefs and icoefs")
     rcol = rcoefs
-    t1, vector, fps, x, y, z, bvs, rcoefs, icoefs = \
+    t1, vector, fps, npts, rcoefs, icoefs = \
         _setup_orbital(uni, verbose, None, field_params, rcoefs, jcoefs=icoefs)
     orbocc = rcol if orbocc is None else orbocc
     if maxes is None:
@@ -141,19 +172,30 @@ def add_orb_ang_mom(uni, field_params=None, rcoefs=None, icoefs=None,
         if verbose:
             print("If magnetic axes are not an identity matrix, specify maxes.")
     occvec = uni.orbital[orbocc].values
-    grx = uni.basis_functions.evaluate_diff(x, y, z, cart='x', verbose=verbose)
-    gry = uni.basis_functions.evaluate_diff(x, y, z, cart='y', verbose=verbose)
-    grz = uni.basis_functions.evaluate_diff(x, y, z, cart='z', verbose=verbose)
-    t2 = datetime.now()
+    angmom = np.empty((4, npts), dtype=np.float64)
+    tgrid, tcur = 0., 0.
     if verbose:
-        p1 = 'Timing: grid evaluation  - {:>8.2f}s.'
-        print(p1.format((t2-t1).total_seconds()))
-    curx, cury, curz = _compute_current_density(
-        bvs, grx, gry, grz, rcoefs, icoefs, occvec, verbose=verbose)
-    t3 = datetime.now()
+        fp = FloatProgress(description='Computing:')
+        display(fp)
+    for sl, (x, y, z), _ in grid_chunks(fps, chunk, separable=False):
+        t2 = datetime.now()
+        bvs = uni.basis_functions.evaluate(x, y, z)
+        grx = uni.basis_functions.evaluate_diff(x, y, z, cart='x')
+        gry = uni.basis_functions.evaluate_diff(x, y, z, cart='y')
+        grz = uni.basis_functions.evaluate_diff(x, y, z, cart='z')
+        t3 = datetime.now()
+        curx, cury, curz = _compute_current_density(
+            bvs, grx, gry, grz, rcoefs, icoefs, occvec, verbose=False)
+        tgrid += (t3-t2).total_seconds()
+        tcur += (datetime.now()-t3).total_seconds()
+        angmom[:, sl] = _compute_orb_ang_mom(x, y, z, curx, cury, curz, maxes)
+        if verbose:
+            fp.value = 100. * sl.stop / npts
     if verbose:
+        fp.close()
+        p1 = 'Timing: grid evaluation  - {:>8.2f}s.'
+        print(p1.format(tgrid))
         p2 = 'Timing: current density  - {:>8.2f}s.'
-        print(p2.format((t3-t2).total_seconds()))
-    field = _make_field(_compute_orb_ang_mom(
-        x, y, z, curx, cury, curz, maxes), fps)
+        print(p2.format(tcur))
+    field = _make_field(angmom, fps)
     return _teardown_orbital(uni, verbose, field, t1, inplace, name='angmom')
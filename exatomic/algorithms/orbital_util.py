@@ -12,7 +12,7 @@ from __future__ import division
 import six
 import numpy as np
 import pandas as pd
-from numba import jit
+from numba import jit, prange
 from numexpr import evaluate
 from IPython.display import display
 from ipywidgets import FloatProgress
@@ -50,14 +50,14 @@ def compare_fields(uni0, uni1, rtol=5e-5, atol=1e-12, signed=True, verbose=True)
     return fracs
 
 
-def numerical_grid_from_field_params(fps):
-    """Construct numerical grid arrays from field parameters.
+def grid_axes_from_field_params(fps):
+    """Construct the grid points along each axis from field parameters.
 
     Args:
         fps (pd.Series): See :meth:`exatomic.algorithms.orbital_util.make_fps`
 
     Returns:
-        grid (tup): (xs, ys, zs) 1D-arrays
+        axes (tup): (x, y, z) 1D-arrays of length nx, ny, nz
     """
     if isinstance(fps, pd.DataFrame):
         fps = fps.loc[0]
@@ -70,7 +70,74 @@ def numerical_grid_from_field_params(fps):
     x = np.linspace(ox, mx, nx)
     y = np.linspace(oy, my, ny)
     z = np.linspace(oz, mz, nz)
-    return _meshgrid3d(x, y, z)
+    return x, y, z
+
+
+def numerical_grid_from_field_params(fps):
+    """Construct numerical grid arrays from field parameters.
+
+    Args:
+        fps (pd.Series): See :meth:`exatomic.algorithms.orbital_util.make_fps`
+
+    Returns:
+        grid (tup): (xs, ys, zs) 1D-arrays
+    """
+    return _meshgrid3d(*grid_axes_from_field_params(fps))
+
+
+def grid_chunks(fps, chunk=65536, separable=True):
+    """Iterate over the numerical grid in chunks of at most chunk points,
+    in the order of the flattened grid (x slowest, z fastest).
+
+    Rectilinear grids are split into whole x-planes or, if a plane has more
+    than chunk points, into ranges of z-lines within a plane; a chunk is never
+    smaller than a single z-line (nz points), even if chunk < nz.
+
+    .. code-block:: python
+
+        for sl, (x, y, z), sep in grid_chunks(fps):
+            bvs = uni.basis_functions.evaluate(x, y, z, separable=sep)
+
+    Args:
+        fps (pd.Series): See :meth:`exatomic.algorithms.orbital_util.make_fps`
+        chunk (int): maximum number of grid points per chunk
+        separable (bool): yield grid axes for rectilinear grids (default True)
+
+    Returns:
+        chunks (generator): slice of the flattened grid, grid arrays, and
+        whether the grid arrays are axes of a (separable) rectilinear grid
+    """
+    chunk = max(1, int(chunk))
+    if separable and _is_rectilinear(fps):
+        x, y, z = grid_axes_from_field_params(fps)
+        nz = len(z)
+        nyz = len(y) * nz
+        if nyz > chunk:
+            step = max(1, chunk // nz)
+            for i in range(len(x)):
+                for j in range(0, len(y), step):
+                    yc = y[j:j + step]
+                    first = i * nyz + j * nz
+                    yield (slice(first, first + len(yc) * nz),
+                           (x[i:i + 1], yc, z), True)
+            return
+        step = chunk // nyz
+        for i in range(0, len(x), step):
+            xc = x[i:i + step]
+            yield slice(i * nyz, (i + len(xc)) * nyz), (xc, y, z), True
+    else:
+        xs, ys, zs = numerical_grid_from_field_params(fps)
+        for i in range(0, len(xs), chunk):
+            sl = slice(i, min(i + chunk, len(xs)))
+            yield sl, (xs[sl], ys[sl], zs[sl]), False
+
+
+def _is_rectilinear(fps):
+    """Whether the voxel vectors of a grid are aligned with x, y and z."""
+    if isinstance(fps, pd.DataFrame):
+        fps = fps.loc[0]
+    offdiag = [fps[col] for col in ('dxj', 'dxk', 'dyi', 'dyk', 'dzi', 'dzj')]
+    return np.allclose(np.array(offdiag, dtype=np.float64), 0)
 
 
 def make_fps(rmin=None, rmax=None, nr=None, nrfps=1,
@@ -290,26 +357,34 @@ def _check_column(uni, df, key):
     return key
 
 
-@jit(nopython=True, nogil=True, parallel=nbpll)
-def _compute_orbitals_numba(npts, bvs, vecs, cmat):
-    """Compute orbitals from numerical basis functions."""
-    ovs = np.empty((len(vecs), npts), dtype=np.float64)
-    for i, vec in enumerate(vecs):
-        ovs[i] = np.dot(cmat[:, vec], bvs)
-    return ovs
+def _compute_orbitals(bvs, vecs, cmat, dtype=np.float64):
+    """Compute orbitals from numerical basis functions as a single
+    matrix product, (nvec, nbf) x (nbf, npts), in the given precision."""
+    cvs = np.ascontiguousarray(cmat[:, vecs].T, dtype=dtype)
+    return np.dot(cvs, bvs.astype(dtype, copy=False))
 
-def _compute_orbitals_numpy(npts, bvs, vecs, cmat):
-    """Compute orbitals from numerical basis functions."""
-    ovs = np.empty((len(vecs), npts), dtype=np.float64)
-    for i, vec in enumerate(vecs):
-        ovs[i] = np.dot(cmat[:, vec], bvs)
+@jit(nopython=True, nogil=True, parallel=nbpll)
+def _compute_orbitals_blocks(bptr, bfns, vals, vecs, cmat, ovs):
+    """Compute orbitals (in place, ovs must be zeroed) from block-sparse
+    numerical basis functions (see
+    :meth:`~exatomic.algorithms.basis.BasisFunctions.evaluate_screened`)."""
+    nvec, npts = ovs.shape
+    block = vals.shape[1]
+    for b in prange(len(bptr) - 1):
+        i0 = b * block
+        n = min(block, npts - i0)
+        for e in range(bptr[b], bptr[b + 1]):
+            mu = bfns[e]
+            for v in range(nvec):
+                c = cmat[mu, vecs[v]]
+                for i in range(n):
+                    ovs[v, i0 + i] += c * vals[e, i]
     return ovs
 
 @jit(nopython=True, nogil=True, parallel=nbpll)
 def _compute_density(ovs, occvec):
     """Sum orbitals multiplied by their occupations."""
     norb, npts = ovs.shape
-    dens = np.empty(npts, dtype=np.float64)
     for i in range(norb):
         ovs[i] *= ovs[i]
     dens = np.dot(occvec, ovs)
@@ -6,13 +6,32 @@ Pair Correlation Functions
 ############################
 """
 import numpy as np
+import numba as nb
 import pandas as pd
 from IPython.display import display
 from ipywidgets import FloatProgress
 from exa.util.units import Length
+from exatomic.base import nbpll
+from exatomic.algorithms.distance import (frame_arrays, frame_bins,
+                                          boundary_kind, cell_neighbors,
+                                          pair_displacement)
+from exatomic.core.error import PeriodicUniverseError
 from exatomic.core.universe import Universe
 
 
+def _atom_selection(universe, a):
+    """
+    Index values of the atoms selected by symbol (str), label (int,
+    list, tuple) or directly by index values (array).
+    """
+    if isinstance(a, str):
+        return universe.atom[universe.atom['symbol'] == a].index.values
+    elif isinstance(a, (int, list, tuple, np.int64, np.int32)):
+        a = [a] if not isinstance(a, (list, tuple)) else a
+        return universe.atom[universe.atom['label'].isin(a)].index.values
+    return a
+
+
 def radial_pair_correlation(universe, a, b, dr=0.05, start=1.0, stop=13.0,
                             length="Angstrom", window=1):
     """
@@ -75,20 +94,8 @@ def radial_pair_correlation(universe, a, b, dr=0.05, start=1.0, stop=13.0,
         rescaling values appropriately.
     """
     bins = np.arange(start, stop, dr)                     # Discrete values of r for histogram
-    if isinstance(a, str):
-        a_idx = universe.atom[universe.atom['symbol'] == a].index.values
-    elif isinstance(a, (int, list, tuple, np.int64, np.int32)):
-        a = [a] if not isinstance(a, (list, tuple)) else a
-        a_idx = universe.atom[universe.atom['label'].isin(a)].index.values
-    else:
-        a_idx = a
-    if isinstance(b, str):
-        b_idx = universe.atom[universe.atom['symbol'] == b].index.values
-    elif isinstance(a, (int, list, tuple, np.int64, np.int32)):
-        b = [b] if not isinstance(b, (list, tuple)) else b
-        b_idx = universe.atom[universe.atom['label'].isin(b)].index.values
-    else:
-        b_idx = b
+    a_idx = _atom_selection(universe, a)
+    b_idx = _atom_selection(universe, b)
     if "distance" in universe.atom_two.columns:
         c = "distance"
     else:
@@ -116,6 +123,11 @@ def radial_pair_correlation(universe, a, b, dr=0.05, start=1.0, stop=13.0,
     numa = len(a_idx)/len(universe)
     numb = len(b_idx)/len(universe)
     n = hist.cumsum()/nn*numa*numb*4/3*np.pi*bmax**3/v_cell
+    return _pcf_frame(bins, g, n, length, window)
+
+
+def _pcf_frame(bins, g, n, length, window):
+    """Labeled (and optionally smoothed) pair correlation dataframe."""
     r = (bins[1:] + bins[:-1])/2*Length["au", length]
     unit = "au"
     if length in ["A", "angstrom", "ang", "Angstrom"]:
@@ -131,6 +143,129 @@ def radial_pair_correlation(universe, a, b, dr=0.05, start=1.0, stop=13.0,
     return df
 
 
+@nb.jit(nopython=True, nogil=True, parallel=nbpll)
+def pair_histogram(offsets, u0, u1, u2, kind, cells, rin2, nbins, binoff,
+                   binof, order, start, sa, sb, rmin, width, nbin, nchunk):
+    """
+    Histogram of (minimum image) pair distances between two sets of atoms,
+    accumulated over all frames.
+
+    Frames are split into nchunk contiguous chunks that are processed in
+    parallel, each with its own histogram; pair distances are binned as
+    they are computed and never stored. Binned coordinates are those
+    returned by :func:`~exatomic.algorithms.distance.frame_bins`.
+
+    Args:
+        offsets (array): Frame boundaries (length number of frames + 1)
+        sa (array): 1 if an atom belongs to the first set (else 0)
+        sb (array): 1 if an atom belongs to the second set (else 0)
+        rmin (float): Lower edge of the first bin
+        width (float): Bin width
+        nbin (int): Number of bins
+        nchunk (int): Number of (parallel) frame chunks
+
+    Returns:
+        hist (array): Number of (ordered, a to b) pairs per bin
+    """
+    nf = len(offsets) - 1
+    periodic = kind > 0
+    dmax2 = (rmin + width*nbin)**2
+    chunks = np.zeros((nchunk, nbin), dtype=np.int64)
+    for c in nb.prange(nchunk):
+        for f in range(c*nf//nchunk, (c + 1)*nf//nchunk):
+            cell = cells[f]
+            for i in range(offsets[f], offsets[f+1]):
+                if sa[i] == 0 and sb[i] == 0:
+                    continue
+                for bn in cell_neighbors(binof[i] - binoff[f], nbins[f], periodic):
+                    for p in range(start[binoff[f] + bn], start[binoff[f] + bn + 1]):
+                        j = order[p]
+                        if j <= i:
+                            continue
+                        w = sa[i]*sb[j] + sb[i]*sa[j]
+                        if w == 0:
+                            continue
+                        dr2 = pair_displacement(u0, u1, u2, i, j, kind, cell,
+                                                dmax2, rin2[f])[3]
+                        if dr2 < dmax2:
+                            b = np.int64(np.floor((np.sqrt(dr2) - rmin)/width))
+                            if b >= 0 and b < nbin:
+                                chunks[c, b] += w
+    hist = np.zeros((nbin, ), dtype=np.int64)
+    for c in range(nchunk):
+        for b in range(nbin):
+            hist[b] += chunks[c, b]
+    return hist
+
+
+def radial_pcf(universe, a, b, dr=0.05, start=1.0, stop=13.0,
+               length="Angstrom", window=1, method="cell"):
+    """
+    Compute the radial pair correlation function directly from the atomic
+    coordinates of a periodic universe.
+
+    Unlike :func:`~exatomic.algorithms.pcf.radial_pair_correlation`, no two
+    body table is required: minimum image pair distances between atoms of
+    type a and b are binned inside a compiled kernel
+    (:func:`~exatomic.algorithms.pcf.pair_histogram`) that runs over all
+    frames in parallel, so the cost is a single pass over the coordinates.
+
+    .. code-block:: Python
+
+        pcf = radial_pcf(universe, "O", "H", stop=6.0)
+        pcf = radial_pcf(universe, "O", "O", method="brute")   # No cell lists
+
+    The normalization uses each frame's cell volume and numbers of a and b
+    atoms, so variable cell trajectories are handled exactly. The coordination
+    number, n(r), is the mean number of b atoms around an a atom between
+    start and r.
+
+    Args:
+        universe (:class:`~exatomic.Universe`): The (periodic) universe
+        a (str, list, array): First atom type (see :func:`~exatomic.algorithms.pcf.radial_pair_correlation`)
+        b (str, list, array): Second atom type
+        dr (float): Radial step size
+        start (float): Starting radial point
+        stop (float): Stopping radial point
+        length (str): Output unit of length
+        window (int): Smoothen data (default no smoothing)
+        method (str): Linked-cell ("cell") or all pairs ("brute") search
+
+    Returns:
+        pcf (:class:`~pandas.DataFrame`): Pair correlation distribution and count
+
+    Warning:
+        Only the minimum image of each pair is considered, so stop should not
+        exceed half of the (smallest) cell width.
+    """
+    if not universe.periodic:
+        raise PeriodicUniverseError()
+    bins = np.arange(start, stop, dr)
+    nbin = len(bins) - 1
+    kind = boundary_kind(universe)
+    atom = universe.atom
+    sa = atom.index.isin(_atom_selection(universe, a)).astype(np.int64)
+    sb = atom.index.isin(_atom_selection(universe, b)).astype(np.int64)
+    x, y, z, _, offsets, cells, sa, sb = frame_arrays(universe, kind, sa, sb)
+    cells = np.ascontiguousarray(cells, dtype=np.float64)
+    u0, u1, u2, rin2, nbins, binoff, binof, order, first = frame_bins(
+        x, y, z, offsets, cells, kind, bins[-1], method == "cell")
+    nf = len(offsets) - 1
+    nchunk = max(1, min(nf, 4*nb.config.NUMBA_NUM_THREADS))
+    hist = pair_histogram(offsets, u0, u1, u2, kind, cells, rin2, nbins, binoff,
+                          binof, order, first, sa, sb, bins[0], dr, nbin, nchunk)
+    # Ordered (a to b) pairs per frame and cell volumes
+    fcodes = np.repeat(np.arange(nf), np.diff(offsets))
+    acount = np.bincount(fcodes, weights=sa, minlength=nf)
+    bcount = np.bincount(fcodes, weights=sb, minlength=nf)
+    abcount = np.bincount(fcodes, weights=sa*sb, minlength=nf)
+    density = ((acount*bcount - abcount)/np.abs(np.linalg.det(cells))).sum()
+    v_shell = 4/3*np.pi*(bins[1:]**3 - bins[:-1]**3)
+    g = hist/(density*v_shell)
+    n = hist.cumsum()/acount.sum()
+    return _pcf_frame(bins, g, n, length, window)
+
+
 def radial_pcf_out_of_core(hdftwo, hdfout, u, pairs, **kwargs):
     """
     Out of core radial pair correlation calculation.
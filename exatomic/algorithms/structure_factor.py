@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2015-2018, Exa Analytics Development Team
+# Distributed under the terms of the Apache License 2.0
+"""
+Static Structure Factors
+############################
+The static structure factor, S(q), is computed directly from atomic
+coordinates; the lossy transform of a (truncated) radial pair correlation
+function is avoided.
+
+For periodic universes, atoms are deposited (cloud-in-cell) onto a grid in
+fractional coordinates and the density is Fourier transformed with
+:func:`~numpy.fft.fftn`, so the cost per frame is O(N + M log M) for M grid
+points rather than O(N^2). For (small) free boundary clusters, the Debye sum
+over all pairs is available.
+
+Form factors are given per atomic symbol, either as constants (e.g. neutron
+scattering lengths) or as functions of the momentum transfer q (e.g. X-ray
+atomic form factors). By default all form factors are 1.
+
+.. math::
+
+    S\\left(q\\right) = \\frac{\\left|\\sum_{i}f_{i}\\left(q\\right)
+        e^{-i\\mathbf{q}\\cdot\\mathbf{r}_{i}}\\right|^{2}}{\\sum_{i}f_{i}^{2}\\left(q\\right)}
+"""
+import numpy as np
+import numba as nb
+import pandas as pd
+from itertools import product
+from exatomic.base import nbpll
+from exatomic.core.error import PeriodicUniverseError
+
+
+def _form_factors(species, q, form_factors=None):
+    """
+    Form factors of each species (rows) at each q (columns).
+
+    Args:
+        species (list): Atomic symbols
+        q (array): Momentum transfer values
+        form_factors (dict): Symbol keys, constant or callable (of q) values
+    """
+    ff = np.ones((len(species), len(q)), dtype=np.float64)
+    if form_factors is not None:
+        for i, sym in enumerate(species):
+            value = form_factors.get(sym, 1.0)
+            ff[i] = value(q) if callable(value) else value
+    return ff
+
+
+def _species_codes(atom):
+    """Unique symbols and the (integer) species code of each atom."""
+    symbols = atom['symbol'].astype('category')
+    return list(symbols.cat.categories), symbols.cat.codes.values.astype(np.int64)
+
+
+def _frame_offsets(atom):
+    """Atom positions sorted by frame, frame values, and frame boundaries."""
+    frames = atom['frame'].values.astype(np.int64)
+    order = np.argsort(frames, kind="mergesort")
+    fdxs, counts = np.unique(frames[order], return_counts=True)
+    return order, fdxs, np.concatenate(([0], np.cumsum(counts)))
+
+
+def deposit(frac, nbins):
+    """
+    Cloud-in-cell deposition of points (fractional coordinates) onto a
+    periodic grid.
+
+    Args:
+        frac (array): Fractional coordinates (shape (n, 3))
+        nbins (int): Number of grid points in each dimension
+
+    Returns:
+        rho (array): Grid (shape (nbins, nbins, nbins)) of deposited weights
+    """
+    grid = (frac % 1.0)*nbins
+    i0 = np.floor(grid).astype(np.int64)
+    t = grid - i0
+    rho = np.zeros((nbins**3, ), dtype=np.float64)
+    for corner in product((0, 1), repeat=3):
+        idx = (i0 + corner) % nbins
+        w = np.where(corner, t, 1.0 - t).prod(axis=1)
+        rho += np.bincount((idx[:, 0]*nbins + idx[:, 1])*nbins + idx[:, 2],
+                           weights=w, minlength=nbins**3)
+    return rho.reshape(nbins, nbins, nbins)
+
+
+def structure_factor(universe, nbins=64, dq=0.05, qmax=None,
+                     form_factors=None, deconvolve=True):
+    """
+    Compute the (isotropic) static structure factor of a periodic universe
+    by grid FFT, averaged over all frames.
+
+    .. code-block:: python
+
+        sq = structure_factor(uni)                          # Number S(q)
+        sq = structure_factor(uni, form_factors={'O': 5.803, 'H': -3.739})
+
+    Each species is deposited onto its own grid so that q dependent form
+    factors can be applied in reciprocal space. Reciprocal lattice vectors
+    are binned by magnitude (in shells of width dq) and averaged.
+
+    Args:
+        universe (:class:`~exatomic.core.universe.Universe`): Periodic universe
+        nbins (int): Number of grid points along each cell vector
+        dq (float): Width of the q shells (inverse bohr)
+        qmax (float): Largest q (default half the Nyquist wavenumber of the largest cell)
+        form_factors (dict): Symbol keys, constant or callable (of q) values
+        deconvolve (bool): Divide by the cloud-in-cell window (default True)
+
+    Returns:
+        sq (:class:`~pandas.DataFrame`): Structure factor as a function of q
+    """
+    if not universe.periodic:
+        raise PeriodicUniverseError()
+    atom = universe.atom
+    species, zcodes = _species_codes(atom)
+    order, fdxs, offsets = _frame_offsets(atom)
+    cells = universe.frame.get_cell_vectors()[universe.frame.index.get_indexer(fdxs)]
+    xyz = atom[['x', 'y', 'z']].values.astype(np.float64)[order]
+    zcodes = zcodes[order]
+    if qmax is None:
+        qmax = np.pi*nbins/(2*np.linalg.norm(cells, axis=2).max())
+    edges = np.arange(0.0, qmax + dq, dq)
+    nq = len(edges) - 1
+    m = np.fft.fftfreq(nbins, 1.0/nbins)
+    mvec = np.stack(np.meshgrid(m, m, m, indexing='ij'), axis=-1).reshape(-1, 3)
+    window = np.ones((nbins**3, ), dtype=np.float64)
+    if deconvolve:
+        w = np.sinc(m/nbins)**2
+        window = (w[:, None, None]*w[None, :, None]*w[None, None, :]).ravel()
+    ssum = np.zeros((nq, ), dtype=np.float64)
+    count = np.zeros((nq, ), dtype=np.float64)
+    for f in range(len(fdxs)):
+        sl = slice(offsets[f], offsets[f+1])
+        inv = np.linalg.inv(cells[f])
+        qn = np.linalg.norm(2*np.pi*np.dot(mvec, inv.T), axis=1)
+        b = np.floor(qn/dq).astype(np.int64)
+        valid = (qn > 0) & (b < nq)
+        b = b[valid]
+        ff = _form_factors(species, qn[valid], form_factors)
+        frac = np.dot(xyz[sl], inv)
+        zc = zcodes[sl]
+        amp = np.zeros((len(b), ), dtype=np.complex128)
+        norm = np.zeros((len(b), ), dtype=np.float64)
+        for s in np.unique(zc):
+            rho = np.fft.fftn(deposit(frac[zc == s], nbins)).ravel()
+            amp += ff[s]*rho[valid]/window[valid]
+            norm += (zc == s).sum()*ff[s]**2
+        ssum += np.bincount(b, weights=np.abs(amp)**2/norm, minlength=nq)
+        count += np.bincount(b, minlength=nq)
+    keep = count > 0
+    q = (edges[1:] + edges[:-1])/2
+    return pd.DataFrame.from_dict({'$S(q)$': ssum[keep]/count[keep]}).set_index(
+        pd.Index(q[keep], name='q'))
+
+
+@nb.jit(nopython=True, nogil=True, parallel=nbpll)
+def debye_sum(q, x, y, z, ff, zcodes):
+    """
+    Debye scattering equation (normalized by the sum of squared form factors)
+    for a single set of points.
+
+    Args:
+        q (array): Momentum transfer values
+        x (array): Array of x coordinates
+        y (array): Array of y coordinates
+        z (array): Array of z coordinates
+        ff (array): Form factors per species (rows) and q (columns)
+        zcodes (array): Species of each point
+
+    Returns:
+        sq (array): Structure factor at each q
+    """
+    n = len(x)
+    sq = np.empty((len(q), ), dtype=np.float64)
+    for k in nb.prange(len(q)):
+        acc = 0.0
+        norm = 0.0
+        for i in range(n):
+            fi = ff[zcodes[i], k]
+            norm += fi*fi
+            for j in range(i+1, n):
+                qr = q[k]*np.sqrt((x[i] - x[j])**2 + (y[i] - y[j])**2 +
+                                  (z[i] - z[j])**2)
+                sinc = 1.0 if qr == 0.0 else np.sin(qr)/qr
+                acc += fi*ff[zcodes[j], k]*sinc
+        sq[k] = 1.0 + 2*acc/norm
+    return sq
+
+
+def debye_structure_factor(universe, q=None, dq=0.05, qmax=10.0,
+                           form_factors=None):
+    """
+    Compute the static structure factor of a (small) free boundary cluster
+    using the Debye scattering equation, averaged over all frames.
+
+    .. code-block:: python
+
+        sq = debye_structure_factor(uni, qmax=5.0)
+
+    Args:
+        universe (:class:`~exatomic.core.universe.Universe`): Universe
+        q (array): Momentum transfer values (default dq to qmax in steps of dq)
+        dq (float): Step size in q
+        qmax (float): Largest q
+        form_factors (dict): Symbol keys, constant or callable (of q) values
+
+    Returns:
+        sq (:class:`~pandas.DataFrame`): Structure factor as a function of q
+
+    Warning:
+        The cost is O(N^2) per q value; for periodic systems use
+        :func:`~exatomic.algorithms.structure_factor.structure_factor`.
+    """
+    if q is None:
+        q = np.arange(dq, qmax + dq/2, dq)
+    q = np.asarray(q, dtype=np.float64)
+    atom = universe.atom
+    species, zcodes = _species_codes(atom)
+    order, fdxs, offsets = _frame_offsets(atom)
+    xyz = atom[['x', 'y', 'z']].values.astype(np.float64)[order]
+    zcodes = zcodes[order]
+    ff = _form_factors(species, q, form_factors)
+    sq = np.zeros((len(q), ), dtype=np.float64)
+    for f in range(len(fdxs)):
+        sl = slice(offsets[f], offsets[f+1])
+        sq += debye_sum(q, xyz[sl, 0].copy(), xyz[sl, 1].copy(),
+                        xyz[sl, 2].copy(), ff, zcodes[sl])
+    return pd.DataFrame.from_dict({'$S(q)$': sq/len(fdxs)}).set_index(
+        pd.Index(q, name='q'))
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2015-2018, Exa Analytics Development Team
+# Distributed under the terms of the Apache License 2.0
+"""
+Tests for Bond Angles and Dihedrals
+#####################################
+"""
+import numpy as np
+import pandas as pd
+from unittest import TestCase
+from exatomic.core.universe import Universe
+
+
+class TestAngles(TestCase):
+    def setUp(self):
+        # Four atom chain: 120 degree bond angles and a 90 degree dihedral
+        self.xyz = np.array([[-1.0, np.sqrt(3), 0.0], [0.0, 0.0, 0.0],
+                             [2.0, 0.0, 0.0], [3.0, 0.0, np.sqrt(3)]])
+        self.atom = pd.DataFrame.from_dict({
+            'x': np.tile(self.xyz[:, 0], 2), 'y': np.tile(self.xyz[:, 1], 2),
+            'z': np.tile(self.xyz[:, 2], 2), 'frame': np.repeat([0, 1], 4),
+            'symbol': ['C']*8})
+
+    def check(self, uni):
+        uni.compute_atom_two(C=1.2)
+        uni.compute_atom_angle()
+        uni.compute_atom_dihedral()
+        angle = uni.atom_angle
+        self.assertEqual(len(angle), 4)
+        self.assertTrue(np.allclose(angle['angle'], 2*np.pi/3))
+        self.assertTrue(np.all(np.sort(angle['atom0'].values) == [1, 2, 5, 6]))
+        self.assertTrue(np.all(np.sort(angle['frame'].values) == [0, 0, 1, 1]))
+        dihedral = uni.atom_dihedral
+        self.assertEqual(len(dihedral), 2)
+        self.assertTrue(np.allclose(np.abs(dihedral['dihedral']), np.pi/2))
+        chains = dihedral[['atom0', 'atom1', 'atom2', 'atom3']].values
+        self.assertTrue(np.all(chains[:, 1:3] == [[1, 2], [5, 6]]))
+
+    def test_free_boundary(self):
+        uni = Universe(atom=self.atom.copy())
+        self.check(uni)
+        self.assertTrue(np.allclose(uni.atom_dihedral['dihedral'], np.pi/2))
+
+    def test_periodic(self):
+        """Chains split across the cell boundary use minimum image bond vectors."""
+        atom = self.atom.copy()
+        atom[['x', 'y', 'z']] = (atom[['x', 'y', 'z']].values - 0.5) % 10.0
+        frame = pd.DataFrame(np.tile(np.eye(3).ravel()*10.0, (2, 1)),
+                             columns=["xi", "yi", "zi", "xj", "yj", "zj", "xk", "yk", "zk"])
+        frame['periodic'] = True
+        frame['atom_count'] = 4
+        self.check(Universe(atom=atom, frame=frame))
+
+    def test_compact(self):
+        uni = Universe(atom=self.atom.copy())
+        uni.compute_atom_two(C=1.2)
+        uni.compute_atom_angle(compact=True)
+        self.assertEqual(uni.atom_angle['angle'].dtype, np.float32)
+        self.assertEqual(uni.atom_angle['atom0'].dtype, np.int32)
@@ -14,7 +14,8 @@ from unittest import TestCase
 from exatomic.base import resource
 from exatomic import nwchem, molcas
 from ..basis import (cart_lml_count, spher_lml_count, solid_harmonics,
-                     enum_cartesian, car2sph, BasisFunctions)
+                     enum_cartesian, car2sph, evaluate_expr, diff_expr,
+                     BasisFunctions)
 
 
 class TestCartesianToSpherical(TestCase):
@@ -53,3 +54,54 @@ class TestBasisFunctions(TestCase):
             self.assertTrue(np.isclose(np.float64(a), np.float64(b)))
         self.assertFalse(len(nwfns[11].expand().as_coefficients_dict()) ==
                          len(mofns[11].expand().as_coefficients_dict()))
+
+    def test_numerical_evaluation(self):
+        xs = np.linspace(-3., 3., 11)
+        ys = np.linspace(-2., 4., 11)
+        zs = np.linspace(1., -5., 11)
+        for uni in (self.nw, self.mo):
+            fns = uni.basis_functions.evaluate()
+            vals = uni.basis_functions.evaluate(xs, ys, zs)
+            self.assertEqual(vals.shape, (len(fns), len(xs)))
+            for i, fn in enumerate(fns):
+                self.assertTrue(np.allclose(vals[i],
+                                            evaluate_expr(fn, xs, ys, zs)))
+
+    def test_derivative_evaluation(self):
+        xs = np.linspace(-3., 3., 11)
+        ys = np.linspace(-2., 4., 11)
+        zs = np.linspace(1., -5., 11)
+        fns = self.mo.basis_functions.evaluate()
+        for cart in ('x', 'y', 'z'):
+            vals = self.mo.basis_functions.evaluate_diff(xs, ys, zs, cart=cart)
+            self.assertEqual(vals.shape, (len(fns), len(xs)))
+            for i, fn in enumerate(fns):
+                chk = evaluate_expr(diff_expr(fn, cart=cart), xs, ys, zs)
+                self.assertTrue(np.allclose(vals[i], chk))
+
+    def test_separable_evaluation(self):
+        x = np.linspace(-3., 3., 5)
+        y = np.linspace(-2., 4., 4)
+        z = np.linspace(1., -5., 3)
+        xs, ys, zs = (g.ravel() for g in np.meshgrid(x, y, z, indexing='ij'))
+        for uni in (self.nw, self.mo):
+            pts = uni.basis_functions.evaluate(xs, ys, zs)
+            sep = uni.basis_functions.evaluate(x, y, z, separable=True)
+            self.assertTrue(np.allclose(pts, sep))
+
+    def test_screened_evaluation(self):
+        xs = np.linspace(-8., 8., 301)
+        ys = np.linspace(-6., 6., 301)
+        zs = np.linspace(5., -5., 301)
+        for uni in (self.nw, self.mo):
+            dense = uni.basis_functions.evaluate(xs, ys, zs)
+            bptr, bfns, vals = uni.basis_functions.evaluate_screened(
+                xs, ys, zs, tol=1e-10, block=16)
+            self.assertLess(len(bfns), dense.shape[0] * (len(bptr) - 1))
+            sparse = np.zeros_like(dense)
+            for b in range(len(bptr) - 1):
+                i0 = b * 16
+                i1 = min(i0 + 16, len(xs))
+                for e in range(bptr[b], bptr[b + 1]):
+                    sparse[bfns[e], i0:i1] = vals[e, :i1 - i0]
+            self.assertTrue(np.allclose(sparse, dense, atol=1e-10))
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2015-2018, Exa Analytics Development Team
+# Distributed under the terms of the Apache License 2.0
+"""
+Tests for Displacement and Autocorrelation
+############################################
+"""
+import numpy as np
+import pandas as pd
+from unittest import TestCase
+from exatomic.core.universe import Universe
+from exatomic.algorithms.displacement import (mean_squared_displacement,
+                                              velocity_autocorrelation,
+                                              power_spectrum)
+
+
+class TestDisplacement(TestCase):
+    def setUp(self):
+        # Random walk of 6 atoms over 50 frames (atoms shuffled within frames)
+        rng = np.random.RandomState(3)
+        self.nt, self.nat, self.a = 50, 6, 10.0
+        self.xyz = np.cumsum(rng.normal(0, 0.8, (self.nt, self.nat, 3)), axis=0)
+        self.vel = rng.normal(0, 1, (self.nt, self.nat, 3))
+        self.symbols = np.array(['O', 'H', 'H', 'O', 'H', 'H'])
+        perm = np.concatenate([rng.permutation(self.nat) + i*self.nat
+                               for i in range(self.nt)])
+        self.atom = pd.DataFrame.from_dict({
+            'x': self.xyz[:, :, 0].ravel(), 'y': self.xyz[:, :, 1].ravel(),
+            'z': self.xyz[:, :, 2].ravel(), 'vx': self.vel[:, :, 0].ravel(),
+            'vy': self.vel[:, :, 1].ravel(), 'vz': self.vel[:, :, 2].ravel(),
+            'frame': np.repeat(np.arange(self.nt), self.nat),
+            'label': np.tile(np.arange(self.nat), self.nt),
+            'symbol': np.tile(self.symbols, self.nt)}).iloc[perm]
+
+    def reference(self, x, func):
+        """Brute force O(T^2) average over time origins, per species."""
+        values = np.array([func(x[m:], x[:self.nt-m]).mean(axis=0)
+                           for m in range(self.nt)])
+        return {sym: values[:, self.symbols == sym].mean(axis=1)
+                for sym in ('H', 'O')}
+
+    def test_msd(self):
+        ref = self.reference(self.xyz, lambda a, b: ((a - b)**2).sum(axis=2))
+        for chunk in (None, 4):
+            msd = mean_squared_displacement(Universe(atom=self.atom.copy()), chunk=chunk)
+            for sym in ('H', 'O'):
+                self.assertTrue(np.allclose(msd[sym].values, ref[sym]))
+
+    def test_msd_labels(self):
+        """Labels are computed if missing but not added to the atom table."""
+        uni = Universe(atom=self.atom.sort_index().drop('label', axis=1))
+        msd = mean_squared_displacement(uni)
+        ref = self.reference(self.xyz, lambda a, b: ((a - b)**2).sum(axis=2))
+        for sym in ('H', 'O'):
+            self.assertTrue(np.allclose(msd[sym].values, ref[sym]))
+        self.assertNotIn('label', uni.atom.columns)
+
+    def test_msd_periodic(self):
+        """Wrapped coordinates are unwrapped with the cell."""
+        atom = self.atom.copy()
+        atom[['x', 'y', 'z']] = atom[['x', 'y', 'z']].values % self.a
+        frame = pd.DataFrame(np.tile(np.eye(3).ravel()*self.a, (self.nt, 1)),
+                             columns=["xi", "yi", "zi", "xj", "yj", "zj", "xk", "yk", "zk"])
+        frame['periodic'] = True
+        frame['atom_count'] = self.nat
+        msd = mean_squared_displacement(Universe(atom=atom, frame=frame), chunk=5)
+        ref = self.reference(self.xyz, lambda a, b: ((a - b)**2).sum(axis=2))
+        for sym in ('H', 'O'):
+            self.assertTrue(np.allclose(msd[sym].values, ref[sym]))
+
+    def test_vacf(self):
+        ref = self.reference(self.vel, lambda a, b: (a*b).sum(axis=2))
+        vacf = velocity_autocorrelation(Universe(atom=self.atom.copy()), chunk=2)
+        for sym in ('H', 'O'):
+            self.assertTrue(np.allclose(vacf[sym].values, ref[sym]))
+        spectrum = power_spectrum(vacf, dt=2.0)
+        self.assertEqual(len(spectrum), self.nt)
+        self.assertTrue(np.isclose(spectrum.index[-1], 0.25))
@@ -7,7 +7,15 @@ Two Body Properties Computations
 """
 import numpy as np
 from unittest import TestCase
-from exatomic.algorithms.distance import cartmag
+from exatomic.algorithms.distance import (cartmag, pdist, pdist_ortho,
+                                          pdist_cell, pdist_cell_nv, pdist_tric,
+                                          pdist_frames, pdist_verlet, pdist_chunks)
+
+
+def _sorted_pairs(atom0, atom1, *values):
+    """Sort two body data by atom pair for comparison."""
+    order = np.lexsort((atom1, atom0))
+    return [atom0[order], atom1[order]] + [v[order] for v in values]
 
 
 class Test3DOperations(TestCase):
@@ -22,3 +30,188 @@ class Test3DOperations(TestCase):
         check = (x**2 + y**2 + z**2)**0.5
         result = cartmag(x, y, z)
         self.assertTrue(np.allclose(check, result))
+
+
+class TestPdistOrthoMinimumImage(TestCase):
+    def test_ortho_mi(self):
+        """Closed-form minimum image matches the 27 projection search."""
+        np.random.seed(1)
+        a, b, c = 10.0, 11.0, 12.0
+        x = np.random.rand(150)*a
+        y = np.random.rand(150)*b
+        z = np.random.rand(150)*c
+        index = np.arange(150)
+        offsets = np.array([0, 150])
+        cells = np.diag([a, b, c])[None, :, :]
+        chk = pdist_ortho(x, y, z, a, b, c, index, 5.5)
+        chk = _sorted_pairs(chk[4], chk[5], chk[3], chk[6], chk[0])
+        for vector in (True, False):
+            res = pdist_frames(x, y, z, index, offsets, cells, 1, 5.5,
+                               "brute", vector=vector)
+            self.assertEqual(vector, 'dx' in res)
+            res = _sorted_pairs(res['atom0'], res['atom1'], res['dr'],
+                                res['projection'], *([res['dx']] if vector else []))
+            for i, j in zip(chk, res):
+                self.assertTrue(np.allclose(i, j))
+
+
+class TestPdistCell(TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.n = 200
+        self.x, self.y, self.z = np.random.rand(3, self.n)*12.0
+        self.index = np.arange(self.n)
+
+    def test_free(self):
+        """Linked-cell and brute force results are identical."""
+        chk = pdist(self.x, self.y, self.z, self.index, 3.0)
+        res = pdist_cell(self.x, self.y, self.z, self.index, 3.0)
+        chk = _sorted_pairs(chk[4], chk[5], chk[0], chk[3])
+        res = _sorted_pairs(res[4], res[5], res[0], res[3])
+        for c, r in zip(chk, res):
+            self.assertTrue(np.allclose(c, r))
+
+    def test_ortho(self):
+        """Includes a small cell (fewer than three bins per dimension)."""
+        for a, dmax in [(12.0, 3.0), (12.0, 5.0)]:
+            chk = pdist_ortho(self.x, self.y, self.z, a, a, a, self.index, dmax)
+            res = pdist_cell_nv(self.x, self.y, self.z, self.index, dmax, a, a, a)
+            chk = _sorted_pairs(chk[4], chk[5], chk[3], chk[6])
+            res = _sorted_pairs(res[1], res[2], res[0], res[3])
+            for c, r in zip(chk, res):
+                self.assertTrue(np.allclose(c, r))
+
+
+class TestPdistTric(TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.cell = np.array([[8.0, 0.0, 0.0], [2.5, 7.0, 0.0], [-1.5, 1.0, 9.0]])
+        self.xyz = np.random.rand(80, 3).dot(self.cell)
+        self.index = np.arange(len(self.xyz))
+
+    def _check(self, dmax):
+        """Explicit minimum over the 27 projections of each (unit cell) pair."""
+        s = np.linalg.solve(self.cell.T, self.xyz.T).T
+        s -= np.floor(s)
+        prjs = np.array([(i, j, k) for i in (-1, 0, 1) for j in (-1, 0, 1)
+                         for k in (-1, 0, 1)])
+        drs, prj = [], []
+        for i in range(len(s)):
+            for j in range(i + 1, len(s)):
+                r = np.linalg.norm((s[i] - s[j] + prjs).dot(self.cell), axis=1)
+                if r.min() < dmax:
+                    drs.append(r.min())
+                    prj.append(r.argmin())
+        return np.array(drs), np.array(prj)
+
+    def test_tric(self):
+        """Includes a cutoff larger than the inscribed sphere of the cell."""
+        for dmax in [3.0, 6.0]:
+            dr, prj = self._check(dmax)
+            x, y, z = self.xyz.T.copy()
+            res = pdist_tric(x, y, z, self.cell, self.index, dmax)
+            res = _sorted_pairs(res[4], res[5], res[3], res[6])
+            self.assertTrue(np.allclose(dr, res[2]))
+            self.assertTrue(np.all(prj == res[3]))
+
+
+class TestPdistFrames(TestCase):
+    def setUp(self):
+        np.random.seed(3)
+        self.sizes = [40, 0, 55, 60]
+        self.offsets = np.concatenate(([0], np.cumsum(self.sizes)))
+        n = self.offsets[-1]
+        self.x, self.y, self.z = np.random.rand(3, n)*9.0
+        self.index = np.arange(n)
+        self.cells = np.array([np.diag([9.0, 9.5, 10.0])]*len(self.sizes))
+
+    def _frames(self, kind, dmax):
+        """Per frame (serial) reference data."""
+        values = []
+        for f in range(len(self.sizes)):
+            sl = slice(self.offsets[f], self.offsets[f+1])
+            if kind == 0:
+                v = pdist(self.x[sl], self.y[sl], self.z[sl], self.index[sl], dmax)
+            else:
+                a, b, c = np.diag(self.cells[f])
+                v = pdist_ortho(self.x[sl], self.y[sl], self.z[sl], a, b, c,
+                                self.index[sl], dmax)
+            values.append(v)
+        return [np.concatenate(v) for v in zip(*values)]
+
+    def test_frames(self):
+        """All frames at once matches the per frame computation."""
+        for kind in (0, 1):
+            for method in ("cell", "brute"):
+                ref = self._frames(kind, 3.0)
+                res = pdist_frames(self.x, self.y, self.z, self.index,
+                                   self.offsets, self.cells, kind, 3.0, method)
+                self.assertEqual(kind == 1, 'projection' in res)
+                ref = _sorted_pairs(ref[4], ref[5], ref[0], ref[3])
+                res = _sorted_pairs(res['atom0'], res['atom1'], res['dx'], res['dr'])
+                for r, v in zip(ref, res):
+                    self.assertTrue(np.allclose(r, v))
+
+
+    def test_compact_range(self):
+        """Compact storage rejects atom indexes outside the int32 range."""
+        for bad in (np.iinfo(np.int32).min - 1, np.iinfo(np.int32).max + 1):
+            index = self.index.copy()
+            index[0] = bad
+            with self.assertRaises(ValueError):
+                pdist_frames(self.x, self.y, self.z, index, self.offsets,
+                             self.cells, 1, 3.0, compact=True)
+
+
+class TestPdistVerlet(TestCase):
+    def test_verlet(self):
+        """Verlet lists reproduce the full computation for every frame."""
+        np.random.seed(4)
+        n, nf, a = 120, 12, 12.0
+        xyz = [np.random.rand(n, 3)*a]
+        for _ in range(nf - 1):
+            xyz.append(xyz[-1] + np.random.randn(n, 3)*0.05)
+        xyz = np.vstack(xyz) % a
+        x, y, z = xyz.T.copy()
+        index = np.arange(n*nf)
+        offsets = np.arange(nf + 1)*n
+        cells = np.array([np.diag([a, a, a])]*nf)
+        for kind in (0, 1):
+            ref = pdist_frames(x, y, z, index, offsets, cells, kind, 4.0)
+            res, builds = pdist_verlet(x, y, z, index, offsets, cells, kind,
+                                       4.0, 1.0)
+            self.assertLess(len(builds), nf)
+            self.assertEqual(list(ref.keys()), list(res.keys()))
+            ref = _sorted_pairs(ref['atom0'], ref['atom1'], ref['dx'], ref['dr'])
+            res = _sorted_pairs(res['atom0'], res['atom1'], res['dx'], res['dr'])
+            for r, v in zip(ref, res):
+                self.assertTrue(np.allclose(r, v))
+
+
+class TestPdistChunks(TestCase):
+    def test_chunks(self):
+        """Chunks concatenate to the full (single pass) result."""
+        np.random.seed(5)
+        a, b, c = 8.0, 9.0, 10.0
+        x = np.random.rand(200)*a
+        y = np.random.rand(200)*b
+        z = np.random.rand(200)*c
+        index = np.arange(200)
+        ref = pdist_ortho(x, y, z, a, b, c, index, 3.0)
+        chunks = list(pdist_chunks(x, y, z, index, 3.0, a, b, c, chunksize=500))
+        self.assertGreater(len(chunks), 1)
+        self.check(ref, chunks)
+        ref = pdist(x, y, z, index, 3.0)
+        chunks = list(pdist_chunks(x, y, z, index, 3.0, chunksize=500))
+        self.assertNotIn('projection', chunks[0])
+        self.check(ref, chunks)
+
+    def check(self, ref, chunks):
+        """Images are built differently, so distances agree to round-off."""
+        columns = ['dx', 'dy', 'dz', 'dr', 'atom0', 'atom1', 'projection']
+        for col, r in zip(columns, ref):
+            v = np.concatenate([chunk[col] for chunk in chunks])
+            if col in ('atom0', 'atom1', 'projection'):
+                self.assertTrue(np.array_equal(r, v))
+            else:
+                self.assertTrue(np.allclose(r, v))
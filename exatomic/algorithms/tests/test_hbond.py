@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2015-2018, Exa Analytics Development Team
+# Distributed under the terms of the Apache License 2.0
+"""
+Tests for Hydrogen Bonds
+##############################
+"""
+import numpy as np
+import pandas as pd
+from unittest import TestCase
+from exatomic.core.universe import Universe
+from exatomic.algorithms.hbond import compute_hbonds, hbond_lifetimes
+
+
+class TestHBonds(TestCase):
+    def setUp(self):
+        # Water dimer (bohr), the first water donates to the second
+        xyz = np.array([[0.0, 0.0, 0.0], [1.8, 0.0, 0.0], [-0.45, 1.74, 0.0],
+                        [5.5, 0.0, 0.0], [6.0, 1.7, 0.0], [6.0, -1.7, 0.0]])
+        self.atom = pd.DataFrame.from_dict({
+            'x': np.tile(xyz[:, 0], 2), 'y': np.tile(xyz[:, 1], 2),
+            'z': np.tile(xyz[:, 2], 2), 'frame': np.repeat([0, 1], 6),
+            'symbol': ['O', 'H', 'H']*4})
+
+    def test_hbonds(self):
+        uni = Universe(atom=self.atom.copy())
+        uni.compute_atom_two(bonds_only=True, O=1.2, H=0.6)
+        for method in ("cell", "brute"):
+            hbonds = compute_hbonds(uni, donors="O", acceptors="O", method=method)
+            hbonds = hbonds.sort_values('frame')
+            self.assertTrue(np.all(hbonds['donor'] == [0, 6]))
+            self.assertTrue(np.all(hbonds['hydrogen'] == [1, 7]))
+            self.assertTrue(np.all(hbonds['acceptor'] == [3, 9]))
+            self.assertTrue(np.allclose(hbonds['dr'], 5.5))
+            self.assertTrue(np.allclose(hbonds['angle'], 0.0))
+        hbonds = compute_hbonds(uni, donors="O", acceptors="O", dmax=5.0)
+        self.assertEqual(len(hbonds), 0)
+
+    def test_lifetimes(self):
+        nt = 6
+        atom = pd.DataFrame.from_dict({
+            'x': np.arange(4*nt, dtype=float), 'y': 0.0, 'z': 0.0,
+            'frame': np.repeat(np.arange(nt), 4), 'label': np.tile(np.arange(4), nt),
+            'symbol': ['O', 'H', 'H', 'O']*nt})
+        uni = Universe(atom=atom)
+        h = np.array([1, 1, 1, 0, 1, 1])
+        fdxs = np.flatnonzero(h)
+        hbonds = pd.DataFrame.from_dict({'donor': fdxs*4, 'hydrogen': fdxs*4 + 1,
+                                         'acceptor': fdxs*4 + 3, 'frame': fdxs})
+        # Second triplet only bonded at the first frame
+        hbonds = pd.concat([hbonds, pd.DataFrame.from_dict({
+            'donor': [3], 'hydrogen': [2], 'acceptor': [0], 'frame': [0]})])
+        hs = np.array([h, [1, 0, 0, 0, 0, 0]])
+        inter = np.array([sum((hh[:nt-t]*hh[t:]).mean() for hh in hs) for t in range(nt)])
+        cont = np.array([sum(np.mean([hh[k:k+t+1].all() for k in range(nt-t)]) for hh in hs)
+                         for t in range(nt)])
+        for chunk in (None, 1):
+            lifetimes = hbond_lifetimes(uni, hbonds, chunk=chunk)
+            self.assertTrue(np.allclose(lifetimes['intermittent'], inter/inter[0]))
+            self.assertTrue(np.allclose(lifetimes['continuous'], cont/cont[0]))
+        # Labels are computed (not added to the atom table) if missing
+        uni = Universe(atom=atom.drop('label', axis=1))
+        lifetimes = hbond_lifetimes(uni, hbonds)
+        self.assertTrue(np.allclose(lifetimes['intermittent'], inter/inter[0]))
+        self.assertNotIn('label', uni.atom.columns)
+        with self.assertRaises(ValueError):
+            hbond_lifetimes(uni, hbonds.iloc[:0])
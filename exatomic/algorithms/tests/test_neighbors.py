@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2015-2018, Exa Analytics Development Team
+# Distributed under the terms of the Apache License 2.0
+"""
+Tests for Neighbor Selection
+##############################
+"""
+import numpy as np
+import pandas as pd
+from itertools import product
+from unittest import TestCase
+from exatomic.core.universe import Universe
+from exatomic.algorithms.neighbors import periodic_nearest_neighbors_by_atom
+
+
+class TestPeriodicNearestNeighbors(TestCase):
+    def setUp(self):
+        # Sodium near the corner of a cubic box of (wrapped) water molecules
+        rng = np.random.RandomState(1)
+        self.a = 20.0
+        grid = np.array(list(product(range(4), repeat=3)))[1:]*5.0 + 2.5
+        rows = []
+        for fdx in range(2):
+            rows.append(('Na', 1.0, 1.0, 1.0, fdx))
+            for center in grid + rng.uniform(-0.5, 0.5, grid.shape):
+                for sym, dxyz in (('O', [0.0, 0.0, 0.0]), ('H', [1.8, 0.0, 0.0]),
+                                  ('H', [0.0, 1.8, 0.0])):
+                    x, y, z = (center + dxyz) % self.a
+                    rows.append((sym, x, y, z, fdx))
+        self.atom = pd.DataFrame(rows, columns=['symbol', 'x', 'y', 'z', 'frame'])
+        self.uni = Universe(atom=self.atom.copy())
+
+    def test_nearest(self):
+        """Molecules are ranked by minimum image distance to the source."""
+        dct = periodic_nearest_neighbors_by_atom(self.uni, 'Na', self.a, [0, 3], Na=0.3)
+        nearest = dct['nearest']
+        self.assertEqual(len(nearest), 2*63)
+        images = np.array(list(product([-1, 0, 1], repeat=3)))*self.a
+        for fdx, grp in nearest.groupby('frame'):
+            self.assertTrue(np.all(grp['rank'] == np.arange(63)))
+            self.assertTrue(np.all(np.diff(grp['dr']) >= 0))
+            atom = self.atom[self.atom['frame'] == fdx]
+            xyz = atom[['x', 'y', 'z']].values
+            dxyz = xyz[:, None, :] + images[None, :, :] - xyz[0]
+            dr = np.sqrt((dxyz**2).sum(axis=2)).min(axis=1)
+            # Each water's oxygen is followed by its two hydrogens
+            ref = np.sort(dr[1:].reshape(-1, 3).min(axis=1))
+            self.assertTrue(np.allclose(grp['dr'].values, ref))
+
+    def test_cluster(self):
+        """Clusters contain the source and unwrapped nearest molecules."""
+        dct = periodic_nearest_neighbors_by_atom(self.uni, 'Na', self.a, [0, 3], Na=0.3)
+        self.assertEqual(len(dct[0].atom), 2)
+        atom = dct[3].atom
+        self.assertEqual(len(atom), 2*10)
+        for fdx, grp in atom.groupby('frame'):
+            xyz = grp[['x', 'y', 'z']].values
+            self.assertEqual(grp['symbol'].iloc[0], 'Na')
+            self.assertTrue(np.all(np.linalg.norm(xyz - xyz[0], axis=1) < 8.0))
+            oh = xyz[1:].reshape(-1, 3, 3)
+            self.assertTrue(np.allclose(np.linalg.norm(oh[:, 1:] - oh[:, :1], axis=2), 1.8))
+
+    def test_fixed_kwargs(self):
+        """Two body arguments that are set internally are rejected."""
+        for key, value in (('dmax', 10.0), ('bonds_only', False)):
+            with self.assertRaises(TypeError):
+                periodic_nearest_neighbors_by_atom(self.uni, 'Na', self.a, [0],
+                                                   Na=0.3, **{key: value})
@@ -6,7 +6,9 @@ import numpy as np
 from unittest import TestCase
 from exatomic import Universe, nwchem, molcas
 from exatomic.base import resource
-from exatomic.algorithms.orbital_util import compare_fields
+from exatomic.algorithms.orbital_util import (compare_fields, make_fps,
+                                              grid_chunks,
+                                              numerical_grid_from_field_params)
 from exatomic.algorithms.orbital import (add_molecular_orbitals,
                                          add_orb_ang_mom,
                                          add_density)
@@ -55,3 +57,52 @@ class TestNWChemOrbital(TestCase):
         mo.add_molecular_orbitals(vector=range(3, 10), verbose=False)
         res = compare_fields(nw, mo, signed=False, rtol=5e-3)
         self.assertTrue(np.isclose(sum(res), len(res), rtol=5e-3))
+
+    def test_screened_orbitals(self):
+        nw = nwchem.Output(resource('nw-ch3nh2-631g.out')).to_universe()
+        kws = {'vector': range(3, 8), 'verbose': False, 'inplace': False,
+               'field_params': {'rmin': -8, 'rmax': 8, 'nr': 21}}
+        dense = add_molecular_orbitals(nw, **kws)
+        screened = add_molecular_orbitals(nw, tol=1e-12, **kws)
+        for f0, f1 in zip(dense.field_values, screened.field_values):
+            self.assertTrue(np.allclose(f0, f1, atol=1e-8))
+
+    def test_chunked_fields(self):
+        nw = nwchem.Output(resource('nw-ch3nh2-631g.out')).to_universe()
+        kws = {'verbose': False, 'inplace': False,
+               'field_params': {'rmin': -6, 'rmax': 6, 'nr': 15}}
+        for func, extra in ((add_molecular_orbitals, {'vector': range(3, 8)}),
+                            (add_density, {})):
+            whole = func(nw, chunk=15 ** 3, **dict(kws, **extra))
+            chunked = func(nw, chunk=100, **dict(kws, **extra))
+            for f0, f1 in zip(whole.field_values, chunked.field_values):
+                self.assertTrue(np.allclose(f0, f1))
+
+    def test_single_precision(self):
+        nw = nwchem.Output(resource('nw-ch3nh2-631g.out')).to_universe()
+        kws = {'vector': range(3, 8), 'verbose': False, 'inplace': False,
+               'field_params': {'rmin': -6, 'rmax': 6, 'nr': 15}}
+        double = add_molecular_orbitals(nw, **kws)
+        single = add_molecular_orbitals(nw, dtype=np.float32, **kws)
+        for f0, f1 in zip(double.field_values, single.field_values):
+            self.assertEqual(f1.dtype, np.float32)
+            self.assertTrue(np.allclose(f0, f1, atol=1e-5))
+
+
+class TestGridChunks(TestCase):
+
+    def test_chunk_bound(self):
+        fps = make_fps(xmin=-2, xmax=2, nx=5, ymin=-3, ymax=3, ny=7,
+                       zmin=-1, zmax=1, nz=4)
+        grid = numerical_grid_from_field_params(fps)
+        for chunk in (3, 10, 28, 60, 1000):
+            last = 0
+            for sl, (x, y, z), sep in grid_chunks(fps, chunk):
+                self.assertTrue(sep)
+                self.assertEqual(sl.start, last)
+                self.assertLessEqual(sl.stop - sl.start, max(chunk, 4))
+                xs, ys, zs = (a.ravel() for a in np.meshgrid(x, y, z, indexing='ij'))
+                for a, b in zip((xs, ys, zs), grid):
+                    self.assertTrue(np.allclose(a, b[sl]))
+                last = sl.stop
+            self.assertEqual(last, 5 * 7 * 4)
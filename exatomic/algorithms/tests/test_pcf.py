@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2015-2018, Exa Analytics Development Team
+# Distributed under the terms of the Apache License 2.0
+"""
+Tests for Pair Correlation Functions
+######################################
+"""
+import numpy as np
+import pandas as pd
+from unittest import TestCase
+from exatomic.core.universe import Universe
+from exatomic.algorithms.pcf import radial_pcf
+
+
+class TestRadialPCF(TestCase):
+    def setUp(self):
+        # Random O/H atoms in a cubic box whose size changes between frames
+        rng = np.random.RandomState(2)
+        self.sizes = np.array([12.0, 12.5, 13.0])
+        nat = 40
+        xyz = rng.uniform(0, 1, (3, nat, 3))*self.sizes[:, None, None]
+        self.xyz = xyz
+        self.symbols = np.array(['O', 'H', 'H', 'H']*(nat//4))
+        atom = pd.DataFrame.from_dict({
+            'x': xyz[:, :, 0].ravel(), 'y': xyz[:, :, 1].ravel(),
+            'z': xyz[:, :, 2].ravel(), 'frame': np.repeat([0, 1, 2], nat),
+            'symbol': np.tile(self.symbols, 3)})
+        frame = pd.DataFrame(index=[0, 1, 2])
+        for col in ["xi", "yi", "zi", "xj", "yj", "zj", "xk", "yk", "zk"]:
+            frame[col] = 0.0
+        frame['xi'] = frame['yj'] = frame['zk'] = self.sizes
+        frame['periodic'] = True
+        frame['atom_count'] = nat
+        self.uni = Universe(atom=atom, frame=frame)
+
+    def reference(self, a, b, bins):
+        """Brute force minimum image histogram (ordered a to b pairs)."""
+        hist = np.zeros((len(bins) - 1, ))
+        density = 0.0
+        for xyz, size in zip(self.xyz, self.sizes):
+            ia = np.flatnonzero(self.symbols == a)
+            ib = np.flatnonzero(self.symbols == b)
+            d = xyz[ia][:, None, :] - xyz[ib][None, :, :]
+            d -= np.round(d/size)*size
+            d = np.sqrt((d**2).sum(axis=2))
+            d = d[ia[:, None] != ib[None, :]]
+            hist += np.histogram(d, bins)[0]
+            density += len(d)/size**3
+        return hist, density
+
+    def test_radial_pcf(self):
+        for a, b in (('O', 'H'), ('O', 'O'), ('H', 'H')):
+            bins = np.arange(0.5, 6.0, 0.25)
+            hist, density = self.reference(a, b, bins)
+            g = hist/(density*4/3*np.pi*(bins[1:]**3 - bins[:-1]**3))
+            for method in ("cell", "brute"):
+                pcf = radial_pcf(self.uni, a, b, dr=0.25, start=0.5, stop=6.0,
+                                 length="au", method=method)
+                self.assertTrue(np.allclose(pcf[r"$g(r)$"].values, g))
+                n = hist.cumsum()/(3*(self.symbols == a).sum())
+                self.assertTrue(np.allclose(pcf[r"$n(r)$"].values, n))
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2015-2018, Exa Analytics Development Team
+# Distributed under the terms of the Apache License 2.0
+"""
+Tests for Static Structure Factors
+####################################
+"""
+import numpy as np
+import pandas as pd
+from unittest import TestCase
+from exatomic.core.universe import Universe
+from exatomic.algorithms.structure_factor import (structure_factor,
+                                                  debye_structure_factor)
+
+
+class TestStructureFactor(TestCase):
+    def setUp(self):
+        # Atoms on grid points of a (triclinic) cell, two frames
+        rng = np.random.RandomState(4)
+        self.nbins = 8
+        self.cell = np.array([[10.0, 0.0, 0.0], [2.0, 9.0, 0.0], [1.0, 1.0, 11.0]])
+        self.frac = rng.randint(0, self.nbins, (2, 12, 3))/self.nbins
+        xyz = np.dot(self.frac, self.cell)
+        self.symbols = np.array(['O', 'H', 'H']*4)
+        atom = pd.DataFrame.from_dict({
+            'x': xyz[:, :, 0].ravel(), 'y': xyz[:, :, 1].ravel(),
+            'z': xyz[:, :, 2].ravel(), 'frame': np.repeat([0, 1], 12),
+            'symbol': np.tile(self.symbols, 2)})
+        frame = pd.DataFrame(np.tile(self.cell.ravel(), (2, 1)),
+                             columns=["xi", "yi", "zi", "xj", "yj", "zj", "xk", "yk", "zk"])
+        frame['periodic'] = True
+        frame['atom_count'] = 12
+        self.uni = Universe(atom=atom, frame=frame)
+        self.ff = {'O': 2.0, 'H': lambda q: 1.0/(1.0 + q)}
+
+    def test_grid(self):
+        """Grid FFT equals the direct sum for atoms on grid points."""
+        dq, qmax = 0.3, 2.0
+        sq = structure_factor(self.uni, nbins=self.nbins, dq=dq, qmax=qmax,
+                              form_factors=self.ff, deconvolve=False)
+        m = np.fft.fftfreq(self.nbins, 1.0/self.nbins)
+        mvec = np.stack(np.meshgrid(m, m, m, indexing='ij'), axis=-1).reshape(-1, 3)
+        qvec = 2*np.pi*np.dot(mvec, np.linalg.inv(self.cell).T)
+        qn = np.linalg.norm(qvec, axis=1)
+        keep = (qn > 0) & (qn < len(np.arange(0.0, qmax + dq, dq)[1:])*dq)
+        qvec, qn = qvec[keep], qn[keep]
+        f = np.where(self.symbols[None, :] == 'O', 2.0, 1.0/(1.0 + qn[:, None]))
+        b = np.floor(qn/dq).astype(int)
+        ref = np.zeros((b.max() + 1, ))
+        for frac in self.frac:
+            xyz = np.dot(frac, self.cell)
+            amp = (f*np.exp(-1j*np.dot(qvec, xyz.T))).sum(axis=1)
+            ref += np.bincount(b, np.abs(amp)**2/(f**2).sum(axis=1))
+        ref /= 2*np.bincount(b)
+        ref = ref[np.bincount(b) > 0]
+        self.assertTrue(np.allclose(sq['$S(q)$'].values, ref))
+
+    def test_debye(self):
+        q = np.array([0.5, 1.0, 2.0])
+        sq = debye_structure_factor(self.uni, q=q, form_factors=self.ff)
+        ref = np.zeros((3, ))
+        for frac in self.frac:
+            xyz = np.dot(frac, self.cell)
+            d = np.linalg.norm(xyz[:, None] - xyz[None, :], axis=2)
+            for k, qq in enumerate(q):
+                f = np.where(self.symbols == 'O', 2.0, 1.0/(1.0 + qq))
+                qr = qq*d
+                sinc = np.where(qr > 0, np.sin(qr)/np.where(qr > 0, qr, 1.0), 1.0)
+                ref[k] += (f[:, None]*f[None, :]*sinc).sum()/(f**2).sum()
+        self.assertTrue(np.allclose(sq['$S(q)$'].values, ref/2))
@@ -85,8 +85,28 @@ class Frame(DataFrame):
         self['ry'] = cartmag(self['xj'].values, self['yj'].values, self['zj'].values)
         self['rz'] = cartmag(self['xk'].values, self['yk'].values, self['zk'].values)
 
+    def get_cell_vectors(self):
+        """
+        Return the cell vectors of each frame as an array of shape
+        (nframe, 3, 3) whose rows are the cell vectors a, b, and c.
+
+        If only the cell magnitudes (rx, ry, rz) are available, the cells are
+        assumed to be orthorhombic.
+        """
+        cols = ["xi", "yi", "zi", "xj", "yj", "zj", "xk", "yk", "zk"]
+        if all(col in self.columns for col in cols):
+            return self[cols].values.astype(np.float64).reshape(-1, 3, 3)
+        cells = np.zeros((len(self), 3, 3), dtype=np.float64)
+        cells[:, [0, 1, 2], [0, 1, 2]] = self[["rx", "ry", "rz"]].values
+        return cells
+
     def orthorhombic(self):
-        if "xi" in self.columns and np.allclose(self["xj"], 0.0):
+        """
+        Check if the (periodic) cell is orthorhombic, i.e. all cell vectors
+        are aligned with the cartesian axes.
+        """
+        if "xi" in self.columns and np.allclose(self[["yi", "zi", "xj", "zj",
+                                                      "xk", "yk"]], 0.0):
             return True
         return False
 
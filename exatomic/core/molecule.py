@@ -7,11 +7,13 @@ Molecule Table
 """
 import numpy as np
 import pandas as pd
-import networkx as nx
 import warnings
-from networkx.algorithms.components import connected_components
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 from exa import DataFrame
 from exatomic.base import sym2mass
+from exatomic.algorithms.distance import minimum_image
+from exatomic.core.error import ClassificationError
 from exatomic.formula import string_to_dict, dict_to_string
 
 
@@ -32,19 +34,24 @@ class Molecule(DataFrame):
 
         .. code-block:: Python
 
-            u.molecule.classify(('solute', 'Na'), ('solvent', 'H(2)O(1)'))
+            u.molecule.classify(('Na', 'solute'), ('H(2)O(1)', 'solvent'))
 
         Args:
-            classifiers: Any number of tuples of the form ('label', 'identifier', exact) (see below)
+            classifiers: Any number of tuples of the form ('identifier', 'label', exact) (see below)
 
         Note:
-            A classifier has 3 parts, "label", e.g. "solvent", "identifier", e.g.
-            "H(2)O(1)", and exact (true or false). If exact is false (default),
+            A classifier has 3 parts, "identifier", e.g. "H(2)O(1)", "label", e.g.
+            "solvent", and exact (true or false). If exact is false (default),
             classification is greedy and (in this example) molecules with formulas
             "H(1)O(1)", "H(3)O(1)", etc. would get classified as "solvent". If,
             instead, exact were set to true, those molecules would remain
             unclassified.
 
+        Note:
+            Classifiers are evaluated once per unique composition (rather than
+            per molecule) and the result is broadcast to all molecules (of all
+            frames) with the same composition.
+
         Warning:
             Classifiers are applied in the order passed; where identifiers overlap,
             the latter classification is used.
@@ -56,19 +63,24 @@ class Molecule(DataFrame):
             n = len(c)
             if n != 3 and n != 2:
                 raise ClassificationError()
-        self['classification'] = None
+        symbols = self._get_symbols()
+        compositions, inverse = self._get_compositions(symbols)
+        labels = np.full((len(compositions), ), None, dtype=object)
         for classifier in classifiers:
             identifier = string_to_dict(classifier[0])
             classification = classifier[1]
             exact = classifier[2] if len(classifier) == 3 else False
-            this = self
+            match = np.ones((len(compositions), ), dtype=bool)
             for symbol, count in identifier.items():
-                this = this[this[symbol] == count] if exact else this[this[symbol] >= 1]
-            if len(this) > 0:
-                self.ix[self.index.isin(this.index), 'classification'] = classification
+                if symbol not in symbols:
+                    raise KeyError(symbol)
+                counts = compositions[:, symbols.index(symbol)]
+                match &= (counts == count) if exact else (counts >= 1)
+            if match.any():
+                labels[match] = classification
             else:
                 raise KeyError('No records found for {}, with identifier {}.'.format(classification, identifier))
-        self['classification'] = self['classification'].astype('category')
+        self['classification'] = pd.Series(labels[inverse], index=self.index).astype('category')
         if len(self[self['classification'].isnull()]) > 0:
             warnings.warn("Unclassified molecules remaining...")
 
@@ -82,14 +94,26 @@ class Molecule(DataFrame):
     def get_formula(self, as_map=False):
         """
         Compute the string representation of the molecule.
+
+        Formulas are generated once per unique composition.
         """
         symbols = self._get_symbols()
-        mcules = self[symbols].to_dict(orient='index')
-        ret = map(dict_to_string, mcules.values())
+        compositions, inverse = self._get_compositions(symbols)
+        formulas = [dict_to_string(dict(zip(symbols, row))) for row in compositions]
+        ret = map(formulas.__getitem__, inverse)
         if as_map:
             return ret
         return list(ret)
 
+    def _get_compositions(self, symbols):
+        """
+        Helper method to get the unique compositions (element counts) and the
+        composition code of each molecule.
+        """
+        counts = self[symbols].values.astype(np.int64).reshape(len(self), len(symbols))
+        compositions, inverse = np.unique(counts, axis=0, return_inverse=True)
+        return compositions, inverse.ravel()
+
     def _get_symbols(self):
         """
         Helper method to get atom symbols.
@@ -97,6 +121,40 @@ class Molecule(DataFrame):
         return [col for col in self if len(col) < 3 and col[0].istitle()]
 
 
+def compute_molecule_labels(index, frame, atom0, atom1):
+    """
+    Label the connected components (molecules) of the bond graph.
+
+    Works directly on integer arrays: bonds are mapped to atom positions,
+    bonds between atoms of different frames are ignored (so that molecules
+    never span frames), and components are found with
+    :func:`~scipy.sparse.csgraph.connected_components`. Molecules are
+    labeled 0, 1, ... in the order of their first atom.
+
+    Args:
+        index (array): Atom index
+        frame (array): Frame of each atom
+        atom0 (array): First atom (index) of each bond
+        atom1 (array): Second atom (index) of each bond
+
+    Returns:
+        labels (array): Molecule label of each atom
+    """
+    n = len(index)
+    pos = pd.Index(index)
+    i = pos.get_indexer(atom0)
+    j = pos.get_indexer(atom1)
+    keep = (i >= 0) & (j >= 0)
+    i = i[keep]
+    j = j[keep]
+    keep = frame[i] == frame[j]
+    i = i[keep]
+    j = j[keep]
+    graph = coo_matrix((np.ones(len(i), dtype=np.int8), (i, j)), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    return labels.astype(np.int64)
+
+
 def compute_molecule(universe):
     """
     Cluster atoms into molecules and create the :class:`~exatomic.molecule.Molecule`
@@ -112,69 +170,175 @@ def compute_molecule(universe):
         This function modifies the universe's atom (:class:`~exatomic.atom.Atom`)
         table in place!
     """
-    nodes = universe.atom.index.values
-    bonded = universe.atom_two.ix[universe.atom_two['bond'] == True, ['atom0', 'atom1']]
-    edges = zip(bonded['atom0'].astype(np.int64), bonded['atom1'].astype(np.int64))
-    g = nx.Graph()
-    g.add_nodes_from(nodes)
-    g.add_edges_from(edges)
-    # generate molecule indices for the atom table
-    mapper = {}
-    i = 0
-    for k, v in g.degree():    # First handle single atom "molecules"
-        if v == 0:
-            mapper[k] = i
-            i += 1
-    for seht in connected_components(g):    # Second handle multi atom molecules
-        for adx in seht:
-            mapper[adx] = i
-        i += 1
-    universe.atom['molecule'] = universe.atom.index.map(lambda x: mapper[x])
-    universe.atom['mass'] = universe.atom['symbol'].map(sym2mass)
-    grps = universe.atom.groupby('molecule')
-    molecule = grps['symbol'].value_counts().unstack().fillna(0).astype(np.int64)
-    molecule.columns.name = None
-    molecule['mass'] = grps['mass'].sum()
+    atom_two = universe.atom_two
+    bonded = atom_two.loc[atom_two['bond'] == True, ['atom0', 'atom1']]
+    universe.atom['molecule'] = compute_molecule_labels(
+        universe.atom.index.values, universe.atom['frame'].values.astype(np.int64),
+        bonded['atom0'].values.astype(np.int64), bonded['atom1'].values.astype(np.int64))
+    molecule = compute_molecule_composition(universe.atom)
     universe.atom['molecule'] = universe.atom['molecule'].astype('category')
-    del universe.atom['mass']
+    return molecule
+
+
+def _molecule_codes(atom):
+    """
+    Integer codes of the molecules of each atom.
+
+    Returns:
+        molecules (array): Sorted (unique) molecule labels
+        first (array): Position of the first atom of each molecule
+        codes (array): Position of each atom's molecule in molecules
+    """
+    mol = np.asarray(atom['molecule']).astype(np.int64)
+    return np.unique(mol, return_index=True, return_inverse=True)
+
+
+def compute_molecule_composition(atom):
+    """
+    Compute the composition (count of each element) and mass of each molecule.
+
+    Counts and masses are accumulated with :func:`~numpy.bincount` over
+    integer molecule and element (symbol) codes.
+
+    Args:
+        atom (:class:`~exatomic.core.atom.Atom`): Atom table with molecule column
+
+    Returns:
+        molecule (:class:`~pandas.DataFrame`): Element counts and mass per molecule
+    """
+    molecules, _, codes = _molecule_codes(atom)
+    symbols = atom['symbol'].astype('category')
+    categories = symbols.cat.categories
+    zcodes = symbols.cat.codes.values.astype(np.int64)
+    nmol = len(molecules)
+    nsym = len(categories)
+    counts = np.bincount(codes*nsym + zcodes, minlength=nmol*nsym)
+    masses = np.array([sym2mass[sym] for sym in categories], dtype=np.float64)
+    molecule = pd.DataFrame(counts.reshape(nmol, nsym).astype(np.int64),
+                            index=pd.Index(molecules, name='molecule'),
+                            columns=list(categories))
+    molecule['mass'] = np.bincount(codes, weights=masses[zcodes], minlength=nmol)
     return molecule
 
 
 def compute_molecule_count(universe):
     """
+    Compute the number of molecules per frame.
+
+    The frame of a molecule is the frame of its first atom.
     """
     if 'molecule' not in universe.atom.columns:
         universe.compute_molecule()
-    universe.atom._revert_categories()
-    mapper = universe.atom.drop_duplicates('molecule').set_index('molecule')['frame']
-    universe.atom._set_categories()
-    universe.molecule['frame'] = universe.molecule.index.map(lambda x: mapper[x])
-    molecule_count = universe.molecule.groupby('frame').size()
-    del universe.molecule['frame']
-    return molecule_count
+    molecules, first, _ = _molecule_codes(universe.atom)
+    frames = universe.atom['frame'].values.astype(np.int64)[first]
+    keep = np.in1d(molecules, universe.molecule.index.values)
+    fdxs, counts = np.unique(frames[keep], return_counts=True)
+    return pd.Series(counts, index=pd.Index(fdxs, name='frame'))
 
 
 def compute_molecule_com(universe):
     """
     Compute molecules' centers of mass.
+
+    For periodic universes, each molecule is unwrapped (made whole) on the
+    fly by taking the minimum image of each of its atoms with respect to the
+    molecule's first atom, such that molecules split across cell boundaries
+    get a physical center of mass.
     """
     if 'molecule' not in universe.atom.columns:
         universe.compute_molecule()
-    mass = universe.atom.get_element_masses()
+    atom = universe.atom
+    molecules, first, codes = _molecule_codes(atom)
+    mass = atom.get_element_masses().values.astype(np.float64)
+    xyz = atom[['x', 'y', 'z']].values.astype(np.float64)
     if universe.frame.is_periodic():
-        xyz = universe.atom[['x', 'y', 'z']].copy()
-        xyz.update(universe.visual_atom)
-    else:
-        xyz = universe.atom[['x', 'y', 'z']]
-    xm = xyz['x'].mul(mass)
-    ym = xyz['y'].mul(mass)
-    zm = xyz['z'].mul(mass)
-    #rm = xm.add(ym).add(zm)
-    df = pd.DataFrame.from_dict({'xm': xm, 'ym': ym, 'zm': zm, 'mass': mass,
-                                 'molecule': universe.atom['molecule']})
-    groups = df.groupby('molecule')
-    sums = groups.sum()
-    cx = sums['xm'].div(sums['mass'])
-    cy = sums['ym'].div(sums['mass'])
-    cz = sums['zm'].div(sums['mass'])
+        ref = xyz[first][codes]
+        fcodes = universe.frame.index.get_indexer(atom['frame'].values.astype(np.int64))
+        xyz = ref + minimum_image(xyz - ref, universe.frame.get_cell_vectors(), fcodes)
+    msum = np.bincount(codes, weights=mass)
+    index = pd.Index(molecules, name='molecule')
+    cx, cy, cz = (pd.Series(np.bincount(codes, weights=mass*xyz[:, k])/msum, index=index)
+                  for k in range(3))
     return cx, cy, cz
+
+
+def compute_molecule_id(universe):
+    """
+    Assign persistent molecule identities across frames.
+
+    Frames are processed in order; atoms are identified between frames by
+    their ``label`` (or, if absent, by their position within each frame).
+    Each molecule of a frame inherits the identity (``molecule_id``) of the
+    previous frame's molecule with which it shares the most atoms; when
+    several molecules overlap the same previous molecule (e.g. dissociation),
+    the one with the largest overlap keeps the identity and the others (as
+    well as molecules sharing no atoms with previous frames) get new
+    identities. Unchanged molecules therefore keep their identity, making
+    per molecule time series a simple groupby.
+
+    .. code-block:: python
+
+        atom_id, molecule_id = compute_molecule_id(uni)
+        uni.atom['molecule_id'] = atom_id
+
+    Args:
+        universe (:class:`~exatomic.core.universe.Universe`): Universe with molecules
+
+    Returns:
+        atom_id (:class:`~pandas.Series`): Molecule identity of each atom
+        molecule_id (:class:`~pandas.Series`): Identity of each molecule
+    """
+    if 'molecule' not in universe.atom.columns:
+        universe.compute_molecule()
+    atom = universe.atom
+    molecules, _, codes = _molecule_codes(atom)
+    frames = atom['frame'].values.astype(np.int64)
+    order = np.argsort(frames, kind='mergesort')
+    _, counts = np.unique(frames[order], return_counts=True)
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    if 'label' in atom.columns:
+        labels = atom['label'].values.astype(np.int64)[order]
+    else:
+        labels = np.arange(len(atom)) - np.repeat(offsets[:-1], counts)
+    _, labels = np.unique(labels, return_inverse=True)
+    codes_ = codes[order]
+    prev = np.full((labels.max() + 1 if len(labels) > 0 else 0, ), -1, dtype=np.int64)
+    ids = np.full((len(molecules), ), -1, dtype=np.int64)
+    nid = 0
+    for first, last in zip(offsets[:-1], offsets[1:]):
+        lab = labels[first:last]
+        local, inv = np.unique(codes_[first:last], return_inverse=True)
+        current = np.full((len(local), ), -1, dtype=np.int64)
+        pid = prev[lab]
+        valid = pid >= 0
+        if nid > 0 and valid.any():
+            keys, cnt = np.unique(inv[valid]*nid + pid[valid], return_counts=True)
+            cm, pm = _match_molecules(keys//nid, keys % nid, cnt)
+            current[cm] = pm
+        new = current < 0
+        current[new] = nid + np.arange(new.sum())
+        nid += new.sum()
+        ids[local] = current
+        prev[lab] = current[inv]
+    atom_id = pd.Series(ids[codes], index=atom.index, name='molecule_id')
+    molecule_id = pd.Series(ids, index=pd.Index(molecules, name='molecule'),
+                            name='molecule_id')
+    return atom_id, molecule_id
+
+
+def _match_molecules(cm, pm, cnt):
+    """
+    Match current molecules (cm) to previous identities (pm) by the number
+    of shared atoms (cnt); each current molecule is matched to its largest
+    overlap and each previous identity is given to at most one (the largest
+    overlapping) current molecule.
+    """
+    order = np.lexsort((pm, -cnt))
+    cm = cm[order]
+    pm = pm[order]
+    _, best = np.unique(cm, return_index=True)
+    best = np.sort(best)
+    cm = cm[best]
+    pm = pm[best]
+    _, keep = np.unique(pm, return_index=True)
+    return cm[keep], pm[keep]
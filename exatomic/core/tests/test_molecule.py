@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2015-2018, Exa Analytics Development Team
+# Distributed under the terms of the Apache License 2.0
+"""
+Tests for the Molecule Table
+##############################
+"""
+import numpy as np
+import pandas as pd
+from unittest import TestCase
+from exatomic.core.universe import Universe
+from exatomic.core.molecule import Molecule, compute_molecule_labels
+
+
+class TestComputeMolecule(TestCase):
+    def setUp(self):
+        # Water (bohr) and a distant sodium atom, repeated over two frames
+        xyz = np.array([[0.0, 0.0, 0.0], [1.8, 0.0, 0.0], [-0.45, 1.74, 0.0],
+                        [20.0, 0.0, 0.0]])
+        self.atom = pd.DataFrame.from_dict({
+            'x': np.tile(xyz[:, 0], 2), 'y': np.tile(xyz[:, 1], 2),
+            'z': np.tile(xyz[:, 2], 2), 'frame': np.repeat([0, 1], 4),
+            'symbol': ['O', 'H', 'H', 'Na']*2})
+
+    def test_labels(self):
+        """Bonds across frames never merge molecules."""
+        index = np.arange(6)
+        frame = np.array([0, 0, 0, 1, 1, 1])
+        labels = compute_molecule_labels(index, frame, np.array([0, 2, 3]),
+                                         np.array([1, 3, 4]))
+        self.assertTrue(np.all(labels == [0, 0, 1, 2, 2, 3]))
+
+    def test_compute_molecule(self):
+        uni = Universe(atom=self.atom.copy())
+        uni.compute_molecule()
+        labels = uni.atom['molecule'].astype(np.int64).values
+        self.assertTrue(np.all(labels == [0, 0, 0, 1, 2, 2, 2, 3]))
+        self.assertTrue(np.all(uni.molecule['H'] == [2, 0, 2, 0]))
+        self.assertTrue(np.all(uni.molecule['O'] == [1, 0, 1, 0]))
+        self.assertTrue(np.all(uni.molecule['Na'] == [0, 1, 0, 1]))
+        self.assertTrue(np.all(uni.frame['molecule_count'] == [2, 2]))
+
+    def test_com_periodic(self):
+        """Molecules split across the cell boundary are unwrapped."""
+        frame = pd.DataFrame(index=[0])
+        for col in ["xi", "yi", "zi", "xj", "yj", "zj", "xk", "yk", "zk"]:
+            frame[col] = 0.0
+        frame['xi'] = frame['yj'] = frame['zk'] = 10.0
+        frame['periodic'] = True
+        frame['atom_count'] = 3
+        atom = pd.DataFrame.from_dict({'x': [0.1, 8.3, 9.55], 'y': [5.0, 5.0, 6.74],
+                                       'z': [5.0]*3, 'frame': [0]*3,
+                                       'symbol': ['O', 'H', 'H']})
+        uni = Universe(atom=atom, frame=frame)
+        uni.compute_molecule()
+        uni.compute_molecule_com()
+        self.assertEqual(len(uni.molecule), 1)
+        xyz = np.array([[10.1, 5.0, 5.0], [8.3, 5.0, 5.0], [9.55, 6.74, 5.0]])
+        mass = uni.atom.get_element_masses().values
+        com = (xyz*mass[:, None]).sum(axis=0)/mass.sum()
+        self.assertTrue(np.allclose(uni.molecule[['cx', 'cy', 'cz']].values[0] % 10.0,
+                                    com % 10.0))
+
+
+class TestComputeMoleculeId(TestCase):
+    def test_molecule_id(self):
+        """Identities follow atoms (by label) regardless of discovery order."""
+        water = np.array([[0.0, 0.0, 0.0], [1.8, 0.0, 0.0], [-0.45, 1.74, 0.0]])
+        xyz0 = np.vstack((water, water + [10.0, 0.0, 0.0]))
+        # Second frame: molecules swap places (and atom order) but keep labels
+        xyz1 = np.vstack((water + [10.0, 0.0, 0.0], water))
+        atom = pd.DataFrame.from_dict({
+            'x': np.concatenate((xyz0[:, 0], xyz1[:, 0])),
+            'y': np.concatenate((xyz0[:, 1], xyz1[:, 1])),
+            'z': np.concatenate((xyz0[:, 2], xyz1[:, 2])),
+            'frame': np.repeat([0, 1], 6),
+            'label': [0, 1, 2, 3, 4, 5, 0, 1, 2, 3, 4, 5],
+            'symbol': ['O', 'H', 'H']*4})
+        # Relabel the second frame such that the first water is listed last
+        atom.loc[6:, 'label'] = [3, 4, 5, 0, 1, 2]
+        uni = Universe(atom=atom)
+        uni.compute_molecule()
+        uni.compute_molecule_id()
+        ids = uni.atom['molecule_id'].values
+        self.assertTrue(np.all(ids[:6] == [0, 0, 0, 1, 1, 1]))
+        self.assertTrue(np.all(ids[6:] == [1, 1, 1, 0, 0, 0]))
+        self.assertTrue(np.all(uni.molecule['molecule_id'] == [0, 1, 1, 0]))
+
+
+class TestMoleculeClassify(TestCase):
+    def setUp(self):
+        self.molecule = Molecule.from_dict({'H': [2, 1, 2, 0, 3], 'O': [1, 1, 1, 0, 1],
+                                            'Na': [0, 0, 0, 1, 0],
+                                            'mass': [18.0, 17.0, 18.0, 23.0, 19.0]})
+
+    def test_classify(self):
+        """Later (exact) classifiers take precedence."""
+        self.molecule.classify(('H(2)O(1)', 'solvent'), ('Na', 'ion'),
+                               ('H(2)O(1)', 'water', True))
+        self.assertEqual(self.molecule['classification'].astype(str).tolist(),
+                         ['water', 'solvent', 'water', 'ion', 'solvent'])
+        with self.assertRaises(KeyError):
+            self.molecule.classify(('Na(2)', 'dimer', True))
+
+    def test_get_formula(self):
+        self.assertEqual(self.molecule.get_formula(),
+                         ['H(2)O(1)', 'H(1)O(1)', 'H(2)O(1)', 'Na(1)', 'H(3)O(1)'])
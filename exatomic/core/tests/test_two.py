@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2015-2018, Exa Analytics Development Team
+# Distributed under the terms of the Apache License 2.0
+"""
+Tests for Two Body Computations
+#################################
+"""
+import numpy as np
+import pandas as pd
+from unittest import TestCase
+from exatomic.core.universe import Universe
+from exatomic.core.two import compute_atom_two, _compute_bonds
+
+
+class TestComputeAtomTwo(TestCase):
+    def setUp(self):
+        np.random.seed(1)
+        n, nf = 150, 2
+        self.atom = pd.DataFrame.from_dict({
+            'x': np.random.rand(n*nf)*10, 'y': np.random.rand(n*nf)*10,
+            'z': np.random.rand(n*nf)*10, 'frame': np.repeat(range(nf), n),
+            'symbol': np.random.choice(['H', 'C', 'O'], n*nf)})
+        self.frame = pd.DataFrame(index=range(nf))
+        for col in ["xi", "yi", "zi", "xj", "yj", "zj", "xk", "yk", "zk"]:
+            self.frame[col] = 0.0
+        self.frame['xi'] = self.frame['yj'] = self.frame['zk'] = 10.0
+        self.frame['periodic'] = True
+        self.frame['atom_count'] = n
+
+    def _sorted(self, atom_two):
+        return atom_two.sort_values(['atom0', 'atom1']).reset_index(drop=True)
+
+    def test_bonds_only(self):
+        """Bonds only matches the bonded subset of the full computation."""
+        for uni in (Universe(atom=self.atom.copy()),
+                    Universe(atom=self.atom.copy(), frame=self.frame.copy())):
+            for method in ("brute", "cell", "verlet"):
+                full = compute_atom_two(uni, method=method, H=1.0)
+                full = self._sorted(full[full['bond'] == True])
+                bonds = self._sorted(compute_atom_two(uni, method=method,
+                                                      bonds_only=True, H=1.0))
+                self.assertEqual(len(full), len(bonds))
+                self.assertTrue(bonds['bond'].all())
+                for col in ('dr', 'atom0', 'atom1'):
+                    self.assertTrue(np.allclose(full[col].astype(float),
+                                                bonds[col].astype(float)))
+
+    def test_compact(self):
+        """Compact data types give the same pairs and (nearly) the same distances."""
+        uni = Universe(atom=self.atom.copy(), frame=self.frame.copy())
+        full = self._sorted(compute_atom_two(uni, vector=True))
+        compact = self._sorted(compute_atom_two(uni, vector=True, compact=True))
+        for col in ('dx', 'dy', 'dz', 'dr'):
+            self.assertEqual(compact[col].dtype, np.float32)
+            self.assertTrue(np.allclose(full[col], compact[col], atol=1e-5))
+        self.assertEqual(compact['projection'].dtype, np.int8)
+        for col in ('atom0', 'atom1'):
+            self.assertEqual(compact[col].dtype, np.int32)
+            self.assertTrue(np.all(full[col].astype(np.int64).values ==
+                                   compact[col].values))
+        self.assertTrue(np.all(full['projection'] == compact['projection']))
+        self.assertTrue(np.all(full['bond'] == compact['bond']))
+
+    def test_missing_atoms(self):
+        """Pairs of atoms missing from the atom table are not bonded."""
+        atom = self.atom.iloc[:3].copy()
+        atom['symbol'] = 'C'
+        atom_two = pd.DataFrame.from_dict({'atom0': [0, 0, 1], 'atom1': [1, 2, 500],
+                                           'dr': [1.0, 1.0, 1.0]})
+        _compute_bonds(atom, atom_two)
+        self.assertEqual(list(atom_two['bond']), [True, True, False])
+
+    def test_kdtree(self):
+        """The k-d tree search gives the same table as the brute force search."""
+        uni = Universe(atom=self.atom.copy())
+        for vector in (False, True):
+            brute = compute_atom_two(uni, vector=vector)
+            kdtree = compute_atom_two(uni, vector=vector, method="kdtree")
+            self.assertEqual(list(brute.columns), list(kdtree.columns))
+            for col in brute.columns:
+                self.assertTrue(np.all(brute[col].values == kdtree[col].values))
+        with self.assertRaises(ValueError):
+            compute_atom_two(Universe(atom=self.atom.copy(), frame=self.frame.copy()),
+                             method="kdtree")
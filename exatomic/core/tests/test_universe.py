@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2015-2018, Exa Analytics Development Team
+# Distributed under the terms of the Apache License 2.0
+"""
+Tests for the Universe
+##############################
+"""
+import numpy as np
+import pandas as pd
+from itertools import product
+from unittest import TestCase
+from exatomic.core.universe import Universe
+from exatomic.core.error import PeriodicUniverseError
+
+
+class TestSupercell(TestCase):
+    def setUp(self):
+        # Two atoms in a triclinic cell that changes between two frames
+        cols = ["xi", "yi", "zi", "xj", "yj", "zj", "xk", "yk", "zk"]
+        self.cells = np.array([[[5.0, 0.0, 0.0], [1.0, 6.0, 0.0], [0.5, 0.5, 7.0]],
+                               [[5.5, 0.0, 0.0], [1.0, 6.5, 0.0], [0.5, 0.5, 7.5]]])
+        frame = pd.DataFrame(self.cells.reshape(-1, 9), columns=cols)
+        frame['periodic'] = True
+        frame['atom_count'] = 2
+        # Frames interleaved on purpose
+        atom = pd.DataFrame.from_dict({
+            'symbol': ['O', 'O', 'H', 'H'], 'x': [0.0, 0.1, 1.0, 1.1],
+            'y': [0.0, 0.2, 1.0, 1.2], 'z': [0.0, 0.3, 1.0, 1.3],
+            'frame': [0, 1, 0, 1], 'label': [0, 0, 1, 1],
+            'vx': [1.0, 2.0, 3.0, 4.0]})
+        self.uni = Universe(atom=atom, frame=frame)
+
+    def test_supercell(self):
+        """Replicas are translated by integer combinations of the cell vectors."""
+        sc = self.uni.supercell(2, 1, 3)
+        self.assertEqual(len(sc.atom), 4*6)
+        self.assertTrue(np.all(sc.frame['atom_count'] == 12))
+        self.assertTrue(np.allclose(sc.frame.get_cell_vectors(),
+                                    self.cells*np.array([2, 1, 3])[None, :, None]))
+        atom = self.uni.atom
+        for fdx, grp in sc.atom.groupby('frame'):
+            src = atom[atom['frame'] == fdx]
+            ref = np.array([xyz + np.dot(ijk, self.cells[fdx])
+                            for ijk in product(range(2), range(1), range(3))
+                            for xyz in src[['x', 'y', 'z']].values])
+            self.assertTrue(np.allclose(grp[['x', 'y', 'z']].values, ref))
+            self.assertTrue(np.all(grp['vx'].values == np.tile(src['vx'].values, 6)))
+            self.assertTrue(np.all(grp['label'].values == np.tile([0, 1], 6)))
+
+    def test_free_boundary(self):
+        uni = Universe(atom=self.uni.atom.copy())
+        with self.assertRaises(PeriodicUniverseError):
+            uni.supercell(2, 2, 2)
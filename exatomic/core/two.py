@@ -27,6 +27,7 @@ guide for the types of data found in two body tables provided by this module
 | symbols           | category | concatenated atomic symbols                 |
 +-------------------+----------+---------------------------------------------+
 """
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
 from IPython.display import display
@@ -34,8 +35,10 @@ from ipywidgets import FloatProgress
 from exa import DataFrame
 #from exa.util.units import Length
 from exatomic.base import sym2radius
-from exatomic.algorithms.distance import (pdist_ortho, pdist_ortho_nv, pdist,
-                                          pdist_nv)
+from exatomic.algorithms.distance import (pdist_ortho, pdist_ortho_nv,
+                                          pdist_frames, pdist_verlet,
+                                          pdist_kdtree, two_dtypes,
+                                          boundary_kind, frame_arrays)
 
 
 class AtomTwo(DataFrame):
@@ -60,7 +63,9 @@ class MoleculeTwo(DataFrame):
         return MoleculeTwo
 
 
-def compute_atom_two(universe, dmax=8.0, vector=False, bonds=True, **kwargs):
+def compute_atom_two(universe, dmax=8.0, vector=False, bonds=True,
+                     method="brute", skin=1.0, bonds_only=False, compact=False,
+                     **kwargs):
     """
     Compute interatomic distances and determine bonds.
 
@@ -69,6 +74,11 @@ def compute_atom_two(universe, dmax=8.0, vector=False, bonds=True, **kwargs):
         atom_two = compute_atom_two(uni, dmax=4.0)    # Max distance of interest as 4 bohr
         atom_two = compute_atom_two(uni, vector=True) # Return distance vector components as well as distance
         atom_two = compute_atom_two(uni, bonds=False) # Don't compute bonds
+        atom_two = compute_atom_two(uni, bonds_only=True) # Only keep bonded pairs
+        atom_two = compute_atom_two(uni, compact=True) # float32 distances, int32 atom indexes
+        atom_two = compute_atom_two(uni, method="cell") # Linked-cell neighbor search (large systems)
+        atom_two = compute_atom_two(uni, method="verlet", skin=1.0) # Verlet lists (MD trajectories)
+        atom_two = compute_atom_two(uni, method="kdtree") # k-d tree (large free boundary systems)
         # Compute bonds with custom covalent radii (atomic units)
         atom_two = compute_atom_two(unit, H=10.0, He=20.0, Li=30.0, bond_extra=100.0)
 
@@ -77,84 +87,72 @@ def compute_atom_two(universe, dmax=8.0, vector=False, bonds=True, **kwargs):
         dmax (float): Maximum distance of interest
         vector (bool): Compute distance vector (needed for angles)
         bonds (bool): Compute bonds (default True)
+        method (str): Pair search algorithm, "brute" (all pairs), "cell" (linked-cell), "verlet" (Verlet lists), or "kdtree" (free boundary only)
+        skin (float): Verlet list skin distance (only used if method is "verlet")
+        bonds_only (bool): Only compute (and return) bonded pairs
+        compact (bool): Compact data types (float32 distances, int32 atom indexes, int8 projection)
         kwargs: Additional keyword arguments for :func:`~exatomic.core.two._compute_bonds`
+
+    Note:
+        Atom indexes (atom0, atom1) are categorical unless compact is true,
+        in which case they are plain int32 columns.
+
+    Note:
+        Non-orthorhombic (triclinic) periodic cells always use
+        :func:`~exatomic.core.two.compute_pdist_tric`.
     """
-    if universe.periodic:
-        if universe.orthorhombic and vector:
-            atom_two = compute_pdist_ortho(universe, dmax=dmax)
-        elif universe.orthorhombic:
-            atom_two = compute_pdist_ortho_nv(universe, dmax=dmax)
+    if method not in ("brute", "cell", "verlet", "kdtree"):
+        raise ValueError("Unknown method {}".format(method))
+    if method == "kdtree" and universe.periodic:
+        raise ValueError("The kdtree method supports free boundary conditions only")
+    if bonds_only:
+        return _compute_bonds_only(universe, dmax, vector, method, skin,
+                                   compact, **kwargs)
+    if method == "verlet":
+        atom_two = compute_pdist_verlet(universe, dmax=dmax, skin=skin,
+                                        vector=vector, compact=compact)
+    elif method == "kdtree":
+        atom_two = compute_pdist_kdtree(universe, dmax=dmax, vector=vector,
+                                        compact=compact)
+    elif universe.periodic and not universe.orthorhombic:
+        atom_two = compute_pdist_tric(universe, dmax=dmax, vector=vector,
+                                      compact=compact)
+    elif method == "cell":
+        atom_two = compute_pdist_cell(universe, dmax=dmax, vector=vector,
+                                      compact=compact)
+    elif universe.periodic:
+        if vector:
+            atom_two = compute_pdist_ortho(universe, dmax=dmax, compact=compact)
         else:
-            raise NotImplementedError("Only supports orthorhombic cells")
+            atom_two = compute_pdist_ortho_nv(universe, dmax=dmax, compact=compact)
     elif vector:
-        atom_two = compute_pdist(universe, dmax=dmax)
+        atom_two = compute_pdist(universe, dmax=dmax, method=method, compact=compact)
     else:
-        atom_two = compute_pdist_nv(universe, dmax=dmax)
+        atom_two = compute_pdist_nv(universe, dmax=dmax, method=method, compact=compact)
     if bonds:
         _compute_bonds(universe.atom, atom_two, **kwargs)
     return atom_two
 
 
-def compute_pdist(universe, dmax=8.0):
+def compute_pdist(universe, dmax=8.0, method="brute", compact=False):
     """
     Compute interatomic distances for atoms in free boundary conditions.
 
     Does return distance vector.
     """
-    dxs = []
-    dys = []
-    dzs = []
-    drs = []
-    atom0s = []
-    atom1s = []
-    for _, group in universe.atom.groupby("frame"):
-        if len(group) > 0:
-            values = pdist(group['x'].values.astype(float),
-                           group['y'].values.astype(float),
-                           group['z'].values.astype(float),
-                           group.index.values.astype(int), dmax)
-            dxs.append(values[0])
-            dys.append(values[1])
-            dzs.append(values[2])
-            drs.append(values[3])
-            atom0s.append(values[4])
-            atom1s.append(values[5])
-    dxs = np.concatenate(dxs)
-    dys = np.concatenate(dys)
-    dzs = np.concatenate(dzs)
-    drs = np.concatenate(drs)
-    atom0s = np.concatenate(atom0s)
-    atom1s = np.concatenate(atom1s)
-    return AtomTwo.from_dict({'dx': dxs, 'dy': dys, 'dz': dzs, 'dr': drs,
-                              'atom0': atom0s, 'atom1': atom1s})
+    return _compute_pdist(universe, dmax, True, 0, method, compact)
 
 
-def compute_pdist_nv(universe, dmax=8.0):
+def compute_pdist_nv(universe, dmax=8.0, method="brute", compact=False):
     """
     Compute interatomic distances for atoms in free boundary conditions.
 
     Does not return distance vector.
     """
-    drs = []
-    atom0s = []
-    atom1s = []
-    #for fdx, group in universe.atom.groupby("frame"):
-    for _, group in universe.atom.groupby("frame"):
-        if len(group) > 0:
-            values = pdist_nv(group['x'].values.astype(float),
-                              group['y'].values.astype(float),
-                              group['z'].values.astype(float),
-                              group.index.values.astype(int), dmax)
-            drs.append(values[0])
-            atom0s.append(values[1])
-            atom1s.append(values[2])
-    drs = np.concatenate(drs)
-    atom0s = np.concatenate(atom0s)
-    atom1s = np.concatenate(atom1s)
-    return AtomTwo.from_dict({'dr': drs, 'atom0': atom0s, 'atom1': atom1s})
+    return _compute_pdist(universe, dmax, False, 0, method, compact)
 
 
-def compute_pdist_ortho(universe, dmax=8.0):
+def compute_pdist_ortho(universe, dmax=8.0, minimum_image=True, compact=False):
     """
     Compute interatomic distances between atoms in an orthorhombic
     periodic cell.
@@ -164,10 +162,13 @@ def compute_pdist_ortho(universe, dmax=8.0):
         bonds (bool): Compute bonds as well as distances
         bond_extra (float): Extra factor to use when determining bonds
         dmax (float): Maximum distance of interest
+        minimum_image (bool): Closed-form minimum image (default) rather than checking all 27 projections
         rtol (float): Relative tolerance (float equivalence)
         atol (float): Absolute tolerance (float equivalence)
         radii (kwargs): Custom (covalent) radii to use when determining bonds
     """
+    if minimum_image:
+        return _compute_pdist(universe, dmax, True, 1, "cell", compact)
     if "rx" not in universe.frame.columns:
         universe.frame.compute_cell_magnitudes()
     dxs = []
@@ -201,11 +202,12 @@ def compute_pdist_ortho(universe, dmax=8.0):
     atom0s = np.concatenate(atom0s)
     atom1s = np.concatenate(atom1s)
     prjs = np.concatenate(prjs)
-    return AtomTwo.from_dict({'dx': dxs, 'dy': dys, 'dz': dzs, 'dr': drs,
-                              'atom0': atom0s, 'atom1': atom1s, 'projection': prjs})
+    return _atom_two(_astype({'dx': dxs, 'dy': dys, 'dz': dzs, 'dr': drs,
+                               'atom0': atom0s, 'atom1': atom1s,
+                               'projection': prjs}, compact), compact)
 
 
-def compute_pdist_ortho_nv(universe, dmax=8.0):
+def compute_pdist_ortho_nv(universe, dmax=8.0, minimum_image=True, compact=False):
     """
     Compute interatomic distances between atoms in an orthorhombic
     periodic cell.
@@ -215,10 +217,13 @@ def compute_pdist_ortho_nv(universe, dmax=8.0):
         bonds (bool): Compute bonds as well as distances
         bond_extra (float): Extra factor to use when determining bonds
         dmax (float): Maximum distance of interest
+        minimum_image (bool): Closed-form minimum image (default) rather than checking all 27 projections
         rtol (float): Relative tolerance (float equivalence)
         atol (float): Absolute tolerance (float equivalence)
         radii (kwargs): Custom (covalent) radii to use when determining bonds
     """
+    if minimum_image:
+        return _compute_pdist(universe, dmax, False, 1, "cell", compact)
     if "rx" not in universe.frame.columns:
         universe.frame.compute_cell_magnitudes()
     drs = []
@@ -243,8 +248,181 @@ def compute_pdist_ortho_nv(universe, dmax=8.0):
     atom0s = np.concatenate(atom0s)
     atom1s = np.concatenate(atom1s)
     prjs = np.concatenate(prjs)
-    return AtomTwo.from_dict({'dr': drs, 'atom0': atom0s, 'atom1': atom1s,
-                              'projection': prjs})
+    return _atom_two(_astype({'dr': drs, 'atom0': atom0s, 'atom1': atom1s,
+                               'projection': prjs}, compact), compact)
+
+
+def compute_pdist_cell(universe, dmax=8.0, vector=False, compact=False):
+    """
+    Compute interatomic distances using a linked-cell (binned) neighbor search.
+
+    Supports free boundary conditions and orthorhombic periodic cells. Time
+    and memory scale with the number of atoms rather than the number of atom
+    pairs, making this the preferred approach for large (condensed phase)
+    frames.
+
+    Args:
+        universe (:class:`~exatomic.core.universe.Universe`): A universe
+        dmax (float): Maximum distance of interest
+        vector (bool): Return distance vector components as well
+        compact (bool): Compact data types
+
+    See Also:
+        :func:`~exatomic.algorithms.distance.pdist_frames`
+    """
+    return _compute_pdist(universe, dmax, vector, 1 if universe.periodic else 0,
+                          "cell", compact)
+
+
+def compute_pdist_tric(universe, dmax=8.0, vector=False, compact=False):
+    """
+    Compute interatomic distances between atoms in a general (triclinic)
+    periodic cell.
+
+    The cell of each frame is taken from the cell vector columns
+    (``xi``, ``yi``, ..., ``zk``) of the :class:`~exatomic.core.frame.Frame`,
+    so variable cell trajectories are supported.
+
+    Args:
+        universe (:class:`~exatomic.core.universe.Universe`): A universe
+        dmax (float): Maximum distance of interest
+        vector (bool): Return distance vector components as well
+        compact (bool): Compact data types
+
+    See Also:
+        :func:`~exatomic.algorithms.distance.pdist_frames`
+    """
+    return _compute_pdist(universe, dmax, vector, 2, "cell", compact)
+
+
+def compute_pdist_verlet(universe, dmax=8.0, skin=1.0, vector=False,
+                         compact=False):
+    """
+    Compute interatomic distances for consecutive (molecular dynamics) frames
+    using Verlet (neighbor) lists.
+
+    The list of candidate pairs (within dmax + skin) is only rebuilt when an
+    atom has moved more than skin/2 since the last build; between rebuilds
+    only the distances of candidate pairs are recomputed. Free boundary,
+    orthorhombic, and triclinic periodic cells are supported. Atoms are
+    matched between frames by their order within each frame.
+
+    Args:
+        universe (:class:`~exatomic.core.universe.Universe`): A universe
+        dmax (float): Maximum distance of interest
+        skin (float): Verlet list skin (buffer) distance
+        vector (bool): Return distance vector components as well
+        compact (bool): Compact data types
+
+    See Also:
+        :func:`~exatomic.algorithms.distance.pdist_verlet`
+    """
+    kind = boundary_kind(universe)
+    x, y, z, index, offsets, cells = frame_arrays(universe, kind)
+    values, _ = pdist_verlet(x, y, z, index, offsets, cells, kind, dmax,
+                             skin, vector, compact=compact)
+    return _atom_two(values, compact)
+
+
+def compute_pdist_kdtree(universe, dmax=8.0, vector=False, compact=False):
+    """
+    Compute interatomic distances for atoms in free boundary conditions
+    using a k-d tree per frame.
+
+    Returns the same data as :func:`~exatomic.core.two.compute_pdist_nv`
+    (or :func:`~exatomic.core.two.compute_pdist` if vector is true).
+
+    Args:
+        universe (:class:`~exatomic.core.universe.Universe`): A universe
+        dmax (float): Maximum distance of interest
+        vector (bool): Return distance vector components as well
+        compact (bool): Compact data types
+
+    See Also:
+        :func:`~exatomic.algorithms.distance.pdist_kdtree`
+    """
+    x, y, z, index, offsets, _ = frame_arrays(universe, 0)
+    if vector:
+        columns = ['dx', 'dy', 'dz', 'dr', 'atom0', 'atom1']
+    else:
+        columns = ['dr', 'atom0', 'atom1']
+    values = []
+    for first, last in zip(offsets[:-1], offsets[1:]):
+        values.append(pdist_kdtree(x[first:last], y[first:last], z[first:last],
+                                   index[first:last], dmax, vector))
+    values = [np.concatenate(v) for v in zip(*values)]
+    return _atom_two(_astype(OrderedDict(zip(columns, values)), compact), compact)
+
+
+def _compute_pdist(universe, dmax, vector, kind, method, compact=False):
+    """
+    Compute interatomic distances for all frames at once.
+
+    Atoms are (stably) sorted by frame so that each frame is a contiguous
+    block (given by offsets) and all frames are processed in parallel by
+    :func:`~exatomic.algorithms.distance.pdist_frames`.
+
+    Args:
+        universe (:class:`~exatomic.core.universe.Universe`): A universe
+        dmax (float): Maximum distance of interest
+        vector (bool): Return distance vector components as well
+        kind (int): 0 for free boundary, 1 for orthorhombic, 2 for triclinic cells
+        method (str): Linked-cell ("cell") or all pairs ("brute") search
+        compact (bool): Compact data types
+    """
+    x, y, z, index, offsets, cells = frame_arrays(universe, kind)
+    values = pdist_frames(x, y, z, index, offsets, cells, kind, dmax, method,
+                          vector, compact=compact)
+    return _atom_two(values, compact)
+
+
+def _compute_bonds_only(universe, dmax, vector, method, skin, compact=False,
+                        bond_extra=0.45, **radii):
+    """
+    Compute bonded pairs only.
+
+    Per atom covalent radii are passed to the compiled pair search such that
+    only bonded pairs are stored; the full distance table is never built.
+
+    Args:
+        universe (:class:`~exatomic.core.universe.Universe`): A universe
+        dmax (float): Maximum distance of interest
+        vector (bool): Return distance vector components as well
+        method (str): Pair search algorithm
+        skin (float): Verlet list skin distance
+        compact (bool): Compact data types
+        bond_extra (float): Additional amount for determining bonds
+        radii: Custom radii to use for computing bonds
+    """
+    kind = boundary_kind(universe)
+    if method == "kdtree":
+        method = "cell"
+    radius = _atom_radius(universe.atom, **radii)
+    x, y, z, index, offsets, cells, radius = frame_arrays(universe, kind, radius)
+    if method == "verlet":
+        values, _ = pdist_verlet(x, y, z, index, offsets, cells, kind, dmax,
+                                 skin, vector, radius, bond_extra, compact)
+    else:
+        values = pdist_frames(x, y, z, index, offsets, cells, kind, dmax,
+                              method, vector, radius, bond_extra, compact)
+    atom_two = _atom_two(values, compact)
+    atom_two['bond'] = True
+    return atom_two
+
+
+def _atom_radius(atom, **radii):
+    """
+    Per atom covalent radii.
+
+    Args:
+        radii: Custom radii to use for computing bonds
+    """
+    symbols = atom['symbol'].astype('category')
+    categories = symbols.cat.categories
+    radmap = {sym: sym2radius[sym] for sym in categories}
+    radmap.update(radii)
+    radius = np.array([radmap[sym] for sym in categories], dtype=np.float64)
+    return radius[symbols.cat.codes.values]
 
 
 def _compute_bonds(atom, atom_two, bond_extra=0.45, **radii):
@@ -256,11 +434,16 @@ def _compute_bonds(atom, atom_two, bond_extra=0.45, **radii):
         radii: Custom radii to use for computing bonds
     """
     atom['symbol'] = atom['symbol'].astype('category')
-    radmap = {sym: sym2radius[sym] for sym in atom['symbol'].cat.categories}
-    radmap.update(radii)
-    maxdr = (atom_two['atom0'].map(atom['symbol']).map(radmap) +
-             atom_two['atom1'].map(atom['symbol']).map(radmap) + bond_extra)
-    atom_two['bond'] = np.where(atom_two['dr'] <= maxdr, True, False)
+    radius = _atom_radius(atom, **radii)
+    # Positional lookup works for any integer (or categorical) atom index dtype
+    idx0 = atom.index.get_indexer(np.asarray(atom_two['atom0'], dtype=np.int64))
+    idx1 = atom.index.get_indexer(np.asarray(atom_two['atom1'], dtype=np.int64))
+    # Atoms missing from the atom table (indexer -1) are never bonded
+    found = (idx0 >= 0) & (idx1 >= 0)
+    maxdr = radius[idx0[found]] + radius[idx1[found]] + bond_extra
+    bond = np.zeros((len(idx0), ), dtype=bool)
+    bond[found] = np.asarray(atom_two['dr'])[found] <= maxdr
+    atom_two['bond'] = bond
 
 
 def _compute_bond_count(atom, atom_two):
@@ -273,7 +456,29 @@ def _compute_bond_count(atom, atom_two):
     atom['bond_count'] = bonded.value_counts().sort_index()
 
 
-def compute_atom_two_out_of_core(hdfname, uni, a, **kwargs):
+def _atom_two(values, compact):
+    """
+    Build the two body table. Atom indexes of compact tables are kept as
+    int32 columns rather than being converted to categories.
+    """
+    atom_two = AtomTwo.from_dict(values)
+    if compact:
+        for col in ('atom0', 'atom1'):
+            atom_two[col] = np.asarray(atom_two[col], dtype=np.int32)
+    return atom_two
+
+
+def _astype(values, compact):
+    """Cast two body data to the (compact) data types."""
+    fdtype, idtype, pdtype = two_dtypes(compact)
+    dtypes = dict(dx=fdtype, dy=fdtype, dz=fdtype, dr=fdtype, atom0=idtype,
+                  atom1=idtype, projection=pdtype)
+    return OrderedDict((col, np.asarray(v).astype(dtypes[col]))
+                       for col, v in values.items())
+
+
+def compute_atom_two_out_of_core(hdfname, uni, a, vector=True, compact=False,
+                                 **kwargs):
     """
     Perform an out of core periodic two body calculation for a simple cubic
     unit cell with dimension a.
@@ -285,6 +490,8 @@ def compute_atom_two_out_of_core(hdfname, uni, a, **kwargs):
         hdfname (str): HDF file name
         uni (:class:`~exatomic.core.universe.Universe`): Universe
         a (float): Simple cubic unit cell dimension
+        vector (bool): Store distance vector components as well
+        compact (bool): Compact data types (float32 distances, int32 atom indexes, int8 projection)
         kwargs: Keyword arguments for bond computation (i.e. covalent radii)
 
     See Also:
@@ -300,12 +507,12 @@ def compute_atom_two_out_of_core(hdfname, uni, a, **kwargs):
     fp = FloatProgress(description="AtomTwo to HDF:")
     display(fp)
     for i, (fdx, atom) in enumerate(grps):
-        v = pdist_ortho(atom['x'].values, atom['y'].values,
-                        atom['z'].values, a, a, a,
-                        atom.index.values, a)
-        tdf = pd.DataFrame.from_dict({'frame': np.array([fdx]*len(v[0]), dtype=int),
-                                      'dx': v[0], 'dy': v[1], 'dz': v[2], 'dr': v[3],
-                                       'atom0': v[4], 'atom1': v[5], 'projection': v[6]})
+        v = pdist_frames(atom['x'].values, atom['y'].values,
+                         atom['z'].values, atom.index.values,
+                         np.array([0, len(atom)]), np.diag([a, a, a]), 1, a,
+                         vector=vector, compact=compact)
+        tdf = pd.DataFrame.from_dict(v)
+        tdf.insert(0, 'frame', np.full((len(tdf), ), fdx, dtype=int))
         _compute_bonds(uni.atom[uni.atom['frame'] == fdx], tdf, **kwargs)
         store.put("frame_"+str(fdx) + "/atom_two", tdf)
         fp.value = i/n*100
@@ -20,18 +20,23 @@ from .atom import Atom, UnitAtom, ProjectedAtom, VisualAtom, Frequency
 from .two import (AtomTwo, MoleculeTwo, compute_atom_two,
                   _compute_bond_count, _compute_bonds)
 from .molecule import (Molecule, compute_molecule, compute_molecule_com,
-                       compute_molecule_count)
+                       compute_molecule_count, compute_molecule_id)
 from .field import AtomicField
 from .orbital import Orbital, Excitation, MOMatrix, DensityMatrix
 from .basis import Overlap, BasisSet, BasisSetOrder
 from exatomic.algorithms.orbital import add_molecular_orbitals
 from exatomic.algorithms.basis import BasisFunctions, compute_uncontracted_basis_set_order
+from exatomic.algorithms.geometry import supercell_positions
+from exatomic.algorithms.angles import compute_atom_angle, compute_atom_dihedral
+from .error import PeriodicUniverseError
 from .tensor import Tensor
 
 class Meta(TypedMeta):
     atom = Atom
     frame = Frame
     atom_two = AtomTwo
+    atom_angle = DataFrame
+    atom_dihedral = DataFrame
     unit_atom = UnitAtom
     projected_atom = ProjectedAtom
     visual_atom = VisualAtom
@@ -69,6 +74,8 @@ class Universe(six.with_metaclass(Meta, Container)):
         frame (:class:`~exatomic.core.frame.Frame`): State variables:
         atom (:class:`~exatomic.core.atom.Atom`): (Classical) atomic data (e.g. coordinates)
         atom_two (:class:`~exatomic.core.two.AtomTwo`): Interatomic distances
+        atom_angle (:class:`~exa.core.dataframe.DataFrame`): Bond angles
+        atom_dihedral (:class:`~exa.core.dataframe.DataFrame`): Dihedral angles
         molecule (:class:`~exatomic.core.molecule.Molecule`): Molecule information
         orbital (:class:`~exatomic.core.orbital.Orbital`): Molecular orbital information
         momatrix (:class:`~exatomic.core.orbital.MOMatrix`): Molecular orbital coefficient matrix
@@ -137,6 +144,24 @@ class Universe(six.with_metaclass(Meta, Container)):
         """
         self.atom_two = compute_atom_two(self, *args, **kwargs)
 
+    def compute_atom_angle(self, **kwargs):
+        """
+        Compute bond angles of all frames.
+
+        See Also:
+            :func:`~exatomic.algorithms.angles.compute_atom_angle`
+        """
+        self.atom_angle = compute_atom_angle(self, **kwargs)
+
+    def compute_atom_dihedral(self, **kwargs):
+        """
+        Compute dihedral (torsion) angles of all frames.
+
+        See Also:
+            :func:`~exatomic.algorithms.angles.compute_atom_dihedral`
+        """
+        self.atom_dihedral = compute_atom_dihedral(self, **kwargs)
+
     def compute_bonds(self, *args, **kwargs):
         """
         Updates bonds (and molecules).
@@ -157,6 +182,15 @@ class Universe(six.with_metaclass(Meta, Container)):
         self.molecule = compute_molecule(self)
         self.compute_molecule_count()
 
+    def compute_molecule_id(self):
+        """
+        Compute persistent molecule identities (``molecule_id``) across frames
+        and attach them to the atom and molecule tables.
+        """
+        atom_id, molecule_id = compute_molecule_id(self)
+        self.atom['molecule_id'] = atom_id
+        self.molecule['molecule_id'] = molecule_id
+
     def compute_molecule_com(self):
         cx, cy, cz = compute_molecule_com(self)
         self.molecule['cx'] = cx
@@ -192,6 +226,59 @@ class Universe(six.with_metaclass(Meta, Container)):
         """Compute an uncontracted basis set order."""
         self.uncontracted_basis_set_order = compute_uncontracted_basis_set_order(self)
 
+    def supercell(self, na, nb, nc):
+        """
+        Build a supercell by replicating the (periodic) cell of every frame
+        ``na``, ``nb``, and ``nc`` times along the cell vectors a, b, and c.
+
+        .. code-block:: python
+
+            sc = uni.supercell(2, 2, 2)    # 2x2x2 supercell of every frame
+
+        Cells may be triclinic and variable (per frame). Per atom columns
+        (e.g. label, set, velocities) are carried over to every replica;
+        molecule assignments are dropped since they refer to the original
+        cell.
+
+        Args:
+            na (int): Number of replicas along a
+            nb (int): Number of replicas along b
+            nc (int): Number of replicas along c
+
+        Returns:
+            uni (:class:`~exatomic.core.universe.Universe`): Supercell universe
+        """
+        if not self.periodic:
+            raise PeriodicUniverseError()
+        atom = self.atom
+        frame = self.frame
+        nimg = na*nb*nc
+        fcodes = frame.index.get_indexer(atom['frame'].values.astype(np.int64))
+        order = np.argsort(fcodes, kind='mergesort')
+        counts = np.bincount(fcodes, minlength=len(frame))
+        offsets = np.append(0, np.cumsum(counts))
+        cells = frame.get_cell_vectors()
+        xyz = atom[['x', 'y', 'z']].values.astype(np.float64)[order]
+        idx, x, y, z = supercell_positions(xyz[:, 0].copy(), xyz[:, 1].copy(),
+                                           xyz[:, 2].copy(), offsets, cells,
+                                           na, nb, nc)
+        src = order[idx]
+        data = {col: atom[col].values[src] for col in atom.columns
+                if col not in ('x', 'y', 'z', 'molecule', 'molecule_id')}
+        data.update({'x': x, 'y': y, 'z': z})
+        scatom = pd.DataFrame.from_dict(data)
+        scatom.index.name = 'atom'
+        cells = cells*np.array([na, nb, nc], dtype=np.float64)[None, :, None]
+        scframe = frame.drop(['rx', 'ry', 'rz', 'molecule_count'], axis=1,
+                             errors='ignore')
+        for i, col in enumerate(["xi", "yi", "zi", "xj", "yj", "zj", "xk", "yk", "zk"]):
+            scframe[col] = cells[:, i//3, i%3]
+        scframe['atom_count'] = counts*nimg
+        scframe = Frame(scframe)
+        if 'rx' in frame.columns:
+            scframe.compute_cell_magnitudes()
+        return Universe(atom=Atom(scatom), frame=scframe)
+
     def enumerate_shells(self, frame=0):
         """Extract minimal information from the universe to be used in
         numba-compiled numerical procedures.
@@ -260,7 +347,8 @@ class Universe(six.with_metaclass(Meta, Container)):
 
     def add_molecular_orbitals(self, field_params=None, mocoefs=None,
                                vector=None, frame=0, replace=False,
-                               inplace=True, verbose=True, irrep=None):
+                               inplace=True, verbose=True, irrep=None,
+                               tol=None, chunk=65536, dtype=np.float64):
         """Add molecular orbitals to universe.
 
         .. code-block:: python
@@ -283,6 +371,9 @@ class Universe(six.with_metaclass(Meta, Container)):
             inplace (bool): add directly to uni or return :class:`~exatomic.core.field.AtomicField` (default True)
             verbose (bool): print timing statistics (default True)
             irrep (int): irreducible representation
+            tol (float): neglect basis functions where smaller than tol (default None)
+            chunk (int): number of grid points evaluated at once (bounds memory)
+            dtype (type): field precision, np.float32 halves memory for visualization
 
         Warning:
             Default behavior just continually adds fields to the universe.  This can
@@ -300,7 +391,8 @@ class Universe(six.with_metaclass(Meta, Container)):
                                       mocoefs=mocoefs, vector=vector,
                                       frame=frame, replace=replace,
                                       inplace=inplace, verbose=verbose,
-                                      irrep=irrep)
+                                      irrep=irrep, tol=tol, chunk=chunk,
+                                      dtype=dtype)
 
     def __len__(self):
         return len(self.frame)